@@ -1,24 +1,12 @@
 import streamlit as st
 from pathlib import Path
-import pandas as pd
-import numpy as np
 import base64
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from PIL import Image
+from datetime import datetime
 import time
 
-# Import components
-from src.components.dashboard import Dashboard
-from src.components.roi_calculator import ROICalculator
-from src.components.segment_explorer import SegmentExplorer
-from src.components.sustainability_tracker import SustainabilityTracker
-from src.components.selfie_accuracy import SelfieAccuracyAnalyzer
-from src.components.customer_journey import CustomerJourney
-from src.components.ab_testing import ABTestingPanel
-from src.components.predictive_analytics import PredictiveAnalytics
-from src.components.demographics import DemographicInsights
-from src.components.brand_timeline import BrandTimeline
+# Page registry: the component module of a page (and the heavy libraries it
+# uses, e.g. plotly and scipy) is only imported when the page is selected
+from src.pages import LANDING_PAGE, PAGES, render_page
 
 # Set page configuration
 st.set_page_config(
@@ -28,6 +16,30 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def init_data_layer():
+    """
+    Import the data layer and start the background cache warm-up, which
+    warms the result cache after every (re)load of the shared dataset
+    
+    Runs once per process, not on every rerun, and independent of the page
+    layout. Only light modules are imported here: scipy and plotly stay
+    deferred to the pages (and cache misses) that need them.
+    
+    Returns:
+        tuple: The src.context, src.data_processing, src.indexing and
+        src.warmup modules
+    """
+    from src import context, data_processing, indexing, warmup
+    warmup.enable_warm_up()
+    return context, data_processing, indexing, warmup
+
+context, data_processing, indexing, warmup = init_data_layer()
+
+def select_date_range(date_range):
+    """Quick filter callback: set the global date range before the rerun"""
+    st.session_state.date_range = date_range
+
 # Load custom CSS
 def load_css():
     css_file = Path("assets/styles/style.css")
@@ -124,18 +136,7 @@ with st.sidebar:
     st.markdown("<div class='nav-header'>DASHBOARD MODULES</div>", unsafe_allow_html=True)
     
     # Create stylized navigation menu
-    menu_options = [
-        "📊 Performance Overview",
-        "💰 ROI Calculator",
-        "🔍 Segment Explorer",
-        "🌿 Sustainability Impact",
-        "📷 Selfie Accuracy",
-        "🛒 Customer Journey",
-        "🧪 A/B Testing Lab",
-        "📈 Predictive Analytics",
-        "👥 Demographic Insights",
-        "🚀 Brand Growth Timeline"
-    ]
+    menu_options = list(PAGES)
     
     # Custom navigation with animations
     for i, option in enumerate(menu_options):
@@ -144,7 +145,7 @@ with st.sidebar:
             st.session_state.nav = option
     
     if 'nav' not in st.session_state:
-        st.session_state.nav = menu_options[0]
+        st.session_state.nav = LANDING_PAGE
     
     nav = st.session_state.nav
     
@@ -179,41 +180,32 @@ with st.sidebar:
     st.markdown("<div class='sidebar-divider'></div>", unsafe_allow_html=True)
     st.markdown("<div class='nav-header'>GLOBAL FILTERS</div>", unsafe_allow_html=True)
     
-    # Get date range from simulated data
-    from src.data_processing import load_data
-    data = load_data()
-    min_date = pd.to_datetime(data['date']).min().date()
-    max_date = pd.to_datetime(data['date']).max().date()
+    # Get date range from simulated data; every (re)load warms the cache of
+    # the standard filters in the background
+    data = data_processing.load_data()
+    min_date = data['date'].min().date()
+    max_date = data['date'].max().date()
+    
+    # The standard windows are the ones the warm-up precomputes
+    windows = warmup.standard_date_ranges(data)
+    stored_range = st.session_state.get('date_range')
+    if not stored_range or not all(min_date <= bound <= max_date for bound in stored_range):
+        # First rerun of the session, or the data changed
+        st.session_state.date_range = windows['All Time']
     
     date_range = st.date_input(
         "Date Range",
-        value=[min_date, max_date],
         min_value=min_date,
-        max_value=max_date
+        max_value=max_date,
+        key='date_range'
     )
     
-    # Add quick date selectors with animation
-    st.markdown(
-        """
-        <div class="quick-filters">
-            <button class="quick-filter-btn" onclick="handleQuickFilter('30d')">
-                <span class="quick-filter-icon">📅</span>
-                <span class="quick-filter-text">Last 30 Days</span>
-            </button>
-            <button class="quick-filter-btn" onclick="handleQuickFilter('90d')">
-                <span class="quick-filter-icon">📊</span>
-                <span class="quick-filter-text">Last Quarter</span>
-            </button>
-        </div>
-        <script>
-            function handleQuickFilter(period) {
-                // This would be handled by Streamlit
-                console.log('Filter: ' + period);
-            }
-        </script>
-        """,
-        unsafe_allow_html=True
-    )
+    # Quick date selectors
+    quick_30d, quick_90d = st.columns(2)
+    quick_30d.button("📅 Last 30 Days", on_click=select_date_range, args=(windows['Last 30 Days'],),
+                     use_container_width=True)
+    quick_90d.button("📊 Last Quarter", on_click=select_date_range, args=(windows['Last Quarter'],),
+                     use_container_width=True)
     
     # Global category filter with animation
     categories = ['All Categories'] + list(data['product_category'].unique())
@@ -266,11 +258,14 @@ with st.sidebar:
         unsafe_allow_html=True
     )
 
-# Apply filters to data for all pages
-if len(date_range) == 2:
-    filtered_data = data.copy()  # This would actually use the filter_data function
-else:
-    filtered_data = data.copy()
+# Memory budget of the session's filtered views
+if 'memory_budget' not in st.session_state:
+    st.session_state.memory_budget = indexing.MemoryBudget(data_processing.SESSION_MEMORY_BUDGET)
+
+# Data and global filters of this rerun, passed into the selected page: the
+# filtered rows are a view over the shared dataset, resolved once and released
+# when the page is rendered
+data_context = context.DataContext(data, selected_category, date_range, st.session_state.memory_budget)
 
 # Main content area with dynamic header and animations
 st.markdown(
@@ -329,35 +324,9 @@ st.markdown(
 # Content based on navigation selection with fade-in animation
 st.markdown('<div class="content-container fadeIn">', unsafe_allow_html=True)
 
-if nav == "📊 Performance Overview":
-    Dashboard()
-    
-elif nav == "💰 ROI Calculator":
-    ROICalculator()
-    
-elif nav == "🔍 Segment Explorer":
-    SegmentExplorer()
-    
-elif nav == "🌿 Sustainability Impact":
-    SustainabilityTracker()
-    
-elif nav == "📷 Selfie Accuracy":
-    SelfieAccuracyAnalyzer()
-    
-elif nav == "🛒 Customer Journey":
-    CustomerJourney()
-    
-elif nav == "🧪 A/B Testing Lab":
-    ABTestingPanel()
-    
-elif nav == "📈 Predictive Analytics":
-    PredictiveAnalytics()
-    
-elif nav == "👥 Demographic Insights":
-    DemographicInsights()
-    
-elif nav == "🚀 Brand Growth Timeline":
-    BrandTimeline()
+with data_context:
+    if not render_page(nav, data_context):
+        st.info("This module is not available in this installation.")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
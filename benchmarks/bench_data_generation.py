@@ -0,0 +1,33 @@
+"""
+Benchmark for the synthetic data generator
+
+Run from the repository root:
+
+    python -m benchmarks.bench_data_generation            # 1k, 1M and 50M rows
+    python -m benchmarks.bench_data_generation 1000 100000
+"""
+import sys
+import time
+
+from src.data_processing import generate_sample_data
+
+DEFAULT_SIZES = [1_000, 1_000_000, 50_000_000]
+
+def benchmark(n_samples, repeat=3):
+    """Return the best wall-clock time (seconds) to generate n_samples rows"""
+    best = float('inf')
+    for _ in range(repeat if n_samples <= 1_000_000 else 1):
+        start = time.perf_counter()
+        df = generate_sample_data(n_samples)
+        best = min(best, time.perf_counter() - start)
+        del df
+    return best
+
+def main(sizes):
+    print(f"{'rows':>12} {'seconds':>10} {'rows/second':>14}")
+    for n_samples in sizes:
+        elapsed = benchmark(n_samples)
+        print(f"{n_samples:>12,} {elapsed:>10.3f} {n_samples / elapsed:>14,.0f}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,77 @@
+"""
+Import-time budget of the landing page
+
+Times, in fresh interpreters, the imports a session needs before the
+landing page renders: the page registry, the DataContext, the cache warm-up
+and the landing page's component. Libraries deferred to first use (scipy,
+plotly) must not be among them.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time      # best of 5 interpreters
+    python -m benchmarks.bench_import_time 10
+
+Exits with status 1 when the budget is exceeded or a deferred library is
+imported. Skipped (status 0) when streamlit is not installed, since the
+landing page imports cannot be timed without it.
+"""
+import importlib.util
+import json
+import subprocess
+import sys
+
+# Imports of app.py before the landing page renders
+LANDING_IMPORTS = (
+    "import src.pages, src.context, src.warmup; "
+    "src.pages.load_page(src.pages.LANDING_PAGE)"
+)
+
+# Wall-clock budget of LANDING_IMPORTS, streamlit and pandas included
+IMPORT_BUDGET_SECONDS = 2.0
+
+# Heavy libraries only imported when a page (or a cache miss) needs them
+DEFERRED_LIBRARIES = ('scipy', 'plotly')
+
+MEASURE = f"""
+import json, sys, time
+start = time.perf_counter()
+{LANDING_IMPORTS}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'deferred': sorted(name for name in {DEFERRED_LIBRARIES!r} if name in sys.modules)
+}}))
+"""
+
+def measure():
+    """
+    (seconds, deferred libraries imported) of LANDING_IMPORTS in a fresh interpreter
+    
+    Raises:
+        RuntimeError: If the imports fail, with the interpreter's error output
+    """
+    output = subprocess.run([sys.executable, '-c', MEASURE], capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(f"landing page imports failed:\n{output.stderr.strip()}")
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    return result['seconds'], result['deferred']
+
+def main(repeat):
+    if importlib.util.find_spec('streamlit') is None:
+        print("SKIP: streamlit is not installed, the landing page imports cannot be timed")
+        return 0
+    
+    results = [measure() for _ in range(repeat)]
+    best = min(seconds for seconds, _ in results)
+    deferred = sorted({name for _, names in results for name in names})
+    
+    print(f"landing page imports: {best * 1000:8.1f} ms  (budget {IMPORT_BUDGET_SECONDS * 1000:.0f} ms)")
+    print(f"deferred libraries imported: {', '.join(deferred) or 'none'}")
+    
+    if best > IMPORT_BUDGET_SECONDS or deferred:
+        print("FAIL: landing page import budget exceeded")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
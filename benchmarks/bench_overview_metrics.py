@@ -0,0 +1,58 @@
+"""
+Benchmark for the Performance Overview metrics
+
+Compares the single-pass engine (calculate_overview_metrics) with
+re-filtering the rows for every KPI and test, as the page did before.
+
+    python -m benchmarks.bench_overview_metrics [n_samples]
+"""
+import sys
+import time
+
+import scipy.stats as stats
+
+from src.data_processing import generate_sample_data
+from src.metrics.overview import calculate_overview_metrics
+
+def filtering_baseline(df):
+    """Per-metric boolean filtering, one pass over the rows per metric and group"""
+    results = {}
+    groups = {'control': df['test_group'] == 'Control',
+              'recommendation': df['test_group'] == 'Size Recommendation'}
+    for name, in_group in groups.items():
+        group_df = df[in_group]
+        carts = group_df[group_df['added_to_cart'] == 1]
+        purchased = group_df[group_df['purchased'] == 1]
+        rated = group_df[(group_df['purchased'] == 1) & (group_df['satisfaction_score'] > 0)]
+        results[name] = {
+            'view_to_cart': group_df['added_to_cart'].sum() / group_df['viewed'].sum(),
+            'cart_to_purchase': carts['purchased'].sum() / group_df['added_to_cart'].sum(),
+            'overall': group_df['purchased'].sum() / group_df['viewed'].sum(),
+            'return_rate': purchased['returned'].sum() / len(purchased),
+            'scores': rated['satisfaction_score']
+        }
+    # Each of the seven page functions re-filtered independently
+    for _ in range(6):
+        df[df['test_group'] == 'Control']
+        df[df['purchased'] == 1]
+    stats.ttest_ind(results['recommendation']['scores'], results['control']['scores'], equal_var=False)
+    return results
+
+def best_time(fn, df, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(n_samples):
+    df = generate_sample_data(n_samples)
+    baseline = best_time(filtering_baseline, df)
+    engine = best_time(calculate_overview_metrics, df)
+    print(f"rows: {n_samples:,}")
+    print(f"per-metric filtering: {baseline * 1000:8.1f} ms")
+    print(f"single-pass engine:   {engine * 1000:8.1f} ms  ({baseline / engine:.1f}x)")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
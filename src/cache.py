@@ -0,0 +1,402 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import PROCESSED_DATA_DIR, date_bounds, shared_data_source
+
+# Persistent cache of computed aggregates and results, survives restarts
+DISK_CACHE_DIR = PROCESSED_DATA_DIR.parent / "cache"
+
+# Source tree whose content defines the code version of cached entries
+CODE_ROOT = Path(__file__).resolve().parent
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with per-entry time-to-live
+    
+    Shared by every session of the process. When the cache is full, the
+    least recently used entry is evicted; entries older than ttl_seconds
+    are recomputed on their next access.
+    
+    Callers get a detached copy of the stored value (see detached), never
+    the shared object, so one session modifying a result cannot change it
+    for the others. Concurrent misses on the same key compute the value once.
+    """
+    
+    def __init__(self, max_entries=512, ttl_seconds=3600, clock=time.monotonic):
+        """
+        Args:
+            max_entries: Number of entries kept before evicting the least recently used
+            ttl_seconds: Lifetime of an entry, None for no expiry
+            clock: Callable returning the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._build_locks = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+    
+    def get(self, key, default=None):
+        """Detached copy of the cached value of key, default if absent or expired"""
+        missing = object()
+        value = self._lookup(key, missing, record=True)
+        return default if value is missing else detached(value)
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def get_or_compute(self, key, compute):
+        """
+        Detached copy of the cached value of key, computing and storing it on a miss
+        
+        The computation runs outside the cache lock, so a slow entry does not
+        block other lookups; only one thread computes a given key at a time,
+        the others wait for its result (single flight).
+        """
+        missing = object()
+        value = self._lookup(key, missing, record=True)
+        if value is missing:
+            with self._lock:
+                build_lock = self._build_locks.setdefault(key, threading.Lock())
+            
+            with build_lock:
+                # Computed meanwhile by the thread holding the build lock
+                value = self._lookup(key, missing, record=False)
+                if value is missing:
+                    value = compute()
+                    self.put(key, value)
+            
+            with self._lock:
+                if self._build_locks.get(key) is build_lock:
+                    del self._build_locks[key]
+        
+        return detached(value)
+    
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+    
+    def stats(self):
+        """
+        Cache statistics for monitoring
+        
+        Returns:
+            dict: entries, hits, misses, hit_rate, evictions and expirations
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total > 0 else 0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
+    
+    def _lookup(self, key, default, record):
+        """Stored value of key (not detached), default if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            
+            if entry is None:
+                if record:
+                    self._misses += 1
+                return default
+            
+            if record:
+                self._hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def _expired(self, entry):
+        return self.ttl_seconds is not None and self._clock() - entry[0] > self.ttl_seconds
+
+class DiskCache:
+    """
+    On-disk cache of computed aggregates and results
+    
+    Entries are keyed by the content hash of the source data and the code
+    version, so a restarted process reuses them as long as neither changed,
+    and never serves results of other data or older code. Arrays are stored
+    as .npy files and loaded memory-mapped, so loading is O(1) and pages are
+    shared between processes. Results are restricted to plain data (see
+    encode_result) and stored as .npz files read without pickle, so loading
+    an entry never executes code.
+    
+    Entries of other data or code versions are removed the first time an
+    entry of the current version is written, not on every write.
+    """
+    
+    def __init__(self, root=DISK_CACHE_DIR):
+        self.root = Path(root)
+        self._pruned = set()
+        self._lock = threading.Lock()
+    
+    def arrays(self, name, data_key, build):
+        """
+        Arrays of a named aggregate, loaded from disk or built and saved
+        
+        Args:
+            name: Name of the aggregate (e.g. 'metrics_cube')
+            data_key: Content hash of the data the aggregate is built from
+            build: Callable without arguments returning (arrays, meta): a
+                dict of np.ndarray and a JSON-serializable dict
+        
+        Returns:
+            tuple: (arrays, meta); arrays loaded from disk are read-only memory maps
+        """
+        directory = self.root / 'arrays' / name / self._key(data_key)
+        try:
+            with open(directory / 'meta.json') as f:
+                meta = json.load(f)
+            return {array: np.load(directory / f'{array}.npy', mmap_mode='r') for array in meta['arrays']}, meta['meta']
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+        
+        arrays, meta = build()
+        
+        # Write to a temporary directory, then move it in place atomically
+        tmp_directory = directory.with_name(f'{directory.name}.tmp-{os.getpid()}-{threading.get_ident()}')
+        tmp_directory.mkdir(parents=True, exist_ok=True)
+        for array, values in arrays.items():
+            np.save(tmp_directory / f'{array}.npy', np.ascontiguousarray(values))
+        with open(tmp_directory / 'meta.json', 'w') as f:
+            json.dump({'arrays': list(arrays), 'meta': meta}, f)
+        try:
+            os.replace(tmp_directory, directory)
+        except OSError:
+            # Written meanwhile by another process
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+        
+        self._prune(directory)
+        return arrays, meta
+    
+    def result(self, name, data_key, parameters, compute):
+        """
+        Result loaded from disk, or computed and saved
+        
+        Args:
+            name: Name of the result
+            data_key: Content hash of the data the result is computed from
+            parameters: Hashable, repr-stable parameters (e.g. a canonical filter)
+            compute: Callable without arguments computing the result, plain
+                data as accepted by encode_result
+        
+        Raises:
+            TypeError: If the result is not plain data
+        """
+        directory = self.root / 'results' / name / self._key(data_key)
+        path = directory / f"{hashlib.blake2b(repr(parameters).encode(), digest_size=16).hexdigest()}.npz"
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                return decode_result(stored)
+        except (FileNotFoundError, EOFError, KeyError, ValueError):
+            pass
+        
+        value = compute()
+        arrays = encode_result(value)
+        
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.tmp-{os.getpid()}-{threading.get_ident()}')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        
+        self._prune(directory)
+        return value
+    
+    def clear(self):
+        """Remove every cached entry"""
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._lock:
+            self._pruned.clear()
+    
+    def _key(self, data_key):
+        return f"{data_key}-{code_version()[:16]}"
+    
+    def _prune(self, directory):
+        """Remove the entries of the same name built from other data or code, once per version"""
+        with self._lock:
+            if directory in self._pruned:
+                return
+            self._pruned.add(directory)
+        
+        for sibling in directory.parent.iterdir():
+            if sibling != directory and '.tmp-' not in sibling.name:
+                shutil.rmtree(sibling, ignore_errors=True)
+
+def encode_result(value):
+    """
+    Arrays storing a result of plain data, for np.savez
+    
+    Plain data is None, bool, int, float, str, NumPy scalars and numeric
+    arrays, nested in dicts, lists and tuples. The structure is kept as JSON
+    (in the '__structure__' array) and every array as its own entry.
+    
+    Raises:
+        TypeError: For any other value (e.g. figures or arbitrary objects)
+    """
+    arrays = {}
+    
+    def encode(item):
+        if item is None or isinstance(item, (bool, int, float, str)):
+            return item
+        if isinstance(item, np.generic):
+            return encode(item.item())
+        if isinstance(item, np.ndarray):
+            if item.dtype.hasobject:
+                raise TypeError("Object arrays cannot be persisted")
+            name = f'array_{len(arrays)}'
+            arrays[name] = item
+            return {'array': name}
+        if isinstance(item, dict):
+            return {'dict': [[encode(key), encode(entry)] for key, entry in item.items()]}
+        if isinstance(item, (list, tuple)):
+            return {type(item).__name__: [encode(entry) for entry in item]}
+        raise TypeError(f"Cannot persist a result of type {type(item).__name__}")
+    
+    structure = json.dumps(encode(value))
+    arrays['__structure__'] = np.frombuffer(structure.encode(), dtype=np.uint8)
+    return arrays
+
+def decode_result(arrays):
+    """Result stored by encode_result, from the arrays of the .npz file"""
+    def decode(item):
+        if not isinstance(item, dict):
+            return item
+        kind, content = next(iter(item.items()))
+        if kind == 'array':
+            return arrays[content]
+        if kind == 'dict':
+            return {decode(key): decode(entry) for key, entry in content}
+        if kind == 'tuple':
+            return tuple(decode(entry) for entry in content)
+        return [decode(entry) for entry in content]
+    
+    return decode(json.loads(arrays['__structure__'].tobytes().decode()))
+
+def detached(value):
+    """
+    Copy of a cached value that can be modified without affecting the cache
+    
+    Containers are copied recursively; DataFrames and Series get a shallow
+    copy (copy-on-write, so their data is only copied if modified) and
+    arrays a read-only view. Other objects are deep-copied.
+    """
+    if isinstance(value, dict):
+        return {key: detached(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(detached(item) for item in value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if value is None or isinstance(value, (str, bytes, int, float, bool, np.generic)):
+        return value
+    return copy.deepcopy(value)
+
+_code_version = None
+
+def code_version():
+    """Hash of the source files of the package, changes with any code change"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.blake2b(digest_size=16)
+        for path in sorted(CODE_ROOT.rglob('*.py')):
+            digest.update(str(path.relative_to(CODE_ROOT)).encode())
+            digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+def canonical_filter(category=None, date_range=None, **filters):
+    """
+    Hashable, normalized form of a dashboard filter
+    
+    "All Categories" and None select the same rows, and a date range is
+    reduced to the whole days it covers, so equivalent filters share cache
+    entries.
+    """
+    if category == "All Categories":
+        category = None
+    if date_range is not None and len(date_range) != 2:
+        date_range = None
+    if date_range:
+        date_range = tuple(bound.isoformat() for bound in date_bounds(date_range))
+    
+    extra = tuple(sorted(
+        (column, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+        for column, value in filters.items()
+    ))
+    return (category, date_range) + extra
+
+# Results shared by all sessions of the process, and across restarts
+_result_cache = ResultCache()
+_disk_cache = DiskCache()
+
+def result_cache():
+    """Process-wide ResultCache used by cached_result"""
+    return _result_cache
+
+def disk_cache():
+    """Process-wide DiskCache used by cached_result and the metrics cube"""
+    return _disk_cache
+
+def cached_result(name, compute, category=None, date_range=None, persist=False, **filters):
+    """
+    Result of compute() for a filter of the shared dataset, cached across sessions
+    
+    Entries are keyed by the result name, the version of the loaded data and
+    the canonical filter, so they are never served for other data.
+    
+    Args:
+        name: Name of the result (e.g. 'overview', 'conversion_chart')
+        compute: Callable without arguments computing the result
+        category, date_range, **filters: Filter the result depends on
+        persist: Also keep the result in the DiskCache, for restarts (plain
+            data only, see encode_result)
+    """
+    source = shared_data_source()
+    source.get()
+    parameters = canonical_filter(category, date_range, **filters)
+    
+    if persist:
+        compute_once = compute
+        compute = lambda: _disk_cache.result(name, source.fingerprint, parameters, compute_once)
+    
+    return _result_cache.get_or_compute((name, source.version, parameters), compute)
@@ -3,71 +3,129 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-from src.data_processing import load_data, filter_data
-from src.visualization import (
-    create_conversion_chart, 
-    create_return_rate_chart, 
-    create_satisfaction_chart
-)
-from src.metrics.conversion_rates import calculate_conversion_metrics
-from src.metrics.return_rates import calculate_return_metrics, calculate_return_cost_savings
-from src.metrics.satisfaction import calculate_satisfaction_metrics
-from src.metrics.ab_testing import (
-    perform_conversion_ab_test, 
-    perform_return_rate_ab_test, 
-    perform_satisfaction_ab_test
-)
+from src.data_processing import shared_data_source
+from src.warmup import dashboard_chart, dashboard_overview
+from src.metrics.cube import load_metrics_cube
+from src.metrics.engine import CONTROL_GROUP
+from src.metrics.sampling import load_stratified_sample
 
-def Dashboard():
-    """Main dashboard component"""
+def Dashboard(context):
+    """
+    Main dashboard component
+    
+    Args:
+        context: context.DataContext of the rerun (data and global filter)
+    """
     st.title("FRINGUANT Size Recommendation Impact")
     st.markdown("### E-commerce Performance Dashboard")
     
-    # Load data
-    data = load_data()
-    
-    # Sidebar filters
-    st.sidebar.markdown("### Filters")
+    selected_category = context.category
+    kpi_range = context.date_range
     
-    # Category filter
-    categories = ['All Categories'] + list(data['product_category'].unique())
-    selected_category = st.sidebar.selectbox("Product Category", categories)
+    # KPI Cards Row
+    st.markdown("## Key Performance Indicators")
+    kpi_placeholder = st.empty()
     
-    # Date range filter
-    min_date = pd.to_datetime(data['date']).min().date()
-    max_date = pd.to_datetime(data['date']).max().date()
+    if not shared_data_source().has_derived('metrics_cube'):
+        # Placeholder while the cube builds: the cards first show estimates
+        # from the stratified sample, with standard errors, and are replaced
+        # in place once the build (which blocks this rerun) completes
+        from src.metrics.overview import overview_by_arm
+        
+        sample = load_stratified_sample()
+        errors = sample.standard_errors(kpi_range, selected_category)
+        with kpi_placeholder.container():
+            _arm_kpi_cards({
+                arm: (overview, None, errors)
+                for arm, overview in overview_by_arm(sample.query(kpi_range, selected_category)).items()
+            })
+        load_metrics_cube()
+    
+    # Calculate metrics, A/B test results and return cost savings of every
+    # arm from the pre-aggregated cube, independent of the number of rows;
+    # results are shared across sessions until the data changes, and
+    # precomputed for the standard filters by the warm-up
+    by_arm = dashboard_overview(selected_category, kpi_range)
+    
+    with kpi_placeholder.container():
+        _arm_kpi_cards({arm: (overview, intervals, None) for arm, (overview, intervals) in by_arm.items()})
     
-    date_range = st.sidebar.date_input(
-        "Date Range",
-        value=[min_date, max_date],
-        min_value=min_date,
-        max_value=max_date
-    )
+    # Charts
+    st.markdown("## Impact Analysis")
     
-    # Apply filters
-    if len(date_range) == 2:
-        filtered_data = filter_data(data, 
-                                   category=selected_category if selected_category != 'All Categories' else None,
-                                   date_range=date_range)
-    else:
-        filtered_data = filter_data(data, 
-                                   category=selected_category if selected_category != 'All Categories' else None)
+    # Conversion Rate Chart
+    st.plotly_chart(dashboard_chart('conversion_chart', selected_category, kpi_range), use_container_width=True)
     
-    # KPI Cards Row
-    st.markdown("## Key Performance Indicators")
+    # Return Rate Chart
+    st.plotly_chart(dashboard_chart('return_rate_chart', selected_category, kpi_range), use_container_width=True)
     
-    # Calculate metrics
-    conversion_metrics = calculate_conversion_metrics(filtered_data)
-    return_metrics = calculate_return_metrics(filtered_data)
-    satisfaction_metrics = calculate_satisfaction_metrics(filtered_data)
+    # Satisfaction Chart
+    st.plotly_chart(dashboard_chart('satisfaction_chart', selected_category, kpi_range), use_container_width=True)
     
-    # A/B test results
-    conversion_ab_test = perform_conversion_ab_test(filtered_data)
-    return_ab_test = perform_return_rate_ab_test(filtered_data)
-    satisfaction_ab_test = perform_satisfaction_ab_test(filtered_data)
+    # Summary Section
+    st.markdown("## Summary")
     
-    # Return cost savings
-    cost_savings = calculate_return_cost_savings(filtered_data)
+    impacts = "\n".join(_summary_lines(arm, overview, len(by_arm) > 1) for arm, (overview, _) in by_arm.items())
+    st.markdown(
+        f"""
+        The implementation of FRINGUANT's size recommendation technology has demonstrated significant positive impacts:
+
+{impacts}
+
+        These improvements directly translate to increased revenue, reduced operational costs, and enhanced customer experience.
+        """
+    )
+
+def _summary_lines(arm, overview, name_arm):
+    """Summary bullets of one arm against control, prefixed with the arm's name when there are several"""
+    prefix = f"{arm}: " if name_arm else ""
+    return "\n".join([
+        f"        - {prefix}**{overview['conversion']['overall']['improvement']:.1f}%** increase in overall conversion rate",
+        f"        - {prefix}**{overview['returns']['overall']['reduction']:.1f}%** reduction in product returns",
+        f"        - {prefix}**{overview['satisfaction']['overall']['improvement']:.1f}%** improvement in customer satisfaction scores",
+        f"        - {prefix}Estimated annual return processing cost savings of **${overview['cost_savings'] * 12:.2f}**"
+    ])
+
+def _arm_kpi_cards(by_arm):
+    """
+    KPI cards of every arm against control, one tab per arm when there are several
+    
+    Args:
+        by_arm: Arm -> (overview, intervals, errors), see _kpi_cards
+    """
+    if any(errors is not None for _, _, errors in by_arm.values()):
+        st.caption("Preview estimated from a stratified sample, refining to exact values...")
+    
+    if len(by_arm) == 1:
+        [(arm, (overview, intervals, errors))] = by_arm.items()
+        _kpi_cards(overview, arm, intervals, errors)
+        return
+    
+    for tab, (arm, (overview, intervals, errors)) in zip(st.tabs(list(by_arm)), by_arm.items()):
+        with tab:
+            _kpi_cards(overview, arm, intervals, errors)
+
+def _kpi_cards(overview, arm, intervals=None, errors=None):
+    """
+    KPI cards of the Performance Overview
+    
+    Args:
+        overview: Output of metrics.overview.overview_metrics_from_summary
+        arm: Name of the arm compared against control
+        intervals: Bootstrap intervals of the lifts (exact results)
+        errors: Standard errors of the rates per test group (sampled preview)
+    """
+    if errors is not None:
+        detail = {
+            'relative_lift': _standard_error_line(errors['conversion_rate'], '%', arm),
+            'relative_reduction': _standard_error_line(errors['return_rate'], '%', arm),
+            'relative_improvement': _standard_error_line(errors['satisfaction'], '', arm)
+        }
+    else:
+        detail = {
+            key: _interval_line(intervals[key])
+            for key in ('relative_lift', 'relative_reduction', 'relative_improvement')
+        }
     
     # Create columns for KPI cards
     col1, col2, col3, col4 = st.columns(4)
@@ -77,10 +135,11 @@ def Dashboard():
             f"""
             <div class="data-card">
                 <h3>Conversion Rate</h3>
-                <p>With Size Recommendation: {conversion_metrics['overall']['recommendation']:.2f}%</p>
-                <p>Without: {conversion_metrics['overall']['control']:.2f}%</p>
-                <p class="positive-change">+{conversion_metrics['overall']['improvement']:.2f}% Increase</p>
-                <p>Confidence: {conversion_ab_test['confidence']:.1f}%</p>
+                <p>With {arm}: {overview['conversion']['overall']['recommendation']:.2f}%</p>
+                <p>Without: {overview['conversion']['overall']['control']:.2f}%</p>
+                <p class="positive-change">+{overview['conversion']['overall']['improvement']:.2f}% Increase</p>
+                {detail['relative_lift']}
+                <p>Confidence: {overview['conversion_test']['confidence']:.1f}%</p>
             </div>
             """, 
             unsafe_allow_html=True
@@ -91,10 +150,11 @@ def Dashboard():
             f"""
             <div class="data-card">
                 <h3>Return Rate</h3>
-                <p>With Size Recommendation: {return_metrics['overall']['recommendation']:.2f}%</p>
-                <p>Without: {return_metrics['overall']['control']:.2f}%</p>
-                <p class="positive-change">-{return_metrics['overall']['reduction']:.2f}% Reduction</p>
-                <p>Confidence: {return_ab_test['confidence']:.1f}%</p>
+                <p>With {arm}: {overview['returns']['overall']['recommendation']:.2f}%</p>
+                <p>Without: {overview['returns']['overall']['control']:.2f}%</p>
+                <p class="positive-change">-{overview['returns']['overall']['reduction']:.2f}% Reduction</p>
+                {detail['relative_reduction']}
+                <p>Confidence: {overview['return_test']['confidence']:.1f}%</p>
             </div>
             """, 
             unsafe_allow_html=True
@@ -105,10 +165,11 @@ def Dashboard():
             f"""
             <div class="data-card">
                 <h3>Customer Satisfaction</h3>
-                <p>With Size Recommendation: {satisfaction_metrics['overall']['recommendation']:.2f}/10</p>
-                <p>Without: {satisfaction_metrics['overall']['control']:.2f}/10</p>
-                <p class="positive-change">+{satisfaction_metrics['overall']['improvement']:.2f}% Improvement</p>
-                <p>Confidence: {satisfaction_ab_test['confidence']:.1f}%</p>
+                <p>With {arm}: {overview['satisfaction']['overall']['recommendation']:.2f}/10</p>
+                <p>Without: {overview['satisfaction']['overall']['control']:.2f}/10</p>
+                <p class="positive-change">+{overview['satisfaction']['overall']['improvement']:.2f}% Improvement</p>
+                {detail['relative_improvement']}
+                <p>Confidence: {overview['satisfaction_test']['confidence']:.1f}%</p>
             </div>
             """, 
             unsafe_allow_html=True
@@ -119,38 +180,22 @@ def Dashboard():
             f"""
             <div class="data-card">
                 <h3>Return Cost Savings</h3>
-                <p>Estimated Savings: ${cost_savings:.2f}</p>
+                <p>Estimated Savings: ${overview['cost_savings']:.2f}</p>
                 <p>Based on $15 average return cost</p>
-                <p class="positive-change">Projected Annual: ${cost_savings * 12:.2f}</p>
+                <p class="positive-change">Projected Annual: ${overview['cost_savings'] * 12:.2f}</p>
             </div>
             """, 
             unsafe_allow_html=True
         )
-    
-    # Charts
-    st.markdown("## Impact Analysis")
-    
-    # Conversion Rate Chart
-    st.plotly_chart(create_conversion_chart(filtered_data), use_container_width=True)
-    
-    # Return Rate Chart
-    st.plotly_chart(create_return_rate_chart(filtered_data), use_container_width=True)
-    
-    # Satisfaction Chart
-    st.plotly_chart(create_satisfaction_chart(filtered_data), use_container_width=True)
-    
-    # Summary Section
-    st.markdown("## Summary")
-    
-    st.markdown(
-        f"""
-        The implementation of FRINGUANT's size recommendation technology has demonstrated significant positive impacts:
-        
-        - **{conversion_metrics['overall']['improvement']:.1f}%** increase in overall conversion rate
-        - **{return_metrics['overall']['reduction']:.1f}%** reduction in product returns
-        - **{satisfaction_metrics['overall']['improvement']:.1f}%** improvement in customer satisfaction scores
-        - Estimated annual return processing cost savings of **${cost_savings * 12:.2f}**
-        
-        These improvements directly translate to increased revenue, reduced operational costs, and enhanced customer experience.
-        """
-    )
\ No newline at end of file
+
+def _interval_line(interval):
+    """Bootstrap interval of a lift as a card line, empty if undefined (e.g. an empty arm)"""
+    if not (np.isfinite(interval['ci_low']) and np.isfinite(interval['ci_high'])):
+        return ""
+    return f"<p>95% CI: {interval['ci_low']:.2f}% to {interval['ci_high']:.2f}%</p>"
+
+def _standard_error_line(errors, unit, arm):
+    """Standard errors of the arm's and the control rates as a card line"""
+    control = errors.get(CONTROL_GROUP, 0)
+    treatment = errors.get(arm, 0)
+    return f"<p>Std. error: ±{treatment:.2f}{unit} / ±{control:.2f}{unit}</p>"
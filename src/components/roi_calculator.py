@@ -2,24 +2,28 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
-from src.data_processing import load_data
 from src.visualization import create_roi_chart
-from src.metrics.conversion_rates import calculate_conversion_metrics
-from src.metrics.return_rates import calculate_return_metrics
+from src.metrics.conversion_rates import conversion_metrics_from_summary
+from src.metrics.return_rates import return_metrics_from_summary
 
-def ROICalculator():
-    """ROI Calculator component"""
+def ROICalculator(context):
+    """
+    ROI Calculator component
+    
+    Args:
+        context: context.DataContext of the rerun; the defaults cover the
+            whole dataset, whatever its filter
+    """
     st.title("ROI Calculator")
     st.markdown("### Estimate the financial impact of size recommendations")
     
-    # Load data to get default values
-    data = load_data()
-    conversion_metrics = calculate_conversion_metrics(data)
-    return_metrics = calculate_return_metrics(data)
-    
-    # Get default improvement values
-    default_conversion_increase = conversion_metrics['overall']['improvement']
-    default_return_reduction = return_metrics['overall']['reduction']
+    # Default improvement values from the whole dataset, computed once per
+    # data version and shared across sessions and slider reruns
+    default_conversion_increase, default_return_reduction = context.cached(
+        'roi_defaults',
+        lambda: _default_improvements(context.cube),
+        filtered=False
+    )
     
     # Create input form
     st.markdown("## Business Parameters")
@@ -177,4 +181,12 @@ def ROICalculator():
         
         {roi_assessment}
         """
-    )
\ No newline at end of file
+    )
+
+def _default_improvements(cube):
+    """(conversion increase, return reduction) in percent over the whole dataset"""
+    summary = cube.query()
+    return (
+        conversion_metrics_from_summary(summary)['overall']['improvement'],
+        return_metrics_from_summary(summary)['overall']['reduction']
+    )
@@ -4,7 +4,7 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 
-from src.data_processing import load_data, filter_data
+from src.visualization import arm_color
 from src.metrics.conversion_rates import calculate_conversion_by_category
 from src.metrics.return_rates import calculate_return_by_category
 from src.metrics.satisfaction import calculate_satisfaction_by_category
@@ -19,32 +19,18 @@ COLORS = {
     'negative': '#e4a0a0'    # Muted red
 }
 
-def SegmentExplorer():
-    """Segment Explorer component for analyzing data across different product categories"""
+def SegmentExplorer(context):
+    """
+    Segment Explorer component for analyzing data across different product categories
+    
+    Args:
+        context: context.DataContext of the rerun; the breakdown covers its
+            date range, across all categories
+    """
     st.title("Segment Explorer")
     st.markdown("### Analyze performance across different product categories")
     
-    # Load data
-    data = load_data()
-    
-    # Date range filter
-    st.sidebar.markdown("### Time Period")
-    
-    min_date = pd.to_datetime(data['date']).min().date()
-    max_date = pd.to_datetime(data['date']).max().date()
-    
-    date_range = st.sidebar.date_input(
-        "Date Range",
-        value=[min_date, max_date],
-        min_value=min_date,
-        max_value=max_date
-    )
-    
-    # Apply date filter
-    if len(date_range) == 2:
-        filtered_data = filter_data(data, date_range=date_range)
-    else:
-        filtered_data = data.copy()
+    filtered_data = context.date_view
     
     # Calculate metrics by category
     conversion_by_category = calculate_conversion_by_category(filtered_data)
@@ -73,37 +59,40 @@ def SegmentExplorer():
         # Create conversion rate comparison chart
         fig = go.Figure()
         
-        categories = conversion_by_category['category']
+        # Control rates repeat for every arm
+        control = conversion_by_category.drop_duplicates('category')
         
         # Add bars for control group
         fig.add_trace(go.Bar(
-            x=categories,
-            y=conversion_by_category['control_conversion'],
+            x=control['category'],
+            y=control['control_conversion'],
             name='Without Size Recommendation',
-            marker_color=COLORS['secondary']
+            marker_color=arm_color(0)
         ))
         
-        # Add bars for recommendation group
-        fig.add_trace(go.Bar(
-            x=categories,
-            y=conversion_by_category['recommendation_conversion'],
-            name='With Size Recommendation',
-            marker_color=COLORS['primary']
-        ))
-        
-        # Add improvement annotations
-        for i, category in enumerate(categories):
-            control = conversion_by_category['control_conversion'].iloc[i]
-            recommendation = conversion_by_category['recommendation_conversion'].iloc[i]
-            improvement = conversion_by_category['improvement'].iloc[i]
+        for position, (arm, rows) in enumerate(conversion_by_category.groupby('arm', sort=False), start=1):
+            categories = rows['category']
+            
+            # Add bars for each recommendation group
+            fig.add_trace(go.Bar(
+                x=categories,
+                y=rows['recommendation_conversion'],
+                name=f'With {arm}',
+                marker_color=arm_color(position)
+            ))
             
-            fig.add_annotation(
-                x=category,
-                y=recommendation + 0.5,
-                text=f"+{improvement:.1f}%",
-                showarrow=False,
-                font=dict(color=COLORS['positive'])
-            )
+            # Add improvement annotations
+            for i, category in enumerate(categories):
+                recommendation = rows['recommendation_conversion'].iloc[i]
+                improvement = rows['improvement'].iloc[i]
+                
+                fig.add_annotation(
+                    x=category,
+                    y=recommendation + 0.5,
+                    text=f"+{improvement:.1f}%",
+                    showarrow=False,
+                    font=dict(color=COLORS['positive'])
+                )
         
         # Update layout
         fig.update_layout(
@@ -129,37 +118,40 @@ def SegmentExplorer():
         # Create return rate comparison chart
         fig = go.Figure()
         
-        categories = return_by_category['category']
+        # Control rates repeat for every arm
+        control = return_by_category.drop_duplicates('category')
         
         # Add bars for control group
         fig.add_trace(go.Bar(
-            x=categories,
-            y=return_by_category['control_return_rate'],
+            x=control['category'],
+            y=control['control_return_rate'],
             name='Without Size Recommendation',
-            marker_color=COLORS['secondary']
+            marker_color=arm_color(0)
         ))
         
-        # Add bars for recommendation group
-        fig.add_trace(go.Bar(
-            x=categories,
-            y=return_by_category['recommendation_return_rate'],
-            name='With Size Recommendation',
-            marker_color=COLORS['primary']
-        ))
-        
-        # Add reduction annotations
-        for i, category in enumerate(categories):
-            control = return_by_category['control_return_rate'].iloc[i]
-            recommendation = return_by_category['recommendation_return_rate'].iloc[i]
-            reduction = return_by_category['reduction'].iloc[i]
+        for position, (arm, rows) in enumerate(return_by_category.groupby('arm', sort=False), start=1):
+            categories = rows['category']
             
-            fig.add_annotation(
-                x=category,
-                y=recommendation + 0.5,
-                text=f"-{reduction:.1f}%",
-                showarrow=False,
-                font=dict(color=COLORS['positive'])
-            )
+            # Add bars for each recommendation group
+            fig.add_trace(go.Bar(
+                x=categories,
+                y=rows['recommendation_return_rate'],
+                name=f'With {arm}',
+                marker_color=arm_color(position)
+            ))
+            
+            # Add reduction annotations
+            for i, category in enumerate(categories):
+                recommendation = rows['recommendation_return_rate'].iloc[i]
+                reduction = rows['reduction'].iloc[i]
+                
+                fig.add_annotation(
+                    x=category,
+                    y=recommendation + 0.5,
+                    text=f"-{reduction:.1f}%",
+                    showarrow=False,
+                    font=dict(color=COLORS['positive'])
+                )
         
         # Update layout
         fig.update_layout(
@@ -185,37 +177,40 @@ def SegmentExplorer():
         # Create satisfaction score comparison chart
         fig = go.Figure()
         
-        categories = satisfaction_by_category['category']
+        # Control rates repeat for every arm
+        control = satisfaction_by_category.drop_duplicates('category')
         
         # Add bars for control group
         fig.add_trace(go.Bar(
-            x=categories,
-            y=satisfaction_by_category['control_satisfaction'],
+            x=control['category'],
+            y=control['control_satisfaction'],
             name='Without Size Recommendation',
-            marker_color=COLORS['secondary']
-        ))
-        
-        # Add bars for recommendation group
-        fig.add_trace(go.Bar(
-            x=categories,
-            y=satisfaction_by_category['recommendation_satisfaction'],
-            name='With Size Recommendation',
-            marker_color=COLORS['primary']
+            marker_color=arm_color(0)
         ))
         
-        # Add improvement annotations
-        for i, category in enumerate(categories):
-            control = satisfaction_by_category['control_satisfaction'].iloc[i]
-            recommendation = satisfaction_by_category['recommendation_satisfaction'].iloc[i]
-            improvement = satisfaction_by_category['improvement'].iloc[i]
+        for position, (arm, rows) in enumerate(satisfaction_by_category.groupby('arm', sort=False), start=1):
+            categories = rows['category']
+            
+            # Add bars for each recommendation group
+            fig.add_trace(go.Bar(
+                x=categories,
+                y=rows['recommendation_satisfaction'],
+                name=f'With {arm}',
+                marker_color=arm_color(position)
+            ))
             
-            fig.add_annotation(
-                x=category,
-                y=recommendation + 0.2,
-                text=f"+{improvement:.1f}%",
-                showarrow=False,
-                font=dict(color=COLORS['positive'])
-            )
+            # Add improvement annotations
+            for i, category in enumerate(categories):
+                recommendation = rows['recommendation_satisfaction'].iloc[i]
+                improvement = rows['improvement'].iloc[i]
+                
+                fig.add_annotation(
+                    x=category,
+                    y=recommendation + 0.2,
+                    text=f"+{improvement:.1f}%",
+                    showarrow=False,
+                    font=dict(color=COLORS['positive'])
+                )
         
         # Update layout
         fig.update_layout(
@@ -240,15 +235,16 @@ def SegmentExplorer():
     # Category comparison table
     st.markdown("## Category Comparison Table")
     
-    # Merge all category data
+    # Merge all category data, one row per category and arm
     merged_data = conversion_by_category.merge(
-        return_by_category, on='category'
+        return_by_category, on=['category', 'arm']
     ).merge(
-        satisfaction_by_category, on='category'
+        satisfaction_by_category, on=['category', 'arm'], suffixes=('', '_y')
     )
     
     # Select columns to display
     display_data = merged_data[['category', 
+                               'arm', 
                                'improvement', 
                                'reduction', 
                                'improvement_y']].copy()
@@ -256,18 +252,26 @@ def SegmentExplorer():
     # Rename columns
     display_data.columns = [
         'Product Category', 
+        'Arm', 
         'Conversion Rate Improvement (%)', 
         'Return Rate Reduction (%)', 
         'Satisfaction Improvement (%)'
     ]
     
     # Format numbers
-    for col in display_data.columns[1:]:
+    for col in display_data.columns[2:]:
         display_data[col] = display_data[col].round(1)
     
     # Sort by conversion improvement
     display_data = display_data.sort_values('Conversion Rate Improvement (%)', ascending=False)
     
+    # Name the arm only when several are compared against control
+    labels = display_data['Product Category'].astype(str)
+    if display_data['Arm'].nunique() > 1:
+        labels = labels + " (" + display_data['Arm'].astype(str) + ")"
+    else:
+        display_data = display_data.drop(columns='Arm')
+    
     # Display table
     st.dataframe(display_data, use_container_width=True)
     
@@ -275,15 +279,15 @@ def SegmentExplorer():
     st.markdown("## Category Insights")
     
     # Find best and worst performing categories
-    best_conversion_category = display_data.iloc[0]['Product Category']
+    best_conversion_category = labels.iloc[0]
     best_conversion_improvement = display_data.iloc[0]['Conversion Rate Improvement (%)']
     
     best_return_idx = display_data['Return Rate Reduction (%)'].idxmax()
-    best_return_category = display_data.loc[best_return_idx]['Product Category']
+    best_return_category = labels.loc[best_return_idx]
     best_return_reduction = display_data.loc[best_return_idx]['Return Rate Reduction (%)']
     
     worst_conversion_idx = display_data['Conversion Rate Improvement (%)'].idxmin()
-    worst_conversion_category = display_data.loc[worst_conversion_idx]['Product Category']
+    worst_conversion_category = labels.loc[worst_conversion_idx]
     worst_conversion_improvement = display_data.loc[worst_conversion_idx]['Conversion Rate Improvement (%)']
     
     # Display insights
@@ -0,0 +1,102 @@
+from src.cache import cached_result
+from src.data_processing import filter_view, load_data
+from src.metrics.cube import load_metrics_cube
+
+class DataContext:
+    """
+    Data and global filter of one rerun, shared by every component of the page
+    
+    Created once per rerun by app.py and passed into the selected page, so
+    the dataset is loaded (or checked for changes) once, the filter is
+    resolved once, and components never render their own filters. The
+    filtered rows are a view over the shared dataset, built on first use;
+    aggregates come from the process-wide metrics cube and result cache.
+    
+    The views hold memory of the session's budget until release(), which
+    app.py calls at the end of the rerun by using the context as a context
+    manager.
+    """
+    
+    def __init__(self, data, category=None, date_range=None, budget=None):
+        """
+        Args:
+            data: Shared dataset, as returned by load_data
+            category: Selected product category, None or "All Categories" for all
+            date_range: (start date, end date) pair, both inclusive; None (or
+                an incomplete selection) for the whole range
+            budget: Optional indexing.MemoryBudget of the session
+        """
+        self.data = data
+        self.category = None if category == "All Categories" else category
+        self.date_range = tuple(date_range) if date_range is not None and len(date_range) == 2 else None
+        self.budget = budget
+        self._view = None
+        self._date_view = None
+    
+    @classmethod
+    def load(cls, category=None, date_range=None, budget=None):
+        """Context over the shared dataset (loaded on first use)"""
+        return cls(load_data(), category, date_range, budget)
+    
+    @property
+    def min_date(self):
+        return self.data['date'].min().date()
+    
+    @property
+    def max_date(self):
+        return self.data['date'].max().date()
+    
+    @property
+    def categories(self):
+        """Product categories of the dataset"""
+        return list(self.data['product_category'].unique())
+    
+    @property
+    def view(self):
+        """Rows matching the category and date range, as an indexing.DataView"""
+        if self._view is None:
+            self._view = filter_view(self.data, self.category, self.date_range, self.budget)
+        return self._view
+    
+    @property
+    def date_view(self):
+        """Rows in the date range of any category, e.g. for per-category breakdowns"""
+        if self._date_view is None:
+            if self.category is None:
+                self._date_view = self.view
+            else:
+                self._date_view = filter_view(self.data, date_range=self.date_range, budget=self.budget)
+        return self._date_view
+    
+    @property
+    def cube(self):
+        """metrics.cube.MetricsCube of the shared dataset"""
+        return load_metrics_cube()
+    
+    def release(self):
+        """Return the memory of the views to the budget and drop them"""
+        for view in (self._view, self._date_view):
+            if view is not None:
+                view.release()
+        self._view = None
+        self._date_view = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+    
+    def cached(self, name, compute, persist=False, filtered=True):
+        """
+        Result of compute() cached across sessions, see cache.cached_result
+        
+        Args:
+            name: Name of the result
+            compute: Callable without arguments computing the result
+            persist: Also keep the result on disk, for restarts
+            filtered: Whether the result depends on the filter of the context
+        """
+        if not filtered:
+            return cached_result(name, compute, persist=persist)
+        return cached_result(name, compute, category=self.category, date_range=self.date_range, persist=persist)
@@ -1,94 +1,306 @@
+import shutil
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
 
-def load_data():
-    """Load or generate data for the dashboard"""
-    processed_data_path = Path("data/processed/ecommerce_data.csv")
+from src.data_source import DataSource, content_hash
+from src.indexing import DataIndex, DataView, sort_by_date
+from src.storage import (
+    SCHEMA,
+    MANIFEST_NAME,
+    parquet_available,
+    read_columnar,
+    read_partitions,
+    read_processed_data,
+    read_samples,
+    read_sketches,
+    write_columnar,
+    write_partitions
+)
+
+# On-disk location of the processed dataset, partitioned by month
+PROCESSED_DATA_DIR = Path("data/processed")
+PARTITIONED_DATA_DIR = PROCESSED_DATA_DIR / "ecommerce_data"
+PARTITION_GRANULARITY = 'month'
+
+# Memory-mapped columnar copy of the whole dataset, one per content version,
+# mapped by every worker process of the host
+COLUMNAR_DATA_DIR = PROCESSED_DATA_DIR / "columnar"
+
+# Memory a session may hold in the gathered columns of its filtered views
+SESSION_MEMORY_BUDGET = 64 * 1024 ** 2
+
+# Single-file layouts written by earlier versions, migrated on first load
+LEGACY_PARQUET_PATH = PROCESSED_DATA_DIR / "ecommerce_data.parquet"
+LEGACY_CSV_PATH = PROCESSED_DATA_DIR / "ecommerce_data.csv"
+
+def storage_path():
+    """Path of the manifest backing the processed dataset"""
+    return PARTITIONED_DATA_DIR / MANIFEST_NAME
+
+def read_data():
+    """
+    Read or generate the processed dataset from disk
     
+    Data is stored as typed Parquet files, one per month, with rows sorted
+    by date and a manifest listing each partition's date bounds. Single-file
+    datasets left behind by earlier versions are migrated on first load.
+    """
     # Check if processed data exists
-    if processed_data_path.exists():
-        return pd.read_csv(processed_data_path)
+    if storage_path().exists():
+        return read_partitions(PARTITIONED_DATA_DIR)
+    
+    if parquet_available() and LEGACY_PARQUET_PATH.exists():
+        data = read_processed_data(LEGACY_PARQUET_PATH)
+    elif LEGACY_CSV_PATH.exists():
+        data = read_processed_data(LEGACY_CSV_PATH)
     else:
         # Generate sample data
         data = generate_sample_data()
-        
-        # Save processed data
-        processed_data_path.parent.mkdir(parents=True, exist_ok=True)
-        data.to_csv(processed_data_path, index=False)
-        
+    
+    # Save processed data
+    write_partitions(sort_by_date(data), PARTITIONED_DATA_DIR, PARTITION_GRANULARITY)
+    
+    return read_partitions(PARTITIONED_DATA_DIR)
+
+def read_shared_data():
+    """
+    Whole processed dataset, memory-mapped from its columnar copy
+    
+    The first process to read a version of the data writes the columnar
+    copy (keyed by the content hash of the manifest); every process then
+    maps the same files, so the operating system keeps one physical copy of
+    the columns for all workers of the host. Copies of older versions are
+    removed.
+    
+    Returns:
+        pd.DataFrame: Same rows as read_data(), with read-only columns
+    """
+    if not storage_path().exists():
+        read_data()
+    
+    directory = COLUMNAR_DATA_DIR / content_hash(storage_path())
+    try:
+        return read_columnar(directory)
+    except FileNotFoundError:
+        pass
+    
+    write_columnar(read_data(), directory)
+    for sibling in COLUMNAR_DATA_DIR.iterdir():
+        if sibling != directory and '.tmp-' not in sibling.name:
+            shutil.rmtree(sibling, ignore_errors=True)
+    
+    return read_columnar(directory)
+
+# Dataset shared by all sessions and components of the process, and mapped
+# from the same files by every process of the host
+_shared_source = DataSource(read_shared_data, storage_path, build_index=DataIndex)
+
+def shared_data_source():
+    """Process-wide DataSource backing load_data"""
+    return _shared_source
+
+def load_data(date_range=None):
+    """
+    Load or generate data for the dashboard
+    
+    The dataset is read once per process and shared by every session; it is
+    re-read only when the underlying files change. Rows are sorted by date.
+    The returned frame is shared and must not be modified in place.
+    
+    With a date_range, the rows are sliced from the shared dataset with the
+    date index. The dataset is memory-mapped (see read_shared_data), so only
+    the pages of the selected rows are read from disk.
+    """
+    data = _shared_source.get()
+    if date_range is None:
         return data
+    
+    return filter_data(data, date_range=date_range)
+
+def load_sketches(date_range=None):
+    """
+    Load the sketches maintained at ingestion (distinct users and products,
+    satisfaction quantiles, per-product purchases and returns)
+    
+    Only the per-partition sketch files are read, never the rows, so memory
+    stays bounded whatever the size of the dataset. With a date_range the
+    partitions overlapping it are merged (whole months).
+    
+    Returns:
+        sketches.DatasetSketches
+    """
+    if not storage_path().exists():
+        read_data()
+    
+    bounds = date_bounds(date_range) if date_range else (None, None)
+    return read_sketches(PARTITIONED_DATA_DIR, *bounds)
+
+def load_samples():
+    """
+    Load the stratified sample drawn at ingestion (see storage.sample_strata)
+    
+    Only the per-partition sample files are read, a few hundred rows per
+    day of data whatever the size of the dataset.
+    
+    Returns:
+        pd.DataFrame: Sampled rows with the size of their stratum
+    """
+    if not storage_path().exists():
+        read_data()
+    
+    return read_samples(PARTITIONED_DATA_DIR)
+
+# A/B test groups and the behaviour simulated for each of them
+GROUPS = ['Control', 'Size Recommendation']
+PURCHASE_PROBABILITY = {'Control': 0.6, 'Size Recommendation': 0.75}  # P(purchase | added to cart)
+RETURN_PROBABILITY = {'Control': 0.2, 'Size Recommendation': 0.08}    # P(return | purchased)
+SATISFACTION_RANGE = {'Control': (7, 10), 'Size Recommendation': (8, 11)}  # Kept purchases, [low, high)
+RETURNED_SATISFACTION_RANGE = (1, 6)  # Returned items have lower satisfaction
+
+# Product categories
+CATEGORIES = ['Tops', 'Bottoms', 'Dresses', 'Outerwear', 'Activewear']
 
-def generate_sample_data(n_samples=1000):
-    """Generate sample e-commerce data for demonstration"""
-    np.random.seed(42)  # For reproducibility
+# Rows generated per block, bounds temporary memory for very large samples
+GENERATION_CHUNK_SIZE = 1_000_000
+
+def generate_sample_data(n_samples=1000, seed=42):
+    """
+    Generate sample e-commerce data for demonstration
+    
+    Every column is drawn with vectorized NumPy calls over blocks of
+    GENERATION_CHUNK_SIZE rows, so generation time grows linearly with
+    n_samples and stays usable for load tests with tens of millions of rows.
+    
+    Args:
+        n_samples: Number of rows to generate
+        seed: Seed for the random generator, for reproducibility
+    
+    Returns:
+        pd.DataFrame: Sample data with one row per product view
+    """
+    rng = np.random.default_rng(seed)
     
-    # Date range for the past year
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-    date_range = pd.date_range(start=start_date, end=end_date, periods=n_samples)
+    # Date range for the past year, sampled on n_samples evenly spaced points
+    end_date = pd.Timestamp(datetime.now())
+    start_date = end_date - pd.Timedelta(days=365)
+    step_ns = (end_date - start_date).value // max(n_samples - 1, 1)
     
-    # Product categories
-    categories = ['Tops', 'Bottoms', 'Dresses', 'Outerwear', 'Activewear']
+    # Per-group lookup tables, indexed by test group code
+    purchase_p = np.array([PURCHASE_PROBABILITY[g] for g in GROUPS])
+    return_p = np.array([RETURN_PROBABILITY[g] for g in GROUPS])
+    satisfaction_low = np.array([SATISFACTION_RANGE[g][0] for g in GROUPS], dtype=np.uint8)
+    satisfaction_high = np.array([SATISFACTION_RANGE[g][1] for g in GROUPS], dtype=np.uint8)
     
-    # A/B test groups
-    groups = ['Control', 'Size Recommendation']
+    # Output columns, filled block by block
+    dates = np.empty(n_samples, dtype='int64')
+    product_ids = np.empty(n_samples, dtype=np.int32)
+    category_codes = np.empty(n_samples, dtype=np.int8)
+    group_codes = np.empty(n_samples, dtype=np.int8)
+    added_to_cart = np.empty(n_samples, dtype=np.int8)
+    purchased = np.empty(n_samples, dtype=np.int8)
+    returned = np.empty(n_samples, dtype=np.int8)
+    satisfaction = np.empty(n_samples, dtype=np.uint8)
+    
+    for lo in range(0, n_samples, GENERATION_CHUNK_SIZE):
+        hi = min(lo + GENERATION_CHUNK_SIZE, n_samples)
+        size = hi - lo
+        
+        dates[lo:hi] = start_date.value + rng.integers(0, n_samples, size) * step_ns
+        product_ids[lo:hi] = rng.integers(1000, 10000, size)
+        category_codes[lo:hi] = rng.integers(0, len(CATEGORIES), size)
+        groups = rng.integers(0, len(GROUPS), size)
+        group_codes[lo:hi] = groups
+        
+        # Purchase probability higher with size recommendation
+        cart = rng.random(size) < 0.6
+        bought = cart & (rng.random(size) < purchase_p[groups])
+        
+        # Return probability lower with size recommendation
+        back = bought & (rng.random(size) < return_p[groups])
+        
+        # Satisfaction score higher with size recommendation and no returns
+        low = np.where(back, RETURNED_SATISFACTION_RANGE[0], satisfaction_low[groups])
+        high = np.where(back, RETURNED_SATISFACTION_RANGE[1], satisfaction_high[groups])
+        scores = rng.integers(low, high, dtype=np.uint8)
+        
+        added_to_cart[lo:hi] = cart
+        purchased[lo:hi] = bought
+        returned[lo:hi] = back
+        satisfaction[lo:hi] = np.where(bought, scores, 0)
     
     # Sample data structure
     data = {
-        'date': np.random.choice(date_range, n_samples),
+        'date': dates.view(SCHEMA['date']),
         'user_id': np.arange(1, n_samples + 1),
-        'product_id': np.random.randint(1000, 10000, n_samples),
-        'product_category': np.random.choice(categories, n_samples),
-        'test_group': np.random.choice(groups, n_samples),
-        'viewed': np.ones(n_samples),  # All products were viewed
-        'added_to_cart': np.random.choice([0, 1], n_samples, p=[0.4, 0.6]),
-        'purchased': np.zeros(n_samples),  # Will be filled conditionally
-        'returned': np.zeros(n_samples),   # Will be filled conditionally
-        'satisfaction_score': np.zeros(n_samples)  # Will be filled conditionally
+        'product_id': product_ids,
+        'product_category': pd.Categorical.from_codes(category_codes, CATEGORIES),
+        'test_group': pd.Categorical.from_codes(group_codes, GROUPS),
+        'viewed': np.ones(n_samples, dtype=np.int8),  # All products were viewed
+        'added_to_cart': added_to_cart,
+        'purchased': purchased,
+        'returned': returned,
+        'satisfaction_score': satisfaction
     }
     
-    # Create a DataFrame
-    df = pd.DataFrame(data)
+    return pd.DataFrame(data)
+
+def date_bounds(date_range):
+    """(inclusive start, exclusive end) timestamps covering whole days of date_range"""
+    start_date, end_date = date_range
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    return start, end
+
+def filter_view(df, category=None, date_range=None, budget=None, **filters):
+    """
+    Rows of df matching a category, date range (both ends inclusive) and
+    column filters, as a DataView that copies none of the columns
     
-    # Conditional probabilities
-    for i, row in df.iterrows():
-        # Purchase probability higher with size recommendation
-        if row['added_to_cart'] == 1:
-            if row['test_group'] == 'Control':
-                df.at[i, 'purchased'] = np.random.choice([0, 1], p=[0.4, 0.6])
-            else:  # Size Recommendation group
-                df.at[i, 'purchased'] = np.random.choice([0, 1], p=[0.25, 0.75])
-        
-        # Return probability lower with size recommendation
-        if row['purchased'] == 1:
-            if row['test_group'] == 'Control':
-                df.at[i, 'returned'] = np.random.choice([0, 1], p=[0.8, 0.2])
-            else:  # Size Recommendation group
-                df.at[i, 'returned'] = np.random.choice([0, 1], p=[0.92, 0.08])
-            
-            # Satisfaction score higher with size recommendation and no returns
-            if row['returned'] == 0:
-                if row['test_group'] == 'Control':
-                    df.at[i, 'satisfaction_score'] = np.random.randint(7, 10)
-                else:  # Size Recommendation group
-                    df.at[i, 'satisfaction_score'] = np.random.randint(8, 11)
-            else:  # Returned items have lower satisfaction
-                df.at[i, 'satisfaction_score'] = np.random.randint(1, 6)
-    
-    return df
-
-def filter_data(df, category=None, date_range=None):
-    """Filter data based on category and date range"""
-    filtered_df = df.copy()
+    On the frame returned by load_data the date range is resolved with the
+    sorted date index and the column filters with bitmap indexes; other
+    frames are scanned once into a boolean mask.
+    
+    Args:
+        df: DataFrame with e-commerce data
+        category, date_range, **filters: As in filter_data
+        budget: Optional indexing.MemoryBudget of the session using the view
     
+    Returns:
+        indexing.DataView: Accepted by the metric functions in place of a DataFrame
+    """
     if category and category != "All Categories":
-        filtered_df = filtered_df[filtered_df['product_category'] == category]
+        filters['product_category'] = category
+    
+    index = _shared_source.index_for(df)
+    
+    if index is not None and all(column in index.bitmaps for column in filters):
+        bounds = date_bounds(date_range) if date_range else (None, None)
+        return DataView(df, index.select(*bounds, **filters), budget)
+    
+    mask = np.ones(len(df), dtype=bool)
+    
+    for column, value in filters.items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        mask &= df[column].isin(values).to_numpy()
     
     if date_range:
-        start_date, end_date = date_range
-        filtered_df = filtered_df[(filtered_df['date'] >= start_date) & 
-                                 (filtered_df['date'] <= end_date)]
+        start, end = date_bounds(date_range)
+        mask &= ((df['date'] >= start) & (df['date'] < end)).to_numpy()
+    
+    return DataView.from_mask(df, mask, budget)
+
+def filter_data(df, category=None, date_range=None, **filters):
+    """
+    Filter data based on category and date range (both ends inclusive)
+    
+    Extra keyword arguments filter other columns, e.g. test_group='Control'
+    or test_group=['Control', 'Size Recommendation'].
     
-    return filtered_df
\ No newline at end of file
+    Only the selected rows are materialized (a date range alone on the
+    frame returned by load_data yields a slice sharing its columns); use
+    filter_view to pass a selection to the metric functions without
+    materializing it.
+    """
+    return filter_view(df, category, date_range, **filters).to_frame()
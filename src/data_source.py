@@ -0,0 +1,232 @@
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+# Loads attempted while the backing file keeps changing during the load
+LOAD_ATTEMPTS = 3
+
+class DataSource:
+    """
+    Process-wide memoized dataset
+    
+    The dataset is loaded once and the same DataFrame is handed to every
+    session and component of the process, so callers must treat it as
+    read-only. The backing file is checked on each access and the data is
+    reloaded only when its modification time or size changes (and, with
+    verify_hash, only when the content hash changes as well).
+    
+    An optional index built from the data on each load is kept alongside it
+    and handed out for that exact frame only; other derived structures
+    (aggregates, samples, ...) are memoized per loaded version via derived().
+    """
+    
+    def __init__(self, loader, path_fn, build_index=None, verify_hash=False):
+        """
+        Args:
+            loader: Callable returning the dataset as a DataFrame
+            path_fn: Callable returning the Path of the file backing the dataset
+            build_index: Optional callable building an index from the loaded data
+            verify_hash: Confirm an mtime/size change with a content hash
+                before reloading
+        """
+        self._loader = loader
+        self._path_fn = path_fn
+        self._build_index = build_index
+        self._verify_hash = verify_hash
+        self._lock = threading.RLock()
+        self._data = None
+        self._index = None
+        self._derived = {}
+        self._build_locks = {}
+        self._file_state = None
+        self._content_hash = None
+        self._fingerprint = None
+        self._listeners = []
+        self._hits = 0
+        self._misses = 0
+        self._last_load_seconds = 0.0
+    
+    def get(self):
+        """Return the dataset, loading it on first use or after the file changed"""
+        with self._lock:
+            if self._data is not None and not self._has_changed():
+                self._hits += 1
+                return self._data
+            
+            self._misses += 1
+            start = time.perf_counter()
+            path = Path(self._path_fn())
+            
+            # Stat the file around the load, so that a write during the load
+            # is never recorded as the state of the data that predates it
+            for _ in range(LOAD_ATTEMPTS):
+                before = _file_state(path)
+                data = self._loader()
+                loaded_hash = content_hash(path) if self._verify_hash else None
+                after = _file_state(path)
+                # The loader may have created the file (e.g. generated sample data)
+                settled = before is None or after == before
+                if settled:
+                    break
+            
+            self._data = data
+            self._index = self._build_index(self._data) if self._build_index else None
+            self._derived = {}
+            self._last_load_seconds = time.perf_counter() - start
+            
+            if settled:
+                self._file_state = after
+                self._content_hash = loaded_hash
+            else:
+                # Still changing: keep the state from before the load so the next access reloads
+                self._file_state = before
+                self._content_hash = None
+            self._fingerprint = self._content_hash
+            
+            for listener in self._listeners:
+                listener(self)
+            
+            return self._data
+    
+    def add_listener(self, listener):
+        """
+        Call listener(source) after every (re)load of the dataset
+        
+        Listeners run while the source is locked, so they should only
+        schedule work (e.g. on a thread pool), not access the data.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def derived(self, key, build):
+        """
+        Structure derived from the dataset, built once per loaded version
+        
+        Only one thread builds a given key at a time; the builds of other
+        keys and access to the dataset are not blocked meanwhile.
+        
+        Args:
+            key: Name under which the structure is memoized
+            build: Callable building the structure from the dataset
+        """
+        with self._lock:
+            data = self.get()
+            if key in self._derived:
+                return self._derived[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        
+        with build_lock:
+            with self._lock:
+                if self._data is data and key in self._derived:
+                    return self._derived[key]
+            
+            value = build(data)
+            with self._lock:
+                if self._data is data:
+                    self._derived[key] = value
+            return value
+    
+    def has_derived(self, key):
+        """Whether derived(key, ...) is built for the current data, i.e. would return without building"""
+        with self._lock:
+            return self.is_current() and key in self._derived
+    
+    def is_current(self):
+        """Whether the dataset is loaded and its backing file unchanged since"""
+        with self._lock:
+            return self._data is not None and not self._has_changed()
+    
+    def index_for(self, df):
+        """Index of the loaded dataset if df is that dataset, otherwise None"""
+        with self._lock:
+            if df is not None and df is self._data:
+                return self._index
+            return None
+    
+    def invalidate(self):
+        """Drop the memoized dataset so that the next access reloads it"""
+        with self._lock:
+            self._data = None
+            self._index = None
+            self._derived = {}
+            self._file_state = None
+            self._content_hash = None
+            self._fingerprint = None
+    
+    @property
+    def version(self):
+        """Identifier of the currently loaded data, changes whenever it is reloaded"""
+        with self._lock:
+            if self._content_hash is not None:
+                return self._content_hash
+            if self._file_state is None:
+                return None
+            return '{:x}-{:x}'.format(*self._file_state)
+    
+    @property
+    def fingerprint(self):
+        """
+        Content hash of the file backing the loaded data
+        
+        Unlike version, it is the same in every process and after restarts
+        as long as the content is unchanged, so it can key persistent caches.
+        """
+        with self._lock:
+            self.get()
+            if self._fingerprint is None:
+                self._fingerprint = content_hash(Path(self._path_fn()))
+            return self._fingerprint
+    
+    def stats(self):
+        """
+        Cache statistics for monitoring
+        
+        Returns:
+            dict: hits, misses, hit_rate and the duration of the last load
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total > 0 else 0,
+                'last_load_seconds': self._last_load_seconds,
+                'version': self.version
+            }
+    
+    def _has_changed(self):
+        """Check the backing file against the state recorded at load time"""
+        path = Path(self._path_fn())
+        state = _file_state(path)
+        if state == self._file_state:
+            return False
+        
+        if self._verify_hash and state is not None and self._content_hash is not None:
+            # Touched or rewritten with identical content: keep the data
+            current_hash = content_hash(path)
+            if current_hash == self._content_hash:
+                self._file_state = state
+                return False
+        
+        return True
+
+def _file_state(path):
+    """(mtime in ns, size in bytes) of a file, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def content_hash(path, chunk_size=1 << 20):
+    """BLAKE2 digest of a file's content, None if it does not exist"""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
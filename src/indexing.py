@@ -0,0 +1,284 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Dimensions that get a bitmap index by default
+INDEXED_DIMENSIONS = ('product_category', 'test_group')
+
+class Bitmap:
+    """
+    Set of row positions stored as packed bits (one bit per row)
+    
+    Bitmaps combine with & (AND), | (OR) and ~ (NOT) on the packed bytes,
+    eight rows per byte operation.
+    """
+    
+    def __init__(self, bits, length):
+        self.bits = bits
+        self.length = length
+    
+    @classmethod
+    def from_mask(cls, mask):
+        """Bitmap of the True positions of a boolean array"""
+        return cls(np.packbits(mask), len(mask))
+    
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.length)
+    
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.length)
+    
+    def __invert__(self):
+        # Padding bits past the end are masked out by to_mask/count
+        return Bitmap(~self.bits, self.length)
+    
+    def __len__(self):
+        return self.length
+    
+    def count(self):
+        """Number of rows in the set"""
+        return int(np.count_nonzero(self.to_mask()))
+    
+    def to_mask(self, start=0, stop=None):
+        """Boolean mask of the rows in [start, stop)"""
+        stop = self.length if stop is None else stop
+        byte_lo = start // 8
+        bits = np.unpackbits(self.bits[byte_lo:-(-stop // 8)])
+        offset = start - byte_lo * 8
+        return bits[offset:offset + stop - start].view(bool)
+    
+    def to_rows(self, start=0, stop=None):
+        """Sorted row positions of the set within [start, stop)"""
+        return start + np.flatnonzero(self.to_mask(start, stop))
+
+class DataIndex:
+    """
+    Row indexes over a dataset sorted by date
+    
+    Date ranges resolve to a contiguous block of rows with a binary search,
+    so a range filter costs O(log n) and yields a zero-copy slice of the
+    dataset instead of a full-column scan. Categorical dimensions get one
+    Bitmap per value, so equality filters on several dimensions combine
+    with bitwise AND/OR instead of rescanning the string columns.
+    """
+    
+    def __init__(self, df, dimensions=INDEXED_DIMENSIONS):
+        dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        self.dates = dates.view('int64')
+        if len(self.dates) > 1 and np.any(self.dates[1:] < self.dates[:-1]):
+            raise ValueError("DataIndex requires rows sorted by 'date'")
+        
+        self.bitmaps = {dimension: build_bitmaps(df[dimension]) for dimension in dimensions}
+    
+    def __len__(self):
+        return len(self.dates)
+    
+    def bitmap(self, dimension, values):
+        """
+        Rows whose dimension equals one of values
+        
+        Args:
+            dimension: Indexed column name
+            values: A single value or a list of values (combined with OR)
+        
+        Returns:
+            Bitmap: Matching rows, empty for values not present in the data
+        """
+        if dimension not in self.bitmaps:
+            raise KeyError(f"No bitmap index on '{dimension}'")
+        
+        if isinstance(values, (list, tuple, set, np.ndarray, pd.Index)):
+            values = list(values)
+        else:
+            values = [values]
+        
+        by_value = self.bitmaps[dimension]
+        if len(values) == 1 and values[0] in by_value:
+            return by_value[values[0]]
+        
+        result = Bitmap(np.zeros(-(-len(self) // 8), dtype=np.uint8), len(self))
+        for value in values:
+            if value in by_value:
+                result = result | by_value[value]
+        return result
+    
+    def select(self, start=None, end=None, **filters):
+        """
+        Rows matching a date range and equality filters on indexed dimensions
+        
+        Args:
+            start, end: Date bounds as in date_slice
+            **filters: dimension=value or dimension=[values]; dimensions are
+                combined with AND, values of one dimension with OR
+        
+        Returns:
+            slice or np.ndarray: A slice when only the date range applies,
+            otherwise the sorted row positions
+        """
+        rows = self.date_slice(start, end)
+        if not filters:
+            return rows
+        
+        # Combine only the bytes covering the date slice
+        byte_lo, byte_hi = rows.start // 8, -(-rows.stop // 8)
+        bits = None
+        for dimension, values in filters.items():
+            dimension_bits = self.bitmap(dimension, values).bits[byte_lo:byte_hi]
+            bits = dimension_bits if bits is None else bits & dimension_bits
+        
+        window = Bitmap(bits, rows.stop - byte_lo * 8)
+        return byte_lo * 8 + window.to_rows(rows.start - byte_lo * 8)
+    
+    def date_slice(self, start=None, end=None):
+        """
+        Rows with start <= date < end
+        
+        Args:
+            start: Inclusive lower bound (anything pd.Timestamp accepts), None for open
+            end: Exclusive upper bound, None for open
+        
+        Returns:
+            slice: Positional slice of the matching rows
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _to_ns(start), side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _to_ns(end), side='left'))
+        return slice(lo, max(lo, hi))
+
+def build_bitmaps(column):
+    """One Bitmap per distinct value of a column, keyed by value"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        values = column.cat.categories
+    else:
+        values, codes = np.unique(column.to_numpy(), return_inverse=True)
+    
+    return {
+        value: Bitmap.from_mask(codes == code)
+        for code, value in enumerate(values)
+    }
+
+class MemoryBudget:
+    """
+    Bytes a session may hold in the gathered columns of its DataViews
+    
+    Views reserve memory before keeping a gathered column; once the budget is
+    spent they recompute columns on access instead of keeping them, so the
+    memory of a session stays bounded whatever the number of its views.
+    """
+    
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+    
+    def reserve(self, nbytes):
+        """Reserve nbytes, False (and nothing reserved) if the budget would be exceeded"""
+        with self._lock:
+            if self.used_bytes + nbytes > self.limit_bytes:
+                return False
+            self.used_bytes += nbytes
+            return True
+    
+    def release(self, nbytes):
+        """Return nbytes reserved earlier"""
+        with self._lock:
+            self.used_bytes = max(0, self.used_bytes - nbytes)
+
+class DataView:
+    """
+    Rows of a shared frame, selected without copying it
+    
+    A view holds the frame and the positions of its rows (a slice or an
+    array of row positions). Columns are taken from the frame on access: a
+    slice yields views of the shared columns, positions gather only the
+    requested column. Metric functions read columns with view[column], so
+    they accept a DataView wherever they accept a DataFrame.
+    
+    Gathered columns are kept for reuse as long as the MemoryBudget of the
+    view allows, and recomputed otherwise. Their memory is returned to the
+    budget by release(), called explicitly or on leaving a with block:
+        
+        with DataView.from_mask(df, mask, budget) as view:
+            ...
+    """
+    
+    def __init__(self, df, rows=slice(None), budget=None):
+        """
+        Args:
+            df: Shared DataFrame, must not be modified while the view is used
+            rows: Slice or sorted array of row positions
+            budget: Optional MemoryBudget limiting the gathered columns kept
+        """
+        if isinstance(rows, slice):
+            rows = slice(*rows.indices(len(df)))
+        self.df = df
+        self.rows = rows
+        self.budget = budget
+        self._columns = {}
+        self._reserved = 0
+    
+    @classmethod
+    def from_mask(cls, df, mask, budget=None):
+        """View of the rows of df where a boolean mask is True"""
+        return cls(df, np.flatnonzero(mask), budget)
+    
+    @property
+    def columns(self):
+        return self.df.columns
+    
+    @property
+    def nbytes(self):
+        """Memory held by the view itself: row positions and gathered columns"""
+        positions = 0 if isinstance(self.rows, slice) else self.rows.nbytes
+        return positions + self._reserved
+    
+    def __len__(self):
+        if isinstance(self.rows, slice):
+            return len(range(self.rows.start, self.rows.stop, self.rows.step))
+        return len(self.rows)
+    
+    def __contains__(self, column):
+        return column in self.df.columns
+    
+    def __getitem__(self, column):
+        """Values of a column for the rows of the view, as a Series"""
+        if isinstance(self.rows, slice):
+            return self.df[column].iloc[self.rows]
+        
+        if column in self._columns:
+            return self._columns[column]
+        
+        values = self.df[column].iloc[self.rows]
+        nbytes = values.memory_usage(index=False, deep=False)
+        if self.budget is None or self.budget.reserve(nbytes):
+            self._columns[column] = values
+            self._reserved += nbytes
+        return values
+    
+    def to_frame(self):
+        """The rows of the view as a DataFrame (a copy, unless rows is a slice)"""
+        return self.df.iloc[self.rows]
+    
+    def release(self):
+        """Drop the gathered columns and return their memory to the budget"""
+        if self.budget is not None:
+            self.budget.release(self._reserved)
+        self._columns = {}
+        self._reserved = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+
+def sort_by_date(df):
+    """Return df with rows ordered by date (stable), unchanged if already sorted"""
+    if df['date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('date', kind='stable', ignore_index=True)
+
+def _to_ns(value):
+    """Timestamp as int64 nanoseconds, comparable with DataIndex.dates"""
+    return pd.Timestamp(value).as_unit('ns').value
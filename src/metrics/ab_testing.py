@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
-import scipy.stats as stats
+from scipy import special
+
+from src.metrics.engine import (
+    CONTROL_GROUP,
+    TREATMENT_GROUP,
+    arms,
+    compare_segments,
+    group_statistics,
+    safe_ratio,
+    safe_ratios,
+    summarize
+)
 
 def perform_conversion_ab_test(df):
     """
@@ -9,33 +20,45 @@ def perform_conversion_ab_test(df):
     Returns:
         dict: Dictionary containing A/B test results
     """
-    # Split data by test group
-    control_df = df[df['test_group'] == 'Control']
-    treatment_df = df[df['test_group'] == 'Size Recommendation']
+    return conversion_test_from_summary(summarize(df))
+
+def conversion_test_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Perform the conversion rate A/B test from per-group sufficient statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
+    
+    Returns:
+        dict: Dictionary containing A/B test results
+    """
+    control = group_statistics(summary, control)
+    treatment = group_statistics(summary, treatment)
     
     # Get conversion counts for each group
-    control_conversions = control_df['purchased'].sum()
-    control_trials = len(control_df)
+    control_conversions = control['purchases']
+    control_trials = control['rows']
     
-    treatment_conversions = treatment_df['purchased'].sum()
-    treatment_trials = len(treatment_df)
+    treatment_conversions = treatment['purchases']
+    treatment_trials = treatment['rows']
     
     # Calculate conversion rates
-    control_rate = control_conversions / control_trials if control_trials > 0 else 0
-    treatment_rate = treatment_conversions / treatment_trials if treatment_trials > 0 else 0
+    control_rate = safe_ratio(control_conversions, control_trials)
+    treatment_rate = safe_ratio(treatment_conversions, treatment_trials)
     
     # Perform z-test for proportions
     if control_trials > 0 and treatment_trials > 0:
-        z_stat, p_value = stats.proportions_ztest(
-            [treatment_conversions, control_conversions],
-            [treatment_trials, control_trials]
+        z_stat, p_value = proportions_ztest(
+            treatment_conversions, treatment_trials,
+            control_conversions, control_trials
         )
         
         # Determine statistical significance (alpha = 0.05)
         is_significant = p_value < 0.05
         
         # Calculate relative lift
-        relative_lift = ((treatment_rate - control_rate) / control_rate) * 100
+        relative_lift = safe_ratio(treatment_rate - control_rate, control_rate) * 100
     else:
         z_stat = 0
         p_value = 1
@@ -62,36 +85,46 @@ def perform_return_rate_ab_test(df):
     Returns:
         dict: Dictionary containing A/B test results
     """
-    # Filter only purchased items
-    purchased_df = df[df['purchased'] == 1]
+    return return_rate_test_from_summary(summarize(df))
+
+def return_rate_test_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Perform the return rate A/B test from per-group sufficient statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
     
-    # Split data by test group
-    control_df = purchased_df[purchased_df['test_group'] == 'Control']
-    treatment_df = purchased_df[purchased_df['test_group'] == 'Size Recommendation']
+    Returns:
+        dict: Dictionary containing A/B test results
+    """
+    # Only purchased items can be returned
+    control = group_statistics(summary, control)
+    treatment = group_statistics(summary, treatment)
     
     # Get return counts for each group
-    control_returns = control_df['returned'].sum()
-    control_trials = len(control_df)
+    control_returns = control['returns']
+    control_trials = control['purchases']
     
-    treatment_returns = treatment_df['returned'].sum()
-    treatment_trials = len(treatment_df)
+    treatment_returns = treatment['returns']
+    treatment_trials = treatment['purchases']
     
     # Calculate return rates
-    control_rate = control_returns / control_trials if control_trials > 0 else 0
-    treatment_rate = treatment_returns / treatment_trials if treatment_trials > 0 else 0
+    control_rate = safe_ratio(control_returns, control_trials)
+    treatment_rate = safe_ratio(treatment_returns, treatment_trials)
     
     # Perform z-test for proportions
     if control_trials > 0 and treatment_trials > 0:
-        z_stat, p_value = stats.proportions_ztest(
-            [treatment_returns, control_returns],
-            [treatment_trials, control_trials]
+        z_stat, p_value = proportions_ztest(
+            treatment_returns, treatment_trials,
+            control_returns, control_trials
         )
         
         # Determine statistical significance (alpha = 0.05)
         is_significant = p_value < 0.05
         
         # Calculate relative reduction
-        relative_reduction = ((control_rate - treatment_rate) / control_rate) * 100 if control_rate > 0 else 0
+        relative_reduction = safe_ratio(control_rate - treatment_rate, control_rate) * 100
     else:
         z_stat = 0
         p_value = 1
@@ -118,26 +151,39 @@ def perform_satisfaction_ab_test(df):
     Returns:
         dict: Dictionary containing A/B test results
     """
-    # Filter only purchased items with satisfaction scores
-    purchased_df = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+    return satisfaction_test_from_summary(summarize(df))
+
+def satisfaction_test_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Perform the satisfaction score A/B test from per-group sufficient statistics
     
-    # Split data by test group
-    control_scores = purchased_df[purchased_df['test_group'] == 'Control']['satisfaction_score']
-    treatment_scores = purchased_df[purchased_df['test_group'] == 'Size Recommendation']['satisfaction_score']
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
     
-    # Calculate mean scores
-    control_mean = control_scores.mean() if len(control_scores) > 0 else 0
-    treatment_mean = treatment_scores.mean() if len(treatment_scores) > 0 else 0
+    Returns:
+        dict: Dictionary containing A/B test results
+    """
+    # Only purchased items with satisfaction scores
+    control = group_statistics(summary, control)
+    treatment = group_statistics(summary, treatment)
+    
+    # Calculate mean scores and variances
+    control_mean, control_var = moments_from_sums(control['sat_n'], control['sat_sum'], control['sat_sumsq'])
+    treatment_mean, treatment_var = moments_from_sums(treatment['sat_n'], treatment['sat_sum'], treatment['sat_sumsq'])
     
     # Perform t-test for independent samples
-    if len(control_scores) > 0 and len(treatment_scores) > 0:
-        t_stat, p_value = stats.ttest_ind(treatment_scores, control_scores, equal_var=False)
+    if control['sat_n'] > 0 and treatment['sat_n'] > 0:
+        t_stat, p_value, _ = welch_ttest(
+            treatment_mean, treatment_var, treatment['sat_n'],
+            control_mean, control_var, control['sat_n']
+        )
         
         # Determine statistical significance (alpha = 0.05)
         is_significant = p_value < 0.05
         
         # Calculate relative improvement
-        relative_improvement = ((treatment_mean - control_mean) / control_mean) * 100 if control_mean > 0 else 0
+        relative_improvement = safe_ratio(treatment_mean - control_mean, control_mean) * 100
     else:
         t_stat = 0
         p_value = 1
@@ -155,4 +201,383 @@ def perform_satisfaction_ab_test(df):
         'confidence': (1 - p_value) * 100 if p_value < 1 else 0  # Confidence level
     }
     
-    return results
\ No newline at end of file
+    return results
+
+def proportions_ztest(count1, nobs1, count2, nobs2):
+    """
+    Two-sided z-test for the difference of two proportions (pooled variance)
+    
+    Operates on counts only, so it runs on cached aggregates; arguments may
+    be scalars or arrays (broadcast element-wise).
+    
+    Args:
+        count1, nobs1: Successes and trials of the first sample
+        count2, nobs2: Successes and trials of the second sample
+    
+    Returns:
+        tuple: (z statistic, p-value); (0, 1) where the test is undefined
+    """
+    count1, nobs1, count2, nobs2 = (np.asarray(value, dtype=np.float64)
+                                    for value in (count1, nobs1, count2, nobs2))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (count1 + count2) / (nobs1 + nobs2)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / nobs1 + 1 / nobs2))
+        z_stat = (count1 / nobs1 - count2 / nobs2) / se
+    
+    valid = (nobs1 > 0) & (nobs2 > 0) & (se > 0)
+    z_stat = np.where(valid, z_stat, 0.0)
+    p_value = np.where(valid, 2 * special.ndtr(-np.abs(z_stat)), 1.0)
+    
+    return _scalar_or_array(z_stat), _scalar_or_array(p_value)
+
+def chi_square_test(successes, trials):
+    """
+    Pearson chi-square test of equal proportions across k samples
+    
+    Tests the k x 2 contingency table (successes, failures) of the samples
+    for independence; with k = 2 it is equivalent to proportions_ztest.
+    
+    Args:
+        successes, trials: Arrays of counts, one entry per sample
+    
+    Returns:
+        tuple: (chi-square statistic, p-value, degrees of freedom);
+        (0, 1, 0) where fewer than 2 samples have trials
+    """
+    successes, trials = (np.asarray(value, dtype=np.float64) for value in (successes, trials))
+    observed = trials > 0
+    successes, trials = successes[observed], trials[observed]
+    dof = len(trials) - 1
+    
+    pooled = safe_ratio(successes.sum(), trials.sum())
+    if dof < 1 or pooled in (0, 1):
+        return 0.0, 1.0, max(dof, 0)
+    
+    expected_successes = trials * pooled
+    expected_failures = trials * (1 - pooled)
+    statistic = float(np.sum((successes - expected_successes) ** 2 / expected_successes
+                             + (successes - expected_successes) ** 2 / expected_failures))
+    
+    return statistic, float(special.chdtrc(dof, statistic)), dof
+
+def anova_test(mean, var, n):
+    """
+    One-way ANOVA F-test of equal means across k samples, from sample moments
+    
+    Args:
+        mean, var, n: Arrays of sample means, unbiased variances and sizes
+    
+    Returns:
+        tuple: (F statistic, p-value, (between, within) degrees of freedom);
+        (0, 1, (0, 0)) where the test is undefined
+    """
+    mean, var, n = (np.asarray(value, dtype=np.float64) for value in (mean, var, n))
+    observed = n > 0
+    mean, var, n = mean[observed], var[observed], n[observed]
+    dof_between, dof_within = len(n) - 1, n.sum() - len(n)
+    
+    if dof_between < 1 or dof_within < 1:
+        return 0.0, 1.0, (0, 0)
+    
+    grand_mean = np.sum(n * mean) / n.sum()
+    between = np.sum(n * (mean - grand_mean) ** 2) / dof_between
+    within = np.sum((n - 1) * var) / dof_within
+    if within == 0:
+        return 0.0, float(between == 0), (dof_between, int(dof_within))
+    
+    statistic = float(between / within)
+    return statistic, float(special.fdtrc(dof_between, dof_within, statistic)), (dof_between, int(dof_within))
+
+def welch_ttest(mean1, var1, n1, mean2, var2, n2):
+    """
+    Two-sided Welch t-test from sample moments
+    
+    Arguments may be scalars or arrays (broadcast element-wise).
+    
+    Args:
+        mean1, var1, n1: Mean, unbiased variance and size of the first sample
+        mean2, var2, n2: Mean, unbiased variance and size of the second sample
+    
+    Returns:
+        tuple: (t statistic, p-value, Welch-Satterthwaite degrees of freedom);
+        (0, 1, 0) where a sample has fewer than 2 observations
+    """
+    mean1, var1, n1, mean2, var2, n2 = (np.asarray(value, dtype=np.float64)
+                                        for value in (mean1, var1, n1, mean2, var2, n2))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se1, se2 = var1 / n1, var2 / n2
+        se = np.sqrt(se1 + se2)
+        t_stat = (mean1 - mean2) / se
+        dof = (se1 + se2) ** 2 / (se1 ** 2 / (n1 - 1) + se2 ** 2 / (n2 - 1))
+        p_value = 2 * special.stdtr(dof, -np.abs(t_stat))
+    
+    enough = (n1 >= 2) & (n2 >= 2)
+    constant = enough & (se == 0)  # No variance: any difference is certain
+    valid = enough & (se > 0)
+    
+    t_stat = np.where(valid, t_stat, 0.0)
+    dof = np.where(valid, dof, 0.0)
+    p_value = np.where(valid, p_value, np.where(constant & (mean1 != mean2), 0.0, 1.0))
+    
+    return _scalar_or_array(t_stat), _scalar_or_array(p_value), _scalar_or_array(dof)
+
+def moments_from_sums(n, total, total_sq):
+    """
+    Mean and unbiased variance from a count, a sum and a sum of squares
+    
+    Returns:
+        tuple: (mean, variance), 0 where undefined
+    """
+    n, total, total_sq = (np.asarray(value, dtype=np.float64) for value in (n, total, total_sq))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, total / n, 0.0)
+        variance = np.where(n > 1, (total_sq - n * mean ** 2) / (n - 1), 0.0)
+    
+    return _scalar_or_array(mean), _scalar_or_array(np.maximum(variance, 0.0))
+
+def merge_moments(n1, mean1, var1, n2, mean2, var2):
+    """
+    Combine the moments of two disjoint shards (parallel variance formula)
+    
+    Returns:
+        tuple: (n, mean, unbiased variance) of the union of both shards
+    """
+    n1, mean1, var1, n2, mean2, var2 = (np.asarray(value, dtype=np.float64)
+                                        for value in (n1, mean1, var1, n2, mean2, var2))
+    n = n1 + n2
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = mean2 - mean1
+        mean = np.where(n > 0, mean1 + delta * n2 / n, 0.0)
+        m2 = var1 * np.maximum(n1 - 1, 0) + var2 * np.maximum(n2 - 1, 0) + delta ** 2 * n1 * n2 / n
+        variance = np.where(n > 1, m2 / (n - 1), 0.0)
+    
+    return _scalar_or_array(n), _scalar_or_array(mean), _scalar_or_array(variance)
+
+def adjust_pvalues(p_values, method='fdr_bh'):
+    """
+    Adjust p-values for multiple comparisons
+    
+    Args:
+        p_values: Array of raw p-values
+        method: 'fdr_bh' (Benjamini-Hochberg false discovery rate), 'holm'
+            (Holm-Bonferroni family-wise error rate) or None for no adjustment
+    
+    Returns:
+        np.ndarray: Adjusted p-values, in the order of the input
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    m = len(p_values)
+    if method is None or m == 0:
+        return p_values.copy()
+    
+    order = np.argsort(p_values, kind='stable')
+    ranked = p_values[order]
+    rank = np.arange(1, m + 1)
+    
+    if method == 'fdr_bh':
+        adjusted = np.minimum.accumulate((ranked * m / rank)[::-1])[::-1]
+    elif method == 'holm':
+        adjusted = np.maximum.accumulate(ranked * (m - rank + 1))
+    else:
+        raise ValueError(f"Unknown p-value adjustment method: {method}")
+    
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+def batch_proportion_tests(control_successes, control_trials, treatment_successes, treatment_trials,
+                           alpha=0.05, correction='fdr_bh', index=None):
+    """
+    Two-proportion z-tests for many segments at once
+    
+    Args:
+        control_successes, control_trials: Arrays of control counts per segment
+        treatment_successes, treatment_trials: Arrays of treatment counts per segment
+        alpha: Significance level, also sets the confidence interval level
+        correction: Multiple-comparison adjustment passed to adjust_pvalues
+        index: Optional segment labels for the result
+    
+    Returns:
+        pd.DataFrame: One row per segment with both rates, their difference
+        (treatment - control) and its Wald confidence interval, the relative
+        lift (%), z statistic, raw and adjusted p-values and significance
+    """
+    control_successes, control_trials, treatment_successes, treatment_trials = (
+        np.asarray(value, dtype=np.float64)
+        for value in (control_successes, control_trials, treatment_successes, treatment_trials)
+    )
+    
+    control_rate = safe_ratios(control_successes, control_trials)
+    treatment_rate = safe_ratios(treatment_successes, treatment_trials)
+    difference = treatment_rate - control_rate
+    
+    # Unpooled standard error for the confidence interval of the difference
+    se = np.sqrt(safe_ratios(control_rate * (1 - control_rate), control_trials)
+                 + safe_ratios(treatment_rate * (1 - treatment_rate), treatment_trials))
+    margin = special.ndtri(1 - alpha / 2) * se
+    
+    z_stat, p_value = proportions_ztest(treatment_successes, treatment_trials,
+                                        control_successes, control_trials)
+    
+    return _batch_results(index, {
+        'control_rate': control_rate,
+        'treatment_rate': treatment_rate,
+        'difference': difference,
+        'ci_low': difference - margin,
+        'ci_high': difference + margin,
+        'relative_lift': safe_ratios(difference, control_rate) * 100,
+        'statistic': z_stat
+    }, np.atleast_1d(p_value), alpha, correction)
+
+def batch_mean_tests(control_mean, control_var, control_n, treatment_mean, treatment_var, treatment_n,
+                     alpha=0.05, correction='fdr_bh', index=None):
+    """
+    Welch t-tests for many segments at once, from per-segment moments
+    
+    Returns:
+        pd.DataFrame: One row per segment with both means, their difference
+        (treatment - control) and its Welch confidence interval, the relative
+        lift (%), t statistic, raw and adjusted p-values and significance
+    """
+    control_mean, treatment_mean = (np.asarray(value, dtype=np.float64) for value in (control_mean, treatment_mean))
+    
+    t_stat, p_value, dof = welch_ttest(treatment_mean, treatment_var, treatment_n,
+                                       control_mean, control_var, control_n)
+    difference = treatment_mean - control_mean
+    
+    se = np.sqrt(safe_ratios(treatment_var, treatment_n) + safe_ratios(control_var, control_n))
+    with np.errstate(invalid='ignore'):
+        quantile = np.where(np.asarray(dof) > 0, special.stdtrit(np.maximum(dof, 1e-12), 1 - alpha / 2), np.inf)
+    margin = np.where(se > 0, quantile * se, 0.0)
+    
+    return _batch_results(index, {
+        'control_mean': control_mean,
+        'treatment_mean': treatment_mean,
+        'difference': difference,
+        'ci_low': difference - margin,
+        'ci_high': difference + margin,
+        'relative_lift': safe_ratios(difference, control_mean) * 100,
+        'statistic': np.atleast_1d(t_stat)
+    }, np.atleast_1d(p_value), alpha, correction)
+
+def segment_ab_tests(df, dimension='product_category', metric='conversion', alpha=0.05, correction='fdr_bh'):
+    """
+    Run an A/B test in every segment of a dimension with one grouped pass
+    
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments (e.g. 'product_id')
+        metric: 'conversion', 'return_rate' or 'satisfaction'
+        alpha: Significance level
+        correction: Multiple-comparison adjustment passed to adjust_pvalues
+    
+    Returns:
+        pd.DataFrame: Batched test results of every arm against control,
+        indexed by (arm, segment); the correction covers all of them
+    """
+    control, by_arm = compare_segments(df, dimension)
+    
+    # One batch over every (arm, segment) pair
+    index = pd.MultiIndex.from_product([list(by_arm), control.index], names=['arm', dimension])
+    treatment = pd.concat(by_arm.values())
+    control = pd.concat([control] * len(by_arm))
+    
+    return _metric_tests(control, treatment, metric, alpha, correction, index)
+
+def perform_multi_arm_test(df, metric='conversion', alpha=0.05, correction='holm', control=CONTROL_GROUP):
+    """
+    Test every arm of the experiment found in test_group against each other
+    and against control
+    
+    Returns:
+        dict: See multi_arm_test_from_summary
+    """
+    return multi_arm_test_from_summary(summarize(df), metric, alpha, correction, control)
+
+def multi_arm_test_from_summary(summary, metric='conversion', alpha=0.05, correction='holm', control=CONTROL_GROUP):
+    """
+    Omnibus and pairwise-vs-control tests for N arms from per-group statistics
+    
+    The omnibus test is a chi-square test of equal proportions (conversion,
+    return_rate) or a one-way ANOVA (satisfaction) across all arms; the
+    pairwise tests compare each arm with control, adjusted for the number
+    of arms.
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        metric: 'conversion', 'return_rate' or 'satisfaction'
+        alpha: Significance level
+        correction: Multiple-comparison adjustment of the pairwise tests
+        control: Name of the control arm
+    
+    Returns:
+        dict: 'arms' (control first), omnibus 'statistic', 'p_value', 'dof'
+        and 'is_significant', and 'pairwise' test results indexed by arm
+        (as returned by batch_proportion_tests / batch_mean_tests)
+    """
+    names = arms(summary, control)
+    by_arm = summary.reindex(names)
+    
+    if metric == 'satisfaction':
+        mean, var = moments_from_sums(by_arm['sat_n'], by_arm['sat_sum'], by_arm['sat_sumsq'])
+        statistic, p_value, dof = anova_test(mean, var, by_arm['sat_n'])
+    elif metric in ('conversion', 'return_rate'):
+        successes, trials = _PROPORTION_COLUMNS[metric]
+        statistic, p_value, dof = chi_square_test(by_arm[successes], by_arm[trials])
+    else:
+        raise ValueError(f"Unknown metric: {metric}")
+    
+    # Each treatment arm against the control statistics (zeros if control is absent)
+    treatments = by_arm.drop(index=control, errors='ignore')
+    baseline = pd.DataFrame(
+        np.tile(group_statistics(summary, control).to_numpy(), (len(treatments), 1)),
+        index=treatments.index, columns=summary.columns
+    )
+    
+    return {
+        'arms': names,
+        'statistic': statistic,
+        'p_value': p_value,
+        'dof': dof,
+        'is_significant': p_value < alpha,
+        'pairwise': _metric_tests(baseline, treatments, metric, alpha, correction, treatments.index)
+    }
+
+# (successes, trials) statistics of the proportion metrics
+_PROPORTION_COLUMNS = {
+    'conversion': ('purchases', 'rows'),
+    'return_rate': ('returns', 'purchases')
+}
+
+def _metric_tests(control, treatment, metric, alpha, correction, index):
+    """Batched tests of a metric between aligned control and treatment statistics"""
+    if metric in _PROPORTION_COLUMNS:
+        successes, trials = _PROPORTION_COLUMNS[metric]
+        return batch_proportion_tests(control[successes], control[trials],
+                                      treatment[successes], treatment[trials],
+                                      alpha, correction, index=index)
+    if metric == 'satisfaction':
+        control_mean, control_var = moments_from_sums(control['sat_n'], control['sat_sum'], control['sat_sumsq'])
+        treatment_mean, treatment_var = moments_from_sums(treatment['sat_n'], treatment['sat_sum'], treatment['sat_sumsq'])
+        return batch_mean_tests(control_mean, control_var, control['sat_n'],
+                                treatment_mean, treatment_var, treatment['sat_n'],
+                                alpha, correction, index=index)
+    
+    raise ValueError(f"Unknown metric: {metric}")
+
+def _batch_results(index, columns, p_value, alpha, correction):
+    """Assemble batched test results with raw and adjusted p-values"""
+    p_adjusted = adjust_pvalues(p_value, correction)
+    results = pd.DataFrame(columns, index=index)
+    results['p_value'] = p_value
+    results['p_adjusted'] = p_adjusted
+    results['is_significant'] = p_adjusted < alpha
+    return results
+
+def _scalar_or_array(value):
+    """Python float for 0-d results, the array otherwise"""
+    return value.item() if np.ndim(value) == 0 else value
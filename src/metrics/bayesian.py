@@ -0,0 +1,139 @@
+import pandas as pd
+import numpy as np
+from scipy import special
+
+from src.metrics.engine import CONTROL_GROUP, STATISTICS
+
+# (successes, trials) statistics of the Beta-Binomial metrics, and whether a
+# higher rate is better
+BAYESIAN_METRICS = {
+    'conversion': ('purchases', 'rows', True),
+    'return_rate': ('returns', 'purchases', False)
+}
+
+# Uniform Beta(1, 1) prior on every rate
+DEFAULT_PRIOR = (1.0, 1.0)
+
+# Upper bound on the posterior draws held in memory at once (segments x arms x draws)
+MAX_DRAWS_PER_BATCH = 20_000_000
+
+def beta_posteriors(successes, trials, prior=DEFAULT_PRIOR):
+    """
+    Closed-form Beta posterior parameters of binomial rates
+    
+    Args:
+        successes, trials: Arrays of counts (any shape, broadcast together)
+        prior: (alpha, beta) of the Beta prior
+    
+    Returns:
+        tuple: (alpha, beta) arrays of the posteriors
+    """
+    successes, trials = (np.asarray(value, dtype=np.float64) for value in (successes, trials))
+    return prior[0] + successes, prior[1] + trials - successes
+
+def bayesian_proportion_tests(successes, trials, higher_is_better=True, prior=DEFAULT_PRIOR,
+                              n_draws=20000, credible_level=0.95, seed=0):
+    """
+    Posterior comparison of every arm with control, for many segments at once
+    
+    The posterior of each (segment, arm) rate is Beta(alpha + successes,
+    beta + failures). Posterior means and credible intervals are closed
+    form; the probability to beat control, the probability to be best and
+    the expected loss are estimated from Monte Carlo draws of all segments
+    and arms in one NumPy call.
+    
+    Args:
+        successes, trials: Arrays of shape (n_segments, n_arms), control in column 0
+        higher_is_better: False for rates to minimize (e.g. return rate)
+        prior: (alpha, beta) of the Beta prior
+        n_draws: Monte Carlo draws per posterior
+        credible_level: Level of the equal-tailed credible intervals
+        seed: Seed for reproducible draws
+    
+    Returns:
+        dict of arrays of shape (n_segments, n_arms): posterior_mean, ci_low,
+        ci_high, prob_beat_control (0.5 for control itself), prob_best and
+        expected_loss (expected shortfall, in rate units, of choosing the arm
+        instead of the best one)
+    """
+    alpha, beta = beta_posteriors(np.atleast_2d(successes), np.atleast_2d(trials), prior)
+    n_segments, n_arms = alpha.shape
+    tail = (1 - credible_level) / 2
+    
+    results = {
+        'posterior_mean': alpha / (alpha + beta),
+        'ci_low': special.betaincinv(alpha, beta, tail),
+        'ci_high': special.betaincinv(alpha, beta, 1 - tail),
+        'prob_beat_control': np.empty((n_segments, n_arms)),
+        'prob_best': np.empty((n_segments, n_arms)),
+        'expected_loss': np.empty((n_segments, n_arms))
+    }
+    
+    rng = np.random.default_rng(seed)
+    batch = max(1, MAX_DRAWS_PER_BATCH // (n_arms * n_draws))
+    for lo in range(0, n_segments, batch):
+        hi = min(lo + batch, n_segments)
+        
+        # Draws of every segment and arm, shape (segments, arms, n_draws),
+        # oriented so that larger is better
+        draws = rng.beta(alpha[lo:hi, :, None], beta[lo:hi, :, None], size=(hi - lo, n_arms, n_draws))
+        if not higher_is_better:
+            draws = -draws
+        
+        best = draws.max(axis=1, keepdims=True)
+        results['prob_beat_control'][lo:hi] = np.mean(draws > draws[:, :1], axis=2)
+        results['prob_best'][lo:hi] = np.mean(draws == best, axis=2)
+        results['expected_loss'][lo:hi] = np.mean(best - draws, axis=2)
+    
+    results['prob_beat_control'][:, 0] = 0.5
+    return results
+
+def bayesian_segment_tests(cube, metric='conversion', date_range=None, control=CONTROL_GROUP,
+                           prior=DEFAULT_PRIOR, n_draws=20000, credible_level=0.95, seed=0):
+    """
+    Bayesian A/B results for every product category x arm of a MetricsCube
+    
+    Results are memoized on the cube, so repeated queries for the same date
+    range and parameters are free until the data (and thus the cube) changes.
+    
+    Args:
+        cube: metrics.cube.MetricsCube
+        metric: 'conversion' or 'return_rate'
+        date_range: Optional (start date, end date) pair, both inclusive
+        control: Name of the control arm
+        prior, n_draws, credible_level, seed: As in bayesian_proportion_tests
+    
+    Returns:
+        pd.DataFrame: Indexed by (product_category, test_group), the
+        successes and trials of each segment and arm followed by the columns
+        of bayesian_proportion_tests
+    """
+    if metric not in BAYESIAN_METRICS:
+        raise ValueError(f"Unknown Bayesian metric: {metric}")
+    
+    key = ('bayesian', metric, cube.day_range(date_range), control, tuple(prior), n_draws, credible_level, seed)
+    return cube.memoized(key, lambda: _cube_tests(
+        cube, metric, date_range, control, prior, n_draws, credible_level, seed
+    ))
+
+def _cube_tests(cube, metric, date_range, control, prior, n_draws, credible_level, seed):
+    """Compute bayesian_segment_tests (unmemoized)"""
+    successes_column, trials_column, higher_is_better = BAYESIAN_METRICS[metric]
+    
+    # Arms as stored in the cube, control moved to column 0
+    order = np.argsort(cube.groups != control, kind='stable')
+    groups = cube.groups[order]
+    
+    totals = cube.segment_totals(date_range)[:, order]
+    successes = totals[..., STATISTICS.index(successes_column)]
+    trials = totals[..., STATISTICS.index(trials_column)]
+    
+    results = bayesian_proportion_tests(successes, trials, higher_is_better, prior,
+                                        n_draws, credible_level, seed)
+    
+    index = pd.MultiIndex.from_product([cube.categories, groups], names=['product_category', 'test_group'])
+    frame = pd.DataFrame({'successes': successes.ravel(), 'trials': trials.ravel()}, index=index)
+    for column, values in results.items():
+        frame[column] = values.ravel()
+    
+    return frame
@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import special
+
+from src.metrics.engine import CONTROL_GROUP, SCORE_BINS, TREATMENT_GROUP, group_statistics
+
+# Replicates are drawn in fixed-size chunks, each with its own seed spawned
+# from the caller's seed, so results do not depend on the number of workers
+CHUNK_SIZE = 2500
+
+# Lift statistics, in percent, of a treatment value t over a control value c
+LIFT_STATISTICS = {
+    'relative_lift': lambda c, t: (t - c) / c * 100,
+    'relative_reduction': lambda c, t: (c - t) / c * 100,
+    'relative_improvement': lambda c, t: (t - c) / c * 100
+}
+
+def bootstrap_proportion_lift(control_successes, control_trials, treatment_successes, treatment_trials,
+                              statistic='relative_lift', n_replicates=10000, confidence=0.95,
+                              method='bca', seed=0, n_jobs=1):
+    """
+    Bootstrap confidence interval of the lift between two proportions
+    
+    Uses the Poisson bootstrap on the aggregated counts: every observation
+    gets a Poisson(1) weight, so the resampled successes and failures of an
+    arm are Poisson(successes) and Poisson(failures). The cost depends only
+    on n_replicates, not on the number of rows behind the counts.
+    
+    Args:
+        control_successes, control_trials: Control group counts
+        treatment_successes, treatment_trials: Treatment group counts
+        statistic: 'relative_lift' or 'relative_reduction' (see LIFT_STATISTICS)
+        n_replicates: Number of bootstrap replicates
+        confidence: Confidence level of the interval
+        method: 'percentile' or 'bca' (bias-corrected and accelerated)
+        seed: Seed for reproducible replicates
+        n_jobs: Worker processes drawing replicates (None for all cores)
+    
+    Returns:
+        dict: estimate, ci_low, ci_high, std_error, method, n_replicates
+    """
+    counts = np.array([
+        control_successes, control_trials - control_successes,
+        treatment_successes, treatment_trials - treatment_successes
+    ], dtype=np.float64)
+    
+    estimate = _proportion_statistic(counts, statistic)
+    replicates = _draw_replicates('poisson', counts, statistic, n_replicates, seed, n_jobs)
+    
+    jackknife = None
+    if method == 'bca':
+        # Leave-one-out estimates: one value per kind of observation removed,
+        # weighted by how many observations of that kind there are
+        values = []
+        for position in range(4):
+            reduced = counts.copy()
+            reduced[position] -= 1
+            values.append(_proportion_statistic(reduced, statistic))
+        jackknife = (np.array(values), counts)
+    
+    return _interval(estimate, replicates, confidence, method, jackknife)
+
+def bootstrap_mean_lift(control_histogram, treatment_histogram, statistic='relative_improvement',
+                        n_replicates=10000, confidence=0.95, method='bca', seed=0, n_jobs=1):
+    """
+    Bootstrap confidence interval of the lift between two mean scores
+    
+    Uses the multinomial bootstrap on score histograms (counts per score
+    0, 1, 2, ...): each replicate redistributes an arm's n observations over
+    the scores in proportion to the observed histogram.
+    
+    Args:
+        control_histogram, treatment_histogram: Counts per score
+        statistic: 'relative_improvement' (see LIFT_STATISTICS)
+        n_replicates, confidence, method, seed, n_jobs: As in bootstrap_proportion_lift
+    
+    Returns:
+        dict: estimate, ci_low, ci_high, std_error, method, n_replicates
+    """
+    histograms = np.array([control_histogram, treatment_histogram], dtype=np.float64)
+    scores = np.arange(histograms.shape[1])
+    
+    estimate = _mean_statistic(histograms, statistic)
+    replicates = _draw_replicates('multinomial', histograms, statistic, n_replicates, seed, n_jobs)
+    
+    jackknife = None
+    if method == 'bca':
+        values, weights = [], []
+        for arm in range(2):
+            for score in scores[histograms[arm] > 0]:
+                reduced = histograms.copy()
+                reduced[arm, score] -= 1
+                values.append(_mean_statistic(reduced, statistic))
+                weights.append(histograms[arm, score])
+        jackknife = (np.array(values), np.array(weights))
+    
+    return _interval(estimate, replicates, confidence, method, jackknife)
+
+def bootstrap_overview_intervals(summary, n_replicates=10000, confidence=0.95, seed=0, n_jobs=1,
+                                 control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Bootstrap intervals of the Performance Overview lift metrics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
+    
+    Returns:
+        dict: Intervals keyed by 'relative_lift' (conversion),
+        'relative_reduction' (return rate) and 'relative_improvement'
+        (satisfaction)
+    """
+    control = group_statistics(summary, control)
+    treatment = group_statistics(summary, treatment)
+    options = dict(n_replicates=n_replicates, confidence=confidence, seed=seed, n_jobs=n_jobs)
+    
+    # Score 0 means "not rated"
+    control_histogram = np.array(control[SCORE_BINS], dtype=np.float64)
+    treatment_histogram = np.array(treatment[SCORE_BINS], dtype=np.float64)
+    control_histogram[0] = treatment_histogram[0] = 0
+    
+    return {
+        'relative_lift': bootstrap_proportion_lift(
+            control['purchases'], control['rows'], treatment['purchases'], treatment['rows'],
+            statistic='relative_lift', **options
+        ),
+        'relative_reduction': bootstrap_proportion_lift(
+            control['returns'], control['purchases'], treatment['returns'], treatment['purchases'],
+            statistic='relative_reduction', **options
+        ),
+        'relative_improvement': bootstrap_mean_lift(
+            control_histogram, treatment_histogram,
+            statistic='relative_improvement', **options
+        )
+    }
+
+def _proportion_statistic(counts, statistic):
+    """Lift statistic from (control successes, failures, treatment successes, failures), along axis 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        control = counts[0] / (counts[0] + counts[1])
+        treatment = counts[2] / (counts[2] + counts[3])
+        return LIFT_STATISTICS[statistic](control, treatment)
+
+def _mean_statistic(histograms, statistic):
+    """Lift statistic of the mean scores of (control, treatment) histograms, along axis 0"""
+    scores = np.arange(histograms.shape[-1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = (histograms @ scores) / histograms.sum(axis=-1)
+        return LIFT_STATISTICS[statistic](means[0], means[1])
+
+def _draw_replicates(kind, data, statistic, n_replicates, seed, n_jobs):
+    """Bootstrap replicates of the statistic, drawn in seeded chunks"""
+    sizes = [CHUNK_SIZE] * (n_replicates // CHUNK_SIZE)
+    if n_replicates % CHUNK_SIZE:
+        sizes.append(n_replicates % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(kind, data, statistic, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+            chunks = list(executor.map(_replicate_chunk, tasks))
+    else:
+        chunks = [_replicate_chunk(task) for task in tasks]
+    
+    return np.concatenate(chunks) if chunks else np.empty(0)
+
+def _replicate_chunk(task):
+    """Draw one chunk of replicates (module-level so worker processes can run it)"""
+    kind, data, statistic, size, seed = task
+    rng = np.random.default_rng(seed)
+    
+    if kind == 'poisson':
+        resampled = rng.poisson(data, size=(size, len(data))).T
+        return _proportion_statistic(resampled, statistic)
+    
+    resampled = np.stack([
+        rng.multinomial(int(histogram.sum()), histogram / histogram.sum(), size=size)
+        if histogram.sum() > 0 else np.zeros((size, len(histogram)))
+        for histogram in data
+    ]).astype(np.float64)
+    return _mean_statistic(resampled, statistic)
+
+def _interval(estimate, replicates, confidence, method, jackknife=None):
+    """Percentile or BCa interval from bootstrap replicates"""
+    replicates = replicates[np.isfinite(replicates)]
+    alpha = (1 - confidence) / 2
+    
+    if len(replicates) == 0 or not np.isfinite(estimate):
+        return {
+            'estimate': estimate, 'ci_low': np.nan, 'ci_high': np.nan, 'std_error': np.nan,
+            'method': method, 'n_replicates': 0
+        }
+    
+    if method == 'percentile':
+        quantiles = [alpha, 1 - alpha]
+    elif method == 'bca':
+        # Bias correction from the share of replicates below the estimate
+        share_below = (np.sum(replicates < estimate) + 0.5 * np.sum(replicates == estimate)) / len(replicates)
+        z0 = special.ndtri(np.clip(share_below, 1e-10, 1 - 1e-10))
+        
+        # Acceleration from the weighted jackknife
+        values, weights = jackknife
+        valid = np.isfinite(values) & (weights > 0)
+        values, weights = values[valid], weights[valid]
+        deviation = np.average(values, weights=weights) - values
+        spread = np.sum(weights * deviation ** 2)
+        acceleration = np.sum(weights * deviation ** 3) / (6 * spread ** 1.5) if spread > 0 else 0.0
+        
+        z = special.ndtri(np.array([alpha, 1 - alpha]))
+        quantiles = special.ndtr(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    else:
+        raise ValueError(f"Unknown bootstrap interval method: {method}")
+    
+    ci_low, ci_high = np.quantile(replicates, quantiles)
+    
+    return {
+        'estimate': float(estimate),
+        'ci_low': float(ci_low),
+        'ci_high': float(ci_high),
+        'std_error': float(np.std(replicates, ddof=1)),
+        'method': method,
+        'n_replicates': len(replicates)
+    }
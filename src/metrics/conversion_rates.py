@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
 
+from src.metrics.engine import (
+    CONTROL_GROUP,
+    TREATMENT_GROUP,
+    compare_segments,
+    group_statistics,
+    safe_ratio,
+    safe_ratios,
+    segment_column,
+    summarize
+)
+
 def calculate_conversion_metrics(df):
     """
     Calculate conversion metrics for both control and size recommendation groups
@@ -8,27 +19,38 @@ def calculate_conversion_metrics(df):
     Returns:
         dict: Dictionary containing conversion metrics
     """
-    # Split data by test group
-    control_df = df[df['test_group'] == 'Control']
-    recommendation_df = df[df['test_group'] == 'Size Recommendation']
+    return conversion_metrics_from_summary(summarize(df))
+
+def conversion_metrics_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Derive conversion metrics from per-group sufficient statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
+    
+    Returns:
+        dict: Dictionary containing conversion metrics
+    """
+    control = group_statistics(summary, control)
+    recommendation = group_statistics(summary, treatment)
     
     # Calculate view-to-cart conversion rates
-    control_view_to_cart = (control_df['added_to_cart'].sum() / control_df['viewed'].sum()) * 100
-    recommendation_view_to_cart = (recommendation_df['added_to_cart'].sum() / recommendation_df['viewed'].sum()) * 100
-    view_to_cart_improvement = ((recommendation_view_to_cart - control_view_to_cart) / control_view_to_cart) * 100
+    control_view_to_cart = safe_ratio(control['carts'], control['views']) * 100
+    recommendation_view_to_cart = safe_ratio(recommendation['carts'], recommendation['views']) * 100
+    view_to_cart_improvement = safe_ratio(recommendation_view_to_cart - control_view_to_cart,
+                                          control_view_to_cart) * 100
     
     # Calculate cart-to-purchase conversion rates
-    control_cart_to_purchase = (control_df[control_df['added_to_cart'] == 1]['purchased'].sum() / 
-                              control_df['added_to_cart'].sum()) * 100
-    recommendation_cart_to_purchase = (recommendation_df[recommendation_df['added_to_cart'] == 1]['purchased'].sum() / 
-                                    recommendation_df['added_to_cart'].sum()) * 100
-    cart_to_purchase_improvement = ((recommendation_cart_to_purchase - control_cart_to_purchase) / 
-                                  control_cart_to_purchase) * 100
+    control_cart_to_purchase = safe_ratio(control['cart_purchases'], control['carts']) * 100
+    recommendation_cart_to_purchase = safe_ratio(recommendation['cart_purchases'], recommendation['carts']) * 100
+    cart_to_purchase_improvement = safe_ratio(recommendation_cart_to_purchase - control_cart_to_purchase,
+                                              control_cart_to_purchase) * 100
     
     # Calculate overall conversion rates (view-to-purchase)
-    control_overall = (control_df['purchased'].sum() / control_df['viewed'].sum()) * 100
-    recommendation_overall = (recommendation_df['purchased'].sum() / recommendation_df['viewed'].sum()) * 100
-    overall_improvement = ((recommendation_overall - control_overall) / control_overall) * 100
+    control_overall = safe_ratio(control['purchases'], control['views']) * 100
+    recommendation_overall = safe_ratio(recommendation['purchases'], recommendation['views']) * 100
+    overall_improvement = safe_ratio(recommendation_overall - control_overall, control_overall) * 100
     
     # Compile metrics
     metrics = {
@@ -51,45 +73,37 @@ def calculate_conversion_metrics(df):
     
     return metrics
 
-def calculate_conversion_by_category(df):
+def calculate_conversion_by_category(df, dimension='product_category'):
     """
     Calculate conversion metrics broken down by product category
     
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments, product category by default
+    
     Returns:
-        pd.DataFrame: DataFrame with conversion metrics by category
+        pd.DataFrame: DataFrame with conversion metrics by category, one row
+        per category and arm compared against control (the segment column is
+        named 'category' for product categories and after the dimension
+        otherwise; 'arm' names the arm)
     """
-    categories = df['product_category'].unique()
-    results = []
+    control, by_arm = compare_segments(df, dimension)
     
-    for category in categories:
-        category_df = df[df['product_category'] == category]
-        
-        # Split by test group
-        control_df = category_df[category_df['test_group'] == 'Control']
-        recommendation_df = category_df[category_df['test_group'] == 'Size Recommendation']
+    # Calculate overall conversion for the control group
+    control_conversion = safe_ratios(control['purchases'], control['views']) * 100
+    
+    frames = []
+    for arm, recommendation in by_arm.items():
+        # Calculate overall conversion and improvement for each arm
+        recommendation_conversion = safe_ratios(recommendation['purchases'], recommendation['views']) * 100
+        improvement = safe_ratios(recommendation_conversion - control_conversion, control_conversion) * 100
         
-        # Calculate overall conversion for each group
-        if len(control_df) > 0:
-            control_conversion = (control_df['purchased'].sum() / control_df['viewed'].sum()) * 100
-        else:
-            control_conversion = 0
-            
-        if len(recommendation_df) > 0:
-            recommendation_conversion = (recommendation_df['purchased'].sum() / recommendation_df['viewed'].sum()) * 100
-        else:
-            recommendation_conversion = 0
-            
-        # Calculate improvement
-        if control_conversion > 0:
-            improvement = ((recommendation_conversion - control_conversion) / control_conversion) * 100
-        else:
-            improvement = 0
-            
-        results.append({
-            'category': category,
+        frames.append(pd.DataFrame({
+            segment_column(dimension): control.index.to_numpy(),
+            'arm': arm,
             'control_conversion': control_conversion,
             'recommendation_conversion': recommendation_conversion,
             'improvement': improvement
-        })
+        }))
     
-    return pd.DataFrame(results)
\ No newline at end of file
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,185 @@
+import pandas as pd
+import numpy as np
+
+from src.cache import ResultCache, disk_cache
+from src.data_processing import date_bounds, shared_data_source
+from src.metrics.engine import CONTROL_GROUP, STATISTICS, group_totals, statistics_frame
+
+DAY_NS = 24 * 60 * 60 * 10 ** 9
+
+# Results memoized per cube (see MetricsCube.memoized), least recently used evicted first
+MEMO_ENTRIES = 256
+
+class MetricsCube:
+    """
+    Sufficient statistics per (day, product_category, test_group)
+    
+    The statistics are stored as prefix sums along the day axis, so the
+    summary of any date range and category selection is a difference of two
+    day slices summed over the selected categories: O(#categories) work,
+    independent of the number of rows.
+    """
+    
+    def __init__(self, first_day, categories, groups, cumulative):
+        """
+        Args:
+            first_day: Timestamp (midnight) of day 0
+            categories: Product categories along axis 1
+            groups: Test groups along axis 2
+            cumulative: Array of shape (n_days + 1, n_categories, n_groups,
+                len(STATISTICS)) where cumulative[d] sums days 0 .. d - 1
+        """
+        self.first_day = pd.Timestamp(first_day)
+        self.categories = pd.Index(categories, name='product_category')
+        self.groups = pd.Index(groups, name='test_group')
+        self.cumulative = cumulative
+        self._memo = ResultCache(max_entries=MEMO_ENTRIES, ttl_seconds=None)
+    
+    @classmethod
+    def from_frame(cls, df):
+        """Build the cube from a DataFrame with e-commerce data"""
+        categories = df['product_category'].astype('category').cat
+        groups = df['test_group'].astype('category').cat
+        
+        dates = df['date'].to_numpy(dtype='datetime64[ns]').view('int64')
+        if len(dates) == 0:
+            first_day = pd.Timestamp.now().normalize()
+            day_codes = dates
+        else:
+            first_day = pd.Timestamp(dates.min()).normalize()
+            day_codes = (dates - first_day.value) // DAY_NS
+        n_days = int(day_codes.max()) + 1 if len(day_codes) else 0
+        
+        shape = (n_days, len(categories.categories), len(groups.categories))
+        codes = np.ravel_multi_index(
+            (day_codes, categories.codes.to_numpy().astype(np.intp), groups.codes.to_numpy().astype(np.intp)),
+            shape
+        )
+        totals = group_totals(df, codes, int(np.prod(shape))).reshape(shape + (len(STATISTICS),))
+        
+        # Prefix sums along the day axis, with a leading row of zeros
+        cumulative = np.zeros((n_days + 1,) + totals.shape[1:])
+        np.cumsum(totals, axis=0, out=cumulative[1:])
+        
+        return cls(first_day, categories.categories, groups.categories, cumulative)
+    
+    def to_arrays(self):
+        """(arrays, meta) representation for metrics.cube.MetricsCube.from_arrays and the DiskCache"""
+        meta = {
+            'first_day': self.first_day.isoformat(),
+            'categories': [str(category) for category in self.categories],
+            'groups': [str(group) for group in self.groups]
+        }
+        return {'cumulative': self.cumulative}, meta
+    
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """Cube from the output of to_arrays (the arrays may be read-only memory maps)"""
+        return cls(meta['first_day'], meta['categories'], meta['groups'], arrays['cumulative'])
+    
+    @property
+    def n_days(self):
+        return self.cumulative.shape[0] - 1
+    
+    def day_range(self, date_range=None):
+        """(first, last + 1) day positions covered by an inclusive date range"""
+        if not date_range:
+            return 0, self.n_days
+        
+        start, end = date_bounds(date_range)
+        lo = (start - self.first_day) // pd.Timedelta(days=1)
+        hi = (end - self.first_day) // pd.Timedelta(days=1)
+        lo = min(max(lo, 0), self.n_days)
+        hi = min(max(hi, lo), self.n_days)
+        return lo, hi
+    
+    def segment_totals(self, date_range=None):
+        """Statistics per (category, group) over a date range, shape (n_categories, n_groups, n_statistics)"""
+        lo, hi = self.day_range(date_range)
+        return self.cumulative[hi] - self.cumulative[lo]
+    
+    def memoized(self, key, build):
+        """
+        Result derived from this cube, built once per key
+        
+        The cube is rebuilt whenever the data changes, so memoized results
+        never outlive the data they were computed from. At most MEMO_ENTRIES
+        results are kept (least recently used evicted), and concurrent
+        callers (e.g. warm-up threads) build a given key only once.
+        
+        Args:
+            key: Hashable key identifying the result and its parameters
+            build: Callable without arguments building the result
+        """
+        return self._memo.get_or_compute(key, build)
+    
+    def query(self, date_range=None, category=None):
+        """
+        Per-group summary of a date range and category selection
+        
+        Args:
+            date_range: Optional (start date, end date) pair, both inclusive
+            category: Optional product category, or list of categories;
+                None or "All Categories" selects every category
+        
+        Returns:
+            pd.DataFrame: Same format as metrics.engine.summarize(df)
+        """
+        totals = self.segment_totals(date_range)
+        
+        if category and category != "All Categories":
+            selected = [category] if isinstance(category, str) else list(category)
+            positions = self.categories.get_indexer(selected)
+            totals = totals[positions[positions >= 0]]
+        
+        summary = statistics_frame(totals.sum(axis=0), self.groups)
+        return summary[summary['rows'] > 0]
+    
+    def query_segments(self, date_range=None, category=None, control=CONTROL_GROUP):
+        """
+        Per-category summaries of every arm for a date range and category selection
+        
+        Args:
+            date_range, category: As in query
+            control: Name of the control arm, returned first
+        
+        Returns:
+            dict: Same format as metrics.engine.summarize_segments(df,
+            groups=None): test group -> pd.DataFrame indexed by the categories
+            with rows (zeros where a group has none), columns STATISTICS
+        """
+        totals = self.segment_totals(date_range)
+        categories = self.categories
+        
+        if category and category != "All Categories":
+            selected = [category] if isinstance(category, str) else list(category)
+            positions = categories.get_indexer(selected)
+            positions = positions[positions >= 0]
+            totals, categories = totals[positions], categories[positions]
+        
+        rows = totals[..., STATISTICS.index('rows')]
+        observed = rows.sum(axis=1) > 0
+        positions = [position for position in np.flatnonzero(rows.sum(axis=0) > 0)]
+        positions.sort(key=lambda position: self.groups[position] != control)
+        
+        return {
+            self.groups[position]: statistics_frame(totals[observed, position], categories[observed])
+            for position in positions
+        }
+
+def load_metrics_cube():
+    """
+    MetricsCube of the shared dataset, rebuilt only when the data changes
+    
+    The cube is persisted in the DiskCache, keyed by the content hash of the
+    data and the code version, and memory-mapped from there after a restart.
+    """
+    source = shared_data_source()
+    
+    def build(df):
+        arrays, meta = disk_cache().arrays(
+            'metrics_cube', source.fingerprint, lambda: MetricsCube.from_frame(df).to_arrays()
+        )
+        return MetricsCube.from_arrays(arrays, meta)
+    
+    return source.derived('metrics_cube', build)
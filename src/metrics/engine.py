@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+
+# A/B test group names
+CONTROL_GROUP = 'Control'
+TREATMENT_GROUP = 'Size Recommendation'
+
+# Satisfaction scores range over 0 .. MAX_SCORE (0 means not rated)
+MAX_SCORE = 10
+SCORE_BINS = [f'score_{score}' for score in range(MAX_SCORE + 1)]
+
+# Sufficient statistics computed per group by summarize()
+STATISTICS = [
+    'rows',            # Number of rows (product views logged)
+    'views',           # Sum of 'viewed'
+    'carts',           # Sum of 'added_to_cart'
+    'cart_purchases',  # Purchases of items that were added to the cart
+    'purchases',       # Sum of 'purchased'
+    'returns',         # Returns of purchased items
+    'sat_n',           # Purchases with a satisfaction score
+    'sat_sum',         # Sum of those satisfaction scores
+    'sat_sumsq'        # Sum of their squares
+] + SCORE_BINS         # Histogram of the satisfaction scores of purchases
+
+def summarize(df, by='test_group'):
+    """
+    Compute the sufficient statistics of every dashboard metric per group
+    
+    All counts and sums are accumulated with one grouped reduction over the
+    flag columns, so the KPIs and A/B tests can be derived from the (small)
+    summary instead of re-filtering the rows for each metric.
+    
+    Args:
+        df: DataFrame with e-commerce data
+        by: Column name, or list of column names, to group by
+    
+    Returns:
+        pd.DataFrame: One row per group observed in df, columns STATISTICS
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    codes, index = _group_codes(df, keys)
+    
+    summary = statistics_frame(group_totals(df, codes, len(index)), index)
+    return summary[summary['rows'] > 0]
+
+def group_totals(df, codes, n_groups):
+    """
+    Accumulate the STATISTICS of every row into its group
+    
+    Args:
+        df: DataFrame with e-commerce data
+        codes: Integer group code (0 <= code < n_groups) of every row
+        n_groups: Number of groups
+    
+    Returns:
+        np.ndarray: float64 array of shape (n_groups, len(STATISTICS))
+    """
+    def total(weights=None):
+        return np.bincount(codes, weights=weights, minlength=n_groups)
+    
+    purchased = df['purchased'].to_numpy(dtype=np.float64)
+    scores = np.clip(df['satisfaction_score'].to_numpy(), 0, MAX_SCORE).astype(np.intp)
+    
+    # Satisfaction histogram per group, scores of purchased items only;
+    # the moments of rated purchases (score > 0) follow from it
+    histogram = np.bincount(
+        codes * len(SCORE_BINS) + scores, weights=purchased, minlength=n_groups * len(SCORE_BINS)
+    ).reshape(n_groups, len(SCORE_BINS))
+    rated = histogram[:, 1:]
+    rated_scores = np.arange(1, len(SCORE_BINS))
+    
+    totals = {
+        'rows': total(),
+        'views': total(df['viewed'].to_numpy(dtype=np.float64)),
+        'carts': total(df['added_to_cart'].to_numpy(dtype=np.float64)),
+        'cart_purchases': total(purchased * df['added_to_cart'].to_numpy(dtype=np.float64)),
+        'purchases': total(purchased),
+        'returns': total(purchased * df['returned'].to_numpy(dtype=np.float64)),
+        'sat_n': rated.sum(axis=1),
+        'sat_sum': rated @ rated_scores,
+        'sat_sumsq': rated @ rated_scores ** 2
+    }
+    totals.update(zip(SCORE_BINS, histogram.T))
+    
+    return np.stack([totals[statistic].astype(np.float64) for statistic in STATISTICS], axis=-1)
+
+def statistics_frame(totals, index):
+    """Summary DataFrame (as returned by summarize) from an array of group totals"""
+    summary = pd.DataFrame(totals, index=index, columns=STATISTICS)
+    
+    counts = [column for column in STATISTICS if column not in ('sat_sum', 'sat_sumsq')]
+    summary[counts] = summary[counts].round().astype(np.int64)
+    
+    return summary
+
+def merge_summaries(*summaries):
+    """
+    Combine summaries computed on disjoint shards of the data
+    
+    Every statistic is a count or a sum, so shard summaries add up to the
+    summary of the union.
+    """
+    merged = pd.concat(summaries).groupby(level=list(range(summaries[0].index.nlevels))).sum()
+    return merged[merged['rows'] > 0]
+
+def group_statistics(summary, group):
+    """Statistics of one group as a Series, all zeros if the group is absent"""
+    if group in summary.index:
+        return summary.loc[group]
+    return pd.Series(0, index=summary.columns)
+
+def arms(summary, control=CONTROL_GROUP):
+    """
+    Test groups (arms) observed in a summary, control first
+    
+    Args:
+        summary: Output of summarize, grouped by test_group alone or with
+            other keys
+        control: Name of the control arm
+    
+    Returns:
+        list: Arm names, control first (if present) then the others in order
+    """
+    if isinstance(summary.index, pd.MultiIndex):
+        observed = summary.index.get_level_values('test_group').unique()
+    else:
+        observed = summary.index
+    
+    return [group for group in observed if group == control] + [group for group in observed if group != control]
+
+def treatment_arms(summary, control=CONTROL_GROUP):
+    """
+    Arms compared against control: every arm observed in a summary but control
+    
+    Returns:
+        list: Arm names in order; [TREATMENT_GROUP] when no other arm is
+        observed (e.g. an empty selection), so pairwise results keep their shape
+    """
+    others = [group for group in arms(summary, control) if group != control]
+    return others or [TREATMENT_GROUP]
+
+def summarize_segments(df, dimension='product_category', groups=None):
+    """
+    Compute the sufficient statistics per segment of a dimension for each test group
+    
+    One grouped reduction over (dimension, test_group) replaces slicing the
+    frame once per segment and group.
+    
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments (e.g. 'product_category', 'product_id')
+        groups: Test groups to return, None for every arm observed in df
+            (control first, see arms)
+    
+    Returns:
+        dict: Test group -> pd.DataFrame indexed by the segments observed in
+        df (aligned across groups, zeros where a group has no rows), columns STATISTICS
+    """
+    return _segments_by_group(summarize(df, by=[dimension, 'test_group']), dimension, groups)
+
+def compare_segments(df, dimension='product_category', control=CONTROL_GROUP):
+    """
+    Per-segment statistics of control and of every arm compared against it
+    
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments
+        control: Name of the control arm
+    
+    Returns:
+        tuple: (control statistics, dict arm -> statistics) for the arms of
+        treatment_arms, aligned as in summarize_segments
+    """
+    summary = summarize(df, by=[dimension, 'test_group'])
+    compared = treatment_arms(summary, control)
+    by_group = _segments_by_group(summary, dimension, [control] + compared)
+    return by_group[control], {arm: by_group[arm] for arm in compared}
+
+def _segments_by_group(summary, dimension, groups=None):
+    """Split a (dimension, test_group) summary by test group, see summarize_segments"""
+    segments = summary.index.get_level_values(dimension).unique()
+    if groups is None:
+        groups = arms(summary)
+    
+    by_group = {}
+    for group in groups:
+        if group in summary.index.get_level_values('test_group'):
+            group_summary = summary.xs(group, level='test_group')
+        else:
+            group_summary = summary.iloc[:0].droplevel('test_group')
+        by_group[group] = group_summary.reindex(segments, fill_value=0)
+    
+    return by_group
+
+def segment_column(dimension):
+    """Name of the segment column in the *_by_category results"""
+    return 'category' if dimension == 'product_category' else dimension
+
+def safe_ratio(numerator, denominator):
+    """numerator / denominator, 0 when the denominator is 0"""
+    return numerator / denominator if denominator > 0 else 0
+
+def safe_ratios(numerator, denominator):
+    """Element-wise numerator / denominator, 0 where the denominator is 0"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def _group_codes(df, keys):
+    """Integer group code per row and the index of the groups they refer to"""
+    level_codes = []
+    levels = []
+    for key in keys:
+        column = df[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            level_codes.append(column.cat.codes.to_numpy().astype(np.intp))
+            levels.append(column.cat.categories)
+        else:
+            key_codes, key_levels = pd.factorize(column, sort=True)
+            level_codes.append(key_codes.astype(np.intp))
+            levels.append(pd.Index(key_levels))
+    
+    if len(keys) == 1:
+        return level_codes[0], pd.Index(levels[0], name=keys[0])
+    
+    shape = tuple(len(level) for level in levels)
+    codes = np.ravel_multi_index(level_codes, shape)
+    index = pd.MultiIndex.from_product(levels, names=keys)
+    return codes, index
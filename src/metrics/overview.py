@@ -0,0 +1,108 @@
+import pandas as pd
+import numpy as np
+
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP, arms, safe_ratios, summarize, treatment_arms
+from src.metrics.conversion_rates import conversion_metrics_from_summary
+from src.metrics.return_rates import return_metrics_from_summary, return_cost_savings_from_summary
+from src.metrics.satisfaction import satisfaction_metrics_from_summary
+from src.metrics.ab_testing import (
+    conversion_test_from_summary,
+    return_rate_test_from_summary,
+    satisfaction_test_from_summary
+)
+
+def calculate_overview_metrics(df, average_return_cost=15):
+    """
+    Calculate every Performance Overview KPI and A/B test in one pass
+    
+    Args:
+        df: DataFrame with e-commerce data
+        average_return_cost: Average cost to process a return in dollars
+    
+    Returns:
+        dict: Metric dictionaries keyed by 'conversion', 'returns',
+        'satisfaction', 'conversion_test', 'return_test',
+        'satisfaction_test', plus the 'cost_savings' estimate
+    """
+    return overview_metrics_from_summary(summarize(df), average_return_cost)
+
+def overview_metrics_from_summary(summary, average_return_cost=15, control=CONTROL_GROUP,
+                                  treatment=TREATMENT_GROUP):
+    """
+    Derive every Performance Overview KPI and A/B test from per-group statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        average_return_cost: Average cost to process a return in dollars
+        control, treatment: Arms compared (treatment against control)
+    
+    Returns:
+        dict: Same structure as calculate_overview_metrics
+    """
+    compared = dict(control=control, treatment=treatment)
+    return {
+        'conversion': conversion_metrics_from_summary(summary, **compared),
+        'returns': return_metrics_from_summary(summary, **compared),
+        'satisfaction': satisfaction_metrics_from_summary(summary, **compared),
+        'conversion_test': conversion_test_from_summary(summary, **compared),
+        'return_test': return_rate_test_from_summary(summary, **compared),
+        'satisfaction_test': satisfaction_test_from_summary(summary, **compared),
+        'cost_savings': return_cost_savings_from_summary(summary, average_return_cost, **compared)
+    }
+
+def overview_by_arm(summary, average_return_cost=15, control=CONTROL_GROUP):
+    """
+    Performance Overview of every arm against control
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        average_return_cost: Average cost to process a return in dollars
+        control: Name of the control arm
+    
+    Returns:
+        dict: Arm (see metrics.engine.treatment_arms) -> output of
+        overview_metrics_from_summary comparing it against control
+    """
+    return {
+        arm: overview_metrics_from_summary(summary, average_return_cost, control, arm)
+        for arm in treatment_arms(summary, control)
+    }
+
+def calculate_arm_metrics(df, control=CONTROL_GROUP):
+    """
+    Calculate the KPIs of every arm found in test_group in one pass
+    
+    Returns:
+        pd.DataFrame: See arm_metrics_from_summary
+    """
+    return arm_metrics_from_summary(summarize(df), control)
+
+def arm_metrics_from_summary(summary, control=CONTROL_GROUP):
+    """
+    Derive the KPIs of every arm, and their change against control, from per-group statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control: Name of the control arm
+    
+    Returns:
+        pd.DataFrame: One row per arm (control first) with view_to_cart,
+        cart_to_purchase, conversion_rate and return_rate (%), satisfaction
+        (mean rated score) and the relative change (%) of each against control
+    """
+    by_arm = summary.reindex(arms(summary, control))
+    
+    metrics = pd.DataFrame({
+        'view_to_cart': safe_ratios(by_arm['carts'], by_arm['views']) * 100,
+        'cart_to_purchase': safe_ratios(by_arm['cart_purchases'], by_arm['carts']) * 100,
+        'conversion_rate': safe_ratios(by_arm['purchases'], by_arm['views']) * 100,
+        'return_rate': safe_ratios(by_arm['returns'], by_arm['purchases']) * 100,
+        'satisfaction': safe_ratios(by_arm['sat_sum'], by_arm['sat_n'])
+    }, index=by_arm.index)
+    
+    baseline = metrics.loc[control] if control in metrics.index else pd.Series(0.0, index=metrics.columns)
+    for column in list(metrics.columns):
+        change = metrics[column] - baseline[column]
+        metrics[f'{column}_change'] = safe_ratios(change, np.full(len(metrics), baseline[column])) * 100
+    
+    return metrics
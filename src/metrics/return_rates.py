@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
 
+from src.metrics.engine import (
+    CONTROL_GROUP,
+    TREATMENT_GROUP,
+    compare_segments,
+    group_statistics,
+    safe_ratio,
+    safe_ratios,
+    segment_column,
+    summarize
+)
+
 def calculate_return_metrics(df):
     """
     Calculate return rate metrics for both control and size recommendation groups
@@ -8,29 +19,29 @@ def calculate_return_metrics(df):
     Returns:
         dict: Dictionary containing return rate metrics
     """
-    # Filter only purchased items
-    purchased_df = df[df['purchased'] == 1]
+    return return_metrics_from_summary(summarize(df))
+
+def return_metrics_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Derive return rate metrics from per-group sufficient statistics
+    
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
     
-    # Split data by test group
-    control_df = purchased_df[purchased_df['test_group'] == 'Control']
-    recommendation_df = purchased_df[purchased_df['test_group'] == 'Size Recommendation']
+    Returns:
+        dict: Dictionary containing return rate metrics
+    """
+    control = group_statistics(summary, control)
+    recommendation = group_statistics(summary, treatment)
     
     # Calculate overall return rates
-    if len(control_df) > 0:
-        control_return_rate = (control_df['returned'].sum() / len(control_df)) * 100
-    else:
-        control_return_rate = 0
-        
-    if len(recommendation_df) > 0:
-        recommendation_return_rate = (recommendation_df['returned'].sum() / len(recommendation_df)) * 100
-    else:
-        recommendation_return_rate = 0
+    control_return_rate = safe_ratio(control['returns'], control['purchases']) * 100
+    recommendation_return_rate = safe_ratio(recommendation['returns'], recommendation['purchases']) * 100
     
     # Calculate reduction
-    if control_return_rate > 0:
-        return_rate_reduction = ((control_return_rate - recommendation_return_rate) / control_return_rate) * 100
-    else:
-        return_rate_reduction = 0
+    return_rate_reduction = safe_ratio(control_return_rate - recommendation_return_rate,
+                                       control_return_rate) * 100
     
     # Compile metrics
     metrics = {
@@ -43,51 +54,45 @@ def calculate_return_metrics(df):
     
     return metrics
 
-def calculate_return_by_category(df):
+def calculate_return_by_category(df, dimension='product_category'):
     """
     Calculate return rate metrics broken down by product category
     
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments, product category by default
+    
     Returns:
-        pd.DataFrame: DataFrame with return rate metrics by category
+        pd.DataFrame: DataFrame with return rate metrics by category, one row
+        per category and arm compared against control (the segment column is
+        named 'category' for product categories and after the dimension
+        otherwise; 'arm' names the arm)
     """
-    # Filter only purchased items
-    purchased_df = df[df['purchased'] == 1]
-    
-    categories = purchased_df['product_category'].unique()
-    results = []
-    
-    for category in categories:
-        category_df = purchased_df[purchased_df['product_category'] == category]
-        
-        # Split by test group
-        control_df = category_df[category_df['test_group'] == 'Control']
-        recommendation_df = category_df[category_df['test_group'] == 'Size Recommendation']
+    control_all, by_arm = compare_segments(df, dimension)
+    
+    frames = []
+    for arm, recommendation in by_arm.items():
+        # Only segments with purchases
+        purchased = (control_all['purchases'] + recommendation['purchases']).to_numpy() > 0
+        control = control_all[purchased]
+        recommendation = recommendation[purchased]
         
         # Calculate return rates for each group
-        if len(control_df) > 0:
-            control_return_rate = (control_df['returned'].sum() / len(control_df)) * 100
-        else:
-            control_return_rate = 0
-            
-        if len(recommendation_df) > 0:
-            recommendation_return_rate = (recommendation_df['returned'].sum() / len(recommendation_df)) * 100
-        else:
-            recommendation_return_rate = 0
-            
+        control_return_rate = safe_ratios(control['returns'], control['purchases']) * 100
+        recommendation_return_rate = safe_ratios(recommendation['returns'], recommendation['purchases']) * 100
+        
         # Calculate reduction
-        if control_return_rate > 0:
-            reduction = ((control_return_rate - recommendation_return_rate) / control_return_rate) * 100
-        else:
-            reduction = 0
-            
-        results.append({
-            'category': category,
+        reduction = safe_ratios(control_return_rate - recommendation_return_rate, control_return_rate) * 100
+        
+        frames.append(pd.DataFrame({
+            segment_column(dimension): control.index.to_numpy(),
+            'arm': arm,
             'control_return_rate': control_return_rate,
             'recommendation_return_rate': recommendation_return_rate,
             'reduction': reduction
-        })
+        }))
     
-    return pd.DataFrame(results)
+    return pd.concat(frames, ignore_index=True)
 
 def calculate_return_cost_savings(df, average_return_cost=15):
     """
@@ -96,29 +101,36 @@ def calculate_return_cost_savings(df, average_return_cost=15):
     Args:
         df: DataFrame with e-commerce data
         average_return_cost: Average cost to process a return in dollars
-        
+    
     Returns:
         float: Estimated cost savings
     """
-    # Filter only purchased items
-    purchased_df = df[df['purchased'] == 1]
+    return return_cost_savings_from_summary(summarize(df), average_return_cost)
+
+def return_cost_savings_from_summary(summary, average_return_cost=15, control=CONTROL_GROUP,
+                                     treatment=TREATMENT_GROUP):
+    """
+    Derive return cost savings from per-group sufficient statistics
     
-    # Split data by test group
-    control_df = purchased_df[purchased_df['test_group'] == 'Control']
-    recommendation_df = purchased_df[purchased_df['test_group'] == 'Size Recommendation']
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        average_return_cost: Average cost to process a return in dollars
+        control, treatment: Arms compared (treatment against control)
     
-    # Calculate return counts
-    control_returns = control_df['returned'].sum()
-    recommendation_returns = recommendation_df['returned'].sum()
+    Returns:
+        float: Estimated cost savings
+    """
+    control = group_statistics(summary, control)
+    recommendation = group_statistics(summary, treatment)
     
     # Normalize by group size
-    control_size = len(control_df)
-    recommendation_size = len(recommendation_df)
+    control_size = control['purchases']
+    recommendation_size = recommendation['purchases']
     
     if control_size > 0 and recommendation_size > 0:
         # Calculate return rate difference
-        control_return_rate = control_returns / control_size
-        recommendation_return_rate = recommendation_returns / recommendation_size
+        control_return_rate = control['returns'] / control_size
+        recommendation_return_rate = recommendation['returns'] / recommendation_size
         
         # Estimate number of avoided returns
         avoided_returns = recommendation_size * (control_return_rate - recommendation_return_rate)
@@ -128,4 +140,30 @@ def calculate_return_cost_savings(df, average_return_cost=15):
     else:
         savings = 0
     
-    return savings
\ No newline at end of file
+    return savings
+
+def product_returns_from_sketches(sketches, product_ids):
+    """
+    Approximate purchases, returns and return rate of products from ingestion sketches
+    
+    Count-min estimates never undercount, so small counts are biased upwards
+    by about total / sketch width; rates are meant for ranking high-volume
+    products.
+    
+    Args:
+        sketches: sketches.DatasetSketches, e.g. from data_processing.load_sketches
+        product_ids: Products to look up
+    
+    Returns:
+        pd.DataFrame: Indexed by product_id, columns purchases, returns and
+        return_rate (%)
+    """
+    product_ids = np.asarray(product_ids)
+    purchases = sketches.product_purchases.estimate(product_ids)
+    returns = np.minimum(sketches.product_returns.estimate(product_ids), purchases)
+    
+    return pd.DataFrame({
+        'purchases': purchases,
+        'returns': returns,
+        'return_rate': safe_ratios(returns, purchases) * 100
+    }, index=pd.Index(product_ids, name='product_id'))
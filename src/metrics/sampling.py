@@ -0,0 +1,152 @@
+import pandas as pd
+import numpy as np
+
+from src.data_processing import date_bounds, load_samples, shared_data_source
+from src.metrics.engine import STATISTICS, group_totals, safe_ratios, statistics_frame
+from src.storage import STRATUM_ROWS_COLUMN, sample_strata
+
+# Ratio metrics with standard errors: per-row (numerator, denominator) and
+# the scale of the reported rate
+PREVIEW_RATES = {
+    'conversion_rate': (lambda rows: rows['purchased'], lambda rows: np.ones(len(rows)), 100),
+    'return_rate': (lambda rows: rows['purchased'] * rows['returned'], lambda rows: rows['purchased'], 100),
+    'satisfaction': (lambda rows: rows['purchased'] * rows['satisfaction_score'],
+                     lambda rows: rows['purchased'] * (rows['satisfaction_score'] > 0), 1)
+}
+
+class StratifiedSample:
+    """
+    Stratified sample of the dataset, strata test_group x product_category x day
+    
+    The sample is drawn at ingestion (storage.sample_strata): a fixed number
+    of rows per day is allocated to the day's strata, and rows are drawn
+    within each stratum, so every stratum h has a fixed n_h sampled rows
+    standing for its N_h dataset rows. Date range and category selections
+    are unions of whole strata, so weighted sums of the sample estimate
+    their sufficient statistics. Queries cost O(sample size), about 110k
+    rows per year of data whatever the size of the dataset.
+    """
+    
+    def __init__(self, rows, strata, population, stratum_groups, groups, categories):
+        """
+        Args:
+            rows: Sampled rows (columns of the dataset)
+            strata: Stratum code of every sampled row
+            population: Number of dataset rows per stratum
+            stratum_groups: Test group code of every stratum
+            groups, categories: Test groups and product categories of the dataset
+        """
+        self.rows = rows
+        self.strata = strata
+        self.population = population
+        self.stratum_groups = stratum_groups
+        self.groups = pd.Index(groups, name='test_group')
+        self.categories = pd.Index(categories, name='product_category')
+        self.sampled = np.bincount(strata, minlength=len(population))
+        self.weights = safe_ratios(population, self.sampled)
+    
+    @classmethod
+    def from_samples(cls, sample):
+        """
+        Stratified sample from rows drawn by storage.sample_strata
+        
+        Args:
+            sample: Sampled rows with their STRATUM_ROWS_COLUMN, e.g. as
+                returned by data_processing.load_samples
+        """
+        groups = sample['test_group'].astype('category').cat
+        categories = sample['product_category'].astype('category').cat
+        n_categories = len(categories.categories)
+        n_cells = len(groups.categories) * n_categories
+        
+        days = sample['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        group_codes = groups.codes.to_numpy().astype(np.int64)
+        keys = days * n_cells + group_codes * n_categories + categories.codes.to_numpy().astype(np.int64)
+        stratum_keys, first, strata = np.unique(keys, return_index=True, return_inverse=True)
+        
+        population = sample[STRATUM_ROWS_COLUMN].to_numpy()[first]
+        stratum_groups = group_codes[first]
+        rows = sample.drop(columns=STRATUM_ROWS_COLUMN)
+        
+        return cls(rows, strata, population, stratum_groups, groups.categories, categories.categories)
+    
+    @classmethod
+    def from_frame(cls, df, seed=0):
+        """Sample a DataFrame with e-commerce data, as done at ingestion"""
+        return cls.from_samples(sample_strata(df, seed=seed))
+    
+    def query(self, date_range=None, category=None):
+        """
+        Estimated per-group summary of a date range and category selection
+        
+        Returns:
+            pd.DataFrame: Same format as metrics.engine.summarize(df), with
+            the statistics estimated from the sample
+        """
+        domain = self._domain(date_range, category)
+        totals = group_totals(self.rows[domain], self.strata[domain], len(self.population))
+        
+        group_sums = np.zeros((len(self.groups), len(STATISTICS)))
+        np.add.at(group_sums, self.stratum_groups, totals * self.weights[:, None])
+        
+        summary = statistics_frame(group_sums, self.groups)
+        return summary[summary['rows'] > 0]
+    
+    def standard_errors(self, date_range=None, category=None):
+        """
+        Standard errors of the estimated rates per group
+        
+        Uses the linearized variance of a ratio under stratified sampling
+        with fixed n_h per stratum, with finite population correction.
+        
+        Returns:
+            pd.DataFrame: One row per group, columns of PREVIEW_RATES (rates
+            in percent, satisfaction in score points)
+        """
+        domain = self._domain(date_range, category)
+        n_strata = len(self.population)
+        group_of_stratum = self.stratum_groups
+        weights = self.weights[self.strata]
+        
+        errors = {}
+        for name, (numerator, denominator, scale) in PREVIEW_RATES.items():
+            y = np.where(domain, np.asarray(numerator(self.rows), dtype=np.float64), 0.0)
+            x = np.where(domain, np.asarray(denominator(self.rows), dtype=np.float64), 0.0)
+            
+            # Estimated totals and rate per group
+            y_total = np.bincount(group_of_stratum[self.strata], weights=weights * y, minlength=len(self.groups))
+            x_total = np.bincount(group_of_stratum[self.strata], weights=weights * x, minlength=len(self.groups))
+            rate = safe_ratios(y_total, x_total)
+            
+            # Linearized residuals and their variance within each stratum
+            group = group_of_stratum[self.strata]
+            z = safe_ratios(y - rate[group] * x, x_total[group])
+            z_sum = np.bincount(self.strata, weights=z, minlength=n_strata)
+            z_sumsq = np.bincount(self.strata, weights=z ** 2, minlength=n_strata)
+            variance = safe_ratios(z_sumsq - safe_ratios(z_sum ** 2, self.sampled), self.sampled - 1)
+            
+            correction = 1 - safe_ratios(self.sampled, self.population)
+            stratum_variance = self.population ** 2 * correction * safe_ratios(variance, self.sampled)
+            errors[name] = np.sqrt(np.bincount(group_of_stratum, weights=stratum_variance,
+                                               minlength=len(self.groups))) * scale
+        
+        return pd.DataFrame(errors, index=self.groups)
+    
+    def _domain(self, date_range, category):
+        """Mask of the sampled rows in the date range and category selection"""
+        domain = np.ones(len(self.rows), dtype=bool)
+        if date_range:
+            start, end = date_bounds(date_range)
+            dates = self.rows['date']
+            domain &= ((dates >= start) & (dates < end)).to_numpy()
+        if category and category != "All Categories":
+            selected = [category] if isinstance(category, str) else list(category)
+            domain &= self.rows['product_category'].isin(selected).to_numpy()
+        return domain
+
+def load_stratified_sample():
+    """
+    StratifiedSample of the shared dataset, read from the samples drawn at
+    ingestion (never from the rows) once per version of the data
+    """
+    return shared_data_source().derived('stratified_sample', lambda df: StratifiedSample.from_samples(load_samples()))
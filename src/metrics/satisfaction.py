@@ -1,6 +1,19 @@
 import pandas as pd
 import numpy as np
 
+from src.metrics.engine import (
+    CONTROL_GROUP,
+    SCORE_BINS,
+    TREATMENT_GROUP,
+    compare_segments,
+    group_statistics,
+    safe_ratio,
+    safe_ratios,
+    segment_column,
+    summarize,
+    treatment_arms
+)
+
 def calculate_satisfaction_metrics(df):
     """
     Calculate customer satisfaction metrics for both control and size recommendation groups
@@ -8,29 +21,29 @@ def calculate_satisfaction_metrics(df):
     Returns:
         dict: Dictionary containing satisfaction metrics
     """
-    # Filter only purchased items with satisfaction scores
-    purchased_df = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+    return satisfaction_metrics_from_summary(summarize(df))
+
+def satisfaction_metrics_from_summary(summary, control=CONTROL_GROUP, treatment=TREATMENT_GROUP):
+    """
+    Derive satisfaction metrics from per-group sufficient statistics
     
-    # Split data by test group
-    control_df = purchased_df[purchased_df['test_group'] == 'Control']
-    recommendation_df = purchased_df[purchased_df['test_group'] == 'Size Recommendation']
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control, treatment: Arms compared (treatment against control)
+    
+    Returns:
+        dict: Dictionary containing satisfaction metrics
+    """
+    control = group_statistics(summary, control)
+    recommendation = group_statistics(summary, treatment)
     
     # Calculate average satisfaction scores
-    if len(control_df) > 0:
-        control_satisfaction = control_df['satisfaction_score'].mean()
-    else:
-        control_satisfaction = 0
-        
-    if len(recommendation_df) > 0:
-        recommendation_satisfaction = recommendation_df['satisfaction_score'].mean()
-    else:
-        recommendation_satisfaction = 0
+    control_satisfaction = safe_ratio(control['sat_sum'], control['sat_n'])
+    recommendation_satisfaction = safe_ratio(recommendation['sat_sum'], recommendation['sat_n'])
     
     # Calculate improvement
-    if control_satisfaction > 0:
-        satisfaction_improvement = ((recommendation_satisfaction - control_satisfaction) / control_satisfaction) * 100
-    else:
-        satisfaction_improvement = 0
+    satisfaction_improvement = safe_ratio(recommendation_satisfaction - control_satisfaction,
+                                          control_satisfaction) * 100
     
     # Compile metrics
     metrics = {
@@ -43,51 +56,45 @@ def calculate_satisfaction_metrics(df):
     
     return metrics
 
-def calculate_satisfaction_by_category(df):
+def calculate_satisfaction_by_category(df, dimension='product_category'):
     """
     Calculate satisfaction metrics broken down by product category
     
+    Args:
+        df: DataFrame with e-commerce data
+        dimension: Column defining the segments, product category by default
+    
     Returns:
-        pd.DataFrame: DataFrame with satisfaction metrics by category
+        pd.DataFrame: DataFrame with satisfaction metrics by category, one row
+        per category and arm compared against control (the segment column is
+        named 'category' for product categories and after the dimension
+        otherwise; 'arm' names the arm)
     """
-    # Filter only purchased items with satisfaction scores
-    purchased_df = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
-    
-    categories = purchased_df['product_category'].unique()
-    results = []
-    
-    for category in categories:
-        category_df = purchased_df[purchased_df['product_category'] == category]
-        
-        # Split by test group
-        control_df = category_df[category_df['test_group'] == 'Control']
-        recommendation_df = category_df[category_df['test_group'] == 'Size Recommendation']
+    control_all, by_arm = compare_segments(df, dimension)
+    
+    frames = []
+    for arm, recommendation in by_arm.items():
+        # Only segments with rated purchases
+        rated = (control_all['sat_n'] + recommendation['sat_n']).to_numpy() > 0
+        control = control_all[rated]
+        recommendation = recommendation[rated]
         
         # Calculate satisfaction for each group
-        if len(control_df) > 0:
-            control_satisfaction = control_df['satisfaction_score'].mean()
-        else:
-            control_satisfaction = 0
-            
-        if len(recommendation_df) > 0:
-            recommendation_satisfaction = recommendation_df['satisfaction_score'].mean()
-        else:
-            recommendation_satisfaction = 0
-            
+        control_satisfaction = safe_ratios(control['sat_sum'], control['sat_n'])
+        recommendation_satisfaction = safe_ratios(recommendation['sat_sum'], recommendation['sat_n'])
+        
         # Calculate improvement
-        if control_satisfaction > 0:
-            improvement = ((recommendation_satisfaction - control_satisfaction) / control_satisfaction) * 100
-        else:
-            improvement = 0
-            
-        results.append({
-            'category': category,
+        improvement = safe_ratios(recommendation_satisfaction - control_satisfaction, control_satisfaction) * 100
+        
+        frames.append(pd.DataFrame({
+            segment_column(dimension): control.index.to_numpy(),
+            'arm': arm,
             'control_satisfaction': control_satisfaction,
             'recommendation_satisfaction': recommendation_satisfaction,
             'improvement': improvement
-        })
+        }))
     
-    return pd.DataFrame(results)
+    return pd.concat(frames, ignore_index=True)
 
 def calculate_nps_distribution(df):
     """
@@ -96,39 +103,116 @@ def calculate_nps_distribution(df):
     Returns:
         dict: Dictionary containing NPS metrics
     """
-    # Filter only purchased items with satisfaction scores
-    purchased_df = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
-    
-    # Map satisfaction scores to NPS categories
-    def map_to_nps(score):
-        if score >= 9:  # Promoters
-            return 'Promoter'
-        elif score >= 7:  # Passives
-            return 'Passive'
-        else:  # Detractors
-            return 'Detractor'
+    return nps_from_summary(summarize(df))
+
+def nps_from_summary(summary, control=CONTROL_GROUP):
+    """
+    Derive the NPS distribution from per-group satisfaction histograms
     
-    purchased_df['nps_category'] = purchased_df['satisfaction_score'].apply(map_to_nps)
+    Args:
+        summary: Output of metrics.engine.summarize grouped by test_group
+        control: Name of the control arm
     
-    # Calculate NPS for each test group
+    Returns:
+        dict: NPS metrics of the control and every other arm (see
+        metrics.engine.treatment_arms), control first
+    """
     nps_by_group = {}
     
-    for group in ['Control', 'Size Recommendation']:
-        group_df = purchased_df[purchased_df['test_group'] == group]
+    for group in [control] + treatment_arms(summary, control):
+        histogram = group_statistics(summary, group)[SCORE_BINS].to_numpy(dtype=np.float64)
+        group_stats = histogram_statistics(histogram)
         
-        if len(group_df) > 0:
-            promoters = (group_df['nps_category'] == 'Promoter').sum() / len(group_df) * 100
-            detractors = (group_df['nps_category'] == 'Detractor').sum() / len(group_df) * 100
-            nps = promoters - detractors
-        else:
-            promoters = 0
-            detractors = 0
-            nps = 0
-            
         nps_by_group[group] = {
-            'promoters': promoters,
-            'detractors': detractors,
-            'nps_score': nps
+            'promoters': group_stats['promoters'],
+            'detractors': group_stats['detractors'],
+            'nps_score': group_stats['nps_score']
         }
     
-    return nps_by_group
\ No newline at end of file
+    return nps_by_group
+
+def satisfaction_histogram(df, by='test_group'):
+    """
+    Count purchases by satisfaction score (bins 0 .. 10, 0 = not rated) per group
+    
+    Returns:
+        pd.DataFrame: One row per group, one column per score
+    """
+    histogram = summarize(df, by=by)[SCORE_BINS]
+    histogram.columns = range(len(SCORE_BINS))
+    return histogram
+
+def histogram_statistics(histogram, percentiles=(25, 50, 75, 90)):
+    """
+    Derive satisfaction statistics from score histograms
+    
+    Works on a single histogram (11 counts, index = score) or on a 2-D array
+    / DataFrame with one histogram per row; the cost depends only on the
+    number of histograms, not on the number of purchases behind them. Score
+    0 (not rated) is excluded.
+    
+    Args:
+        histogram: Counts per satisfaction score 0 .. 10
+        percentiles: Percentiles of the rated scores to report
+    
+    Returns:
+        dict or pd.DataFrame: n, mean, variance, std, percentiles
+        ('p25', ...), shares of promoters (9-10), passives (7-8) and
+        detractors (1-6) in percent, and nps_score
+    """
+    index = histogram.index if isinstance(histogram, pd.DataFrame) else None
+    counts = np.atleast_2d(np.asarray(histogram, dtype=np.float64))[:, 1:]
+    scores = np.arange(1, counts.shape[1] + 1)
+    
+    n = counts.sum(axis=1)
+    mean = safe_ratios(counts @ scores, n)
+    variance = safe_ratios(counts @ (scores ** 2) - n * mean ** 2, n - 1).clip(min=0)
+    
+    # NPS categories
+    promoters = safe_ratios(counts[:, scores >= 9].sum(axis=1), n) * 100
+    passives = safe_ratios(counts[:, (scores >= 7) & (scores < 9)].sum(axis=1), n) * 100
+    detractors = safe_ratios(counts[:, scores < 7].sum(axis=1), n) * 100
+    
+    result = {
+        'n': n,
+        'mean': mean,
+        'variance': variance,
+        'std': np.sqrt(variance)
+    }
+    
+    # Lowest score whose cumulative share reaches each percentile
+    cumulative = np.cumsum(counts, axis=1)
+    for percentile in percentiles:
+        reached = cumulative >= (percentile / 100) * n[:, None]
+        result[f'p{percentile}'] = np.where(n > 0, scores[reached.argmax(axis=1)], 0)
+    
+    result.update({
+        'promoters': promoters,
+        'passives': passives,
+        'detractors': detractors,
+        'nps_score': promoters - detractors
+    })
+    
+    if index is not None:
+        return pd.DataFrame(result, index=index)
+    if np.ndim(histogram) == 1:
+        return {key: value[0].item() for key, value in result.items()}
+    return pd.DataFrame(result)
+
+def satisfaction_quantiles_from_sketches(sketches, percentiles=(25, 50, 75, 90)):
+    """
+    Approximate satisfaction percentiles per test group from ingestion sketches
+    
+    Args:
+        sketches: sketches.DatasetSketches, e.g. from data_processing.load_sketches
+        percentiles: Percentiles of the rated scores to report
+    
+    Returns:
+        pd.DataFrame: One row per test group, columns 'n' and 'p25', ...
+    """
+    rows = {
+        group: [sketch.n] + list(sketch.quantile(np.asarray(percentiles) / 100))
+        for group, sketch in sketches.satisfaction.items()
+    }
+    columns = ['n'] + [f'p{percentile}' for percentile in percentiles]
+    return pd.DataFrame.from_dict(rows, orient='index', columns=columns).rename_axis('test_group')
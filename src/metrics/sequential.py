@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP, group_statistics
+
+# Sequentially tested metrics: (count, sum, sum of squares) statistics of an
+# observation, and the standard deviation of the normal mixture over the
+# effect (absolute difference treatment - control) used by the mSPRT
+SEQUENTIAL_METRICS = {
+    'conversion': ('rows', 'purchases', 'purchases', 0.02),
+    'return_rate': ('purchases', 'returns', 'returns', 0.02),
+    'satisfaction': ('sat_n', 'sat_sum', 'sat_sumsq', 0.5)
+}
+
+class SequentialTest:
+    """
+    Mixture sequential probability ratio test (mSPRT) of treatment vs control
+    
+    The test keeps only the running (count, sum, sum of squares) of each arm
+    and the smallest p-value seen so far. Each update with a micro-batch of
+    events is O(1), independent of how much history has been accumulated,
+    and the p-value and confidence sequence stay valid however often the
+    results are looked at: stopping as soon as p_value < alpha keeps the
+    false positive rate below alpha.
+    
+    With a normal mixture N(0, tau^2) over the effect, the mixture
+    likelihood ratio after observing an effect estimate d with variance V is
+    
+        sqrt(V / (V + tau^2)) * exp(tau^2 * d^2 / (2 * V * (V + tau^2)))
+    
+    and the always-valid p-value is the running minimum of its inverse.
+    
+    The state is a plain dict (see state / from_state), so it can be kept in
+    st.session_state between reruns.
+    """
+    
+    def __init__(self, metric='conversion', alpha=0.05, mixture_sd=None, control=CONTROL_GROUP,
+                 treatment=TREATMENT_GROUP):
+        """
+        Args:
+            metric: Key of SEQUENTIAL_METRICS
+            alpha: Significance level of the decision and of the confidence sequence
+            mixture_sd: Standard deviation of the mixture over the effect,
+                defaults to the metric's value in SEQUENTIAL_METRICS
+            control, treatment: Arms compared (treatment against control)
+        """
+        if metric not in SEQUENTIAL_METRICS:
+            raise ValueError(f"Unknown sequential test metric: {metric}")
+        
+        self.metric = metric
+        self.alpha = alpha
+        self.mixture_sd = SEQUENTIAL_METRICS[metric][3] if mixture_sd is None else mixture_sd
+        self.control = control
+        self.treatment = treatment
+        
+        # Running (count, sum, sum of squares) per arm: control, treatment
+        self.totals = np.zeros((2, 3))
+        self.p_value = 1.0
+        self.looks = 0
+        
+        # Last day included by update_from_cube
+        self.through = None
+    
+    def update(self, summary):
+        """
+        Add a micro-batch of events and re-evaluate the test
+        
+        Args:
+            summary: Output of metrics.engine.summarize grouped by test_group,
+                computed on the new events only (e.g. MetricsCube.query over
+                the days since the previous update)
+        
+        Returns:
+            dict: Test results after the update, see result()
+        """
+        columns = list(SEQUENTIAL_METRICS[self.metric][:3])
+        for arm, group in enumerate((self.control, self.treatment)):
+            self.totals[arm] += group_statistics(summary, group)[columns].to_numpy(dtype=np.float64)
+        
+        self.looks += 1
+        effect, variance = self._effect()
+        if variance > 0:
+            self.p_value = min(self.p_value, 1 / self._likelihood_ratio(effect, variance))
+        
+        return self.result()
+    
+    def update_from_cube(self, cube, category=None):
+        """
+        Add the days of a MetricsCube not seen by previous calls
+        
+        The cube's last day may still be receiving events, so it is only
+        added once a later day appears.
+        
+        Args:
+            cube: metrics.cube.MetricsCube over the growing dataset
+            category: Product category to test, None for all
+        
+        Returns:
+            dict: Test results, see result()
+        """
+        last_day = cube.first_day + pd.Timedelta(days=cube.n_days - 2)
+        first_day = cube.first_day if self.through is None else self.through + pd.Timedelta(days=1)
+        if first_day > last_day:
+            return self.result()
+        
+        self.through = last_day
+        return self.update(cube.query(date_range=(first_day, last_day), category=category))
+    
+    def result(self):
+        """
+        Current test results
+        
+        Returns:
+            dict: control_mean, treatment_mean, effect (treatment - control),
+            ci_low and ci_high (confidence sequence at level 1 - alpha),
+            p_value (always valid), is_significant, confidence, looks
+        """
+        means = self._means()
+        effect, variance = self._effect()
+        
+        if variance > 0:
+            tau2 = self.mixture_sd ** 2
+            half_width = np.sqrt(
+                variance * (variance + tau2) / tau2
+                * (np.log((variance + tau2) / variance) - 2 * np.log(self.alpha))
+            )
+        else:
+            half_width = np.inf
+        
+        return {
+            'control_mean': float(means[0]),
+            'treatment_mean': float(means[1]),
+            'effect': float(effect),
+            'ci_low': float(effect - half_width),
+            'ci_high': float(effect + half_width),
+            'p_value': float(self.p_value),
+            'is_significant': bool(self.p_value < self.alpha),
+            'confidence': float((1 - self.p_value) * 100),
+            'looks': self.looks
+        }
+    
+    @property
+    def state(self):
+        """Serializable state of the test"""
+        return {
+            'metric': self.metric,
+            'alpha': self.alpha,
+            'mixture_sd': self.mixture_sd,
+            'control': self.control,
+            'treatment': self.treatment,
+            'totals': self.totals.tolist(),
+            'p_value': self.p_value,
+            'looks': self.looks,
+            'through': None if self.through is None else self.through.isoformat()
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        """Restore a test from its state"""
+        test = cls(state['metric'], state['alpha'], state['mixture_sd'],
+                   state.get('control', CONTROL_GROUP), state.get('treatment', TREATMENT_GROUP))
+        test.totals = np.array(state['totals'], dtype=np.float64)
+        test.p_value = state['p_value']
+        test.looks = state['looks']
+        test.through = None if state['through'] is None else pd.Timestamp(state['through'])
+        return test
+    
+    def _means(self):
+        """Mean of an observation in each arm, 0 for an empty arm"""
+        n = self.totals[:, 0]
+        return np.divide(self.totals[:, 1], n, out=np.zeros(2), where=n > 0)
+    
+    def _effect(self):
+        """Effect estimate (treatment - control) and its variance, 0 until both arms have 2 observations"""
+        n, total, total_sq = self.totals.T
+        if np.any(n < 2):
+            return 0.0, 0.0
+        
+        means = total / n
+        variances = np.maximum(total_sq - n * means ** 2, 0) / (n - 1)
+        return means[1] - means[0], float(np.sum(variances / n))
+    
+    def _likelihood_ratio(self, effect, variance):
+        """Normal-mixture likelihood ratio of the effect estimate"""
+        tau2 = self.mixture_sd ** 2
+        log_ratio = (0.5 * np.log(variance / (variance + tau2))
+                     + tau2 * effect ** 2 / (2 * variance * (variance + tau2)))
+        return np.exp(min(log_ratio, 700.0))
+
+def sequential_tests(metrics=tuple(SEQUENTIAL_METRICS), alpha=0.05, control=CONTROL_GROUP,
+                     treatment=TREATMENT_GROUP):
+    """Fresh SequentialTest per metric of treatment against control, keyed by metric name"""
+    return {
+        metric: SequentialTest(metric, alpha, control=control, treatment=treatment)
+        for metric in metrics
+    }
@@ -0,0 +1,59 @@
+import importlib
+
+# Pages of the navigation menu, in menu order: module, component function and
+# whether the component takes the DataContext of the rerun. Modules are only
+# imported when their page is selected, so a rerun loads one page (and the
+# libraries it needs), not all of them.
+PAGES = {
+    "📊 Performance Overview": ('src.components.dashboard', 'Dashboard', True),
+    "💰 ROI Calculator": ('src.components.roi_calculator', 'ROICalculator', True),
+    "🔍 Segment Explorer": ('src.components.segment_explorer', 'SegmentExplorer', True),
+    "🌿 Sustainability Impact": ('src.components.sustainability_tracker', 'SustainabilityTracker', False),
+    "📷 Selfie Accuracy": ('src.components.selfie_accuracy', 'SelfieAccuracyAnalyzer', False),
+    "🛒 Customer Journey": ('src.components.customer_journey', 'CustomerJourney', False),
+    "🧪 A/B Testing Lab": ('src.components.ab_testing', 'ABTestingPanel', False),
+    "📈 Predictive Analytics": ('src.components.predictive_analytics', 'PredictiveAnalytics', False),
+    "👥 Demographic Insights": ('src.components.demographics', 'DemographicInsights', False),
+    "🚀 Brand Growth Timeline": ('src.components.brand_timeline', 'BrandTimeline', False)
+}
+
+# Page shown when a session starts
+LANDING_PAGE = "📊 Performance Overview"
+
+def load_page(nav):
+    """
+    Component function of a page, importing its module on first use
+    
+    Args:
+        nav: Navigation entry, a key of PAGES
+    
+    Returns:
+        callable or None: The component, taking the DataContext when the
+        page's entry says so; None if its module is not installed
+    """
+    module_name, function, _ = PAGES[nav]
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError as error:
+        # Only a missing page module; a missing dependency of an existing page must surface
+        if error.name != module_name:
+            raise
+        return None
+    return getattr(module, function)
+
+def render_page(nav, context):
+    """
+    Render a page with the DataContext of the rerun
+    
+    Returns:
+        bool: Whether the page exists, False if its module is not installed
+    """
+    component = load_page(nav)
+    if component is None:
+        return False
+    
+    if PAGES[nav][2]:
+        component(context)
+    else:
+        component()
+    return True
@@ -0,0 +1,455 @@
+import json
+import os
+import shutil
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_source import content_hash
+from src.sketches import DatasetSketches
+
+# Column types of the processed dataset
+SCHEMA = {
+    'date': 'datetime64[ns]',
+    'user_id': 'int64',
+    'product_id': 'int32',
+    'product_category': 'category',
+    'test_group': 'category',
+    'viewed': 'int8',
+    'added_to_cart': 'int8',
+    'purchased': 'int8',
+    'returned': 'int8',
+    'satisfaction_score': 'uint8'
+}
+
+# Stratified sample files: the sampled rows plus the number of dataset rows
+# of their stratum (test group x product category x day)
+STRATUM_ROWS_COLUMN = 'stratum_rows'
+SAMPLE_SCHEMA = {**SCHEMA, STRATUM_ROWS_COLUMN: 'int64'}
+
+# Partitioned layout: one file per period, its sketches and stratified
+# sample, and a manifest describing them
+MANIFEST_NAME = "manifest.json"
+SKETCH_SUFFIX = ".sketch.npz"
+SAMPLE_SUFFIX = ".sample"
+PARTITION_FREQUENCIES = {'month': 'M', 'day': 'D'}
+
+# Sampled rows per day, allocated to the strata of the day in proportion to
+# their size, and the minimum per stratum (enough for a variance estimate);
+# a year of data keeps about 110k rows whatever its size
+SAMPLE_ROWS_PER_DAY = 300
+MIN_STRATUM_ROWS = 2
+
+# Columnar layout: one .npy file per column (codes for categorical columns)
+# and a description of the columns
+COLUMNAR_META_NAME = "columns.json"
+
+def parquet_available():
+    """Check whether a Parquet engine (pyarrow or fastparquet) is installed"""
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            continue
+    return False
+
+def apply_schema(df, schema=SCHEMA):
+    """
+    Cast a raw frame (e.g. parsed from CSV) to the processed dataset schema
+    
+    Returns:
+        pd.DataFrame: Frame with the columns typed as in schema
+    """
+    columns = {}
+    for column, dtype in schema.items():
+        values = df[column]
+        if dtype.startswith('datetime64'):
+            values = pd.to_datetime(values, format='mixed')
+        elif dtype != 'category':
+            # CSV exports store flags and scores as floats ("1.0")
+            values = pd.to_numeric(values)
+        columns[column] = values.astype(dtype)
+    
+    return pd.DataFrame(columns)
+
+def read_processed_data(path, schema=SCHEMA):
+    """Read a processed dataset file, typed according to schema"""
+    path = Path(path)
+    
+    if path.suffix == '.parquet':
+        return apply_schema(pd.read_parquet(path), schema)
+    
+    dtypes = {column: dtype for column, dtype in schema.items() if not dtype.startswith('datetime64')}
+    return apply_schema(pd.read_csv(path, dtype=dtypes), schema)
+
+def write_processed_data(df, path):
+    """Write a processed dataset file, Parquet or CSV depending on the suffix"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    if path.suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def read_manifest(root):
+    """Manifest of a partitioned dataset, None if the dataset does not exist"""
+    try:
+        with open(Path(root) / MANIFEST_NAME) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_partitions(df, root, granularity='month'):
+    """
+    Write a dataset as one file per month (or day) plus a manifest
+    
+    Args:
+        df: Frame sorted by date, typed as in SCHEMA
+        root: Directory of the partitioned dataset
+        granularity: 'month' or 'day'
+    
+    Returns:
+        dict: The manifest written to root/manifest.json
+    """
+    root = Path(root)
+    suffix = '.parquet' if parquet_available() else '.csv'
+    previous = read_manifest(root)
+    
+    partitions = [
+        _write_partition(df.iloc[rows], root, period, suffix)
+        for period, rows in _split_by_period(df, granularity)
+    ]
+    
+    manifest = {
+        'granularity': granularity,
+        'categories': {
+            column: [str(value) for value in df[column].cat.categories]
+            for column, dtype in SCHEMA.items() if dtype == 'category'
+        },
+        'partitions': partitions
+    }
+    _write_manifest(root, manifest)
+    
+    # Remove partitions of a previous layout that are no longer referenced
+    if previous is not None:
+        current = {name for entry in partitions for name in (entry['file'], entry['sketch'], entry['sample'])}
+        for entry in previous['partitions']:
+            for name in (entry['file'], entry.get('sketch'), entry.get('sample')):
+                if name is not None and name not in current:
+                    (root / name).unlink(missing_ok=True)
+    
+    return manifest
+
+def append_partitions(df, root):
+    """
+    Add new rows to a partitioned dataset, rewriting only the periods they touch
+    
+    Returns:
+        dict: The updated manifest
+    """
+    root = Path(root)
+    manifest = read_manifest(root)
+    if manifest is None:
+        return write_partitions(_sorted(df), root)
+    
+    suffix = '.parquet' if parquet_available() else '.csv'
+    categories = manifest['categories']
+    for column in categories:
+        new_values = [str(value) for value in pd.unique(df[column].astype(str))]
+        categories[column] += [value for value in new_values if value not in categories[column]]
+    
+    df = _with_categories(_sorted(df), categories)
+    entries = {entry['period']: entry for entry in manifest['partitions']}
+    for period, rows in _split_by_period(df, manifest['granularity']):
+        new_rows = df.iloc[rows]
+        if period in entries:
+            existing = read_processed_data(root / entries[period]['file'])
+            existing = _with_categories(existing, categories)
+            new_rows = _sorted(pd.concat([existing, new_rows], ignore_index=True))
+        entries[period] = _write_partition(new_rows, root, period, suffix)
+    
+    manifest['partitions'] = [entries[period] for period in sorted(entries)]
+    _write_manifest(root, manifest)
+    
+    return manifest
+
+def select_partitions(manifest, start=None, end=None):
+    """Manifest entries overlapping [start, end), in date order"""
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    
+    return [
+        entry for entry in manifest['partitions']
+        if (end is None or pd.Timestamp(entry['start']) < end)
+        and (start is None or pd.Timestamp(entry['end']) > start)
+    ]
+
+def read_partitions(root, start=None, end=None):
+    """
+    Read the rows of a partitioned dataset with start <= date < end
+    
+    Only the partitions overlapping the range are opened.
+    
+    Returns:
+        pd.DataFrame: Rows sorted by date, typed as in SCHEMA
+    """
+    root = Path(root)
+    manifest = read_manifest(root)
+    categories = manifest['categories']
+    
+    frames = [
+        _with_categories(read_processed_data(root / entry['file']), categories)
+        for entry in select_partitions(manifest, start, end)
+    ]
+    if not frames:
+        empty = pd.DataFrame({column: pd.Series(dtype='object') for column in SCHEMA})
+        return _with_categories(apply_schema(empty), categories)
+    
+    df = pd.concat(frames, ignore_index=True)
+    
+    # Trim rows of the boundary partitions outside of the requested range
+    dates = df['date'].to_numpy(dtype='datetime64[ns]')
+    lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns'))
+    hi = len(df) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'ns'))
+    if lo > 0 or hi < len(df):
+        df = df.iloc[lo:hi].reset_index(drop=True)
+    
+    return df
+
+def read_sketches(root, start=None, end=None):
+    """
+    Merged sketches of the partitions overlapping [start, end)
+    
+    Sketches are kept per partition, so boundary partitions count in full:
+    the result covers whole months (or days) around the requested range.
+    Partitions written before sketches existed are sketched from their rows.
+    
+    Returns:
+        DatasetSketches: Sketches of the selected partitions, empty if none
+    """
+    root = Path(root)
+    manifest = read_manifest(root)
+    
+    merged = DatasetSketches()
+    for entry in select_partitions(manifest, start, end):
+        sketch_path = root / entry['sketch'] if 'sketch' in entry else None
+        if sketch_path is not None and sketch_path.exists():
+            sketches = DatasetSketches.load(sketch_path)
+        else:
+            sketches = DatasetSketches.from_frame(read_processed_data(root / entry['file']))
+        merged = merged.merge(sketches)
+    
+    return merged
+
+def read_samples(root):
+    """
+    Stratified sample of a partitioned dataset, drawn at ingestion
+    
+    Only the per-partition sample files are read. Partitions written before
+    samples existed are sampled from their rows.
+    
+    Returns:
+        pd.DataFrame: Sampled rows sorted by date, typed as in SAMPLE_SCHEMA
+    """
+    root = Path(root)
+    manifest = read_manifest(root)
+    categories = manifest['categories']
+    
+    frames = []
+    for entry in manifest['partitions']:
+        sample_path = root / entry['sample'] if 'sample' in entry else None
+        if sample_path is not None and sample_path.exists():
+            sample = read_processed_data(sample_path, SAMPLE_SCHEMA)
+        else:
+            rows = read_processed_data(root / entry['file'])
+            sample = sample_strata(rows, seed=_partition_seed(entry['period']))
+        frames.append(_with_categories(sample, categories))
+    
+    if not frames:
+        empty = pd.DataFrame({column: pd.Series(dtype='object') for column in SAMPLE_SCHEMA})
+        return _with_categories(apply_schema(empty, SAMPLE_SCHEMA), categories)
+    return pd.concat(frames, ignore_index=True)
+
+def sample_strata(df, rows_per_day=SAMPLE_ROWS_PER_DAY, seed=0):
+    """
+    Stratified sample of a frame, strata test_group x product_category x day
+    
+    Each day's rows_per_day rows are allocated to its strata in proportion
+    to their size, with at least MIN_STRATUM_ROWS per stratum (all of its
+    rows if it has fewer); rows are then drawn without replacement within
+    each stratum. Every non-empty stratum is represented, so the sample
+    holds the exact stratum sizes.
+    
+    Args:
+        df: Frame sorted by date, typed as in SCHEMA
+        rows_per_day: Rows sampled per day
+        seed: Seed of the random draw
+    
+    Returns:
+        pd.DataFrame: Sampled rows in the order of df, with a
+        STRATUM_ROWS_COLUMN column holding the size of their stratum
+    """
+    days = df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    groups = df['test_group'].astype('category').cat
+    categories = df['product_category'].astype('category').cat
+    n_cells = len(groups.categories) * len(categories.categories)
+    
+    # Stratum of every row, strata of a day are consecutive
+    day_codes = days - days.min() if len(df) else days
+    keys = (day_codes * n_cells
+            + groups.codes.to_numpy().astype(np.int64) * len(categories.categories)
+            + categories.codes.to_numpy().astype(np.int64))
+    stratum_keys, strata = np.unique(keys, return_inverse=True)
+    population = np.bincount(strata, minlength=len(stratum_keys))
+    
+    # Proportional allocation within each day
+    _, stratum_days = np.unique(stratum_keys // n_cells, return_inverse=True)
+    share = population / np.bincount(stratum_days, weights=population)[stratum_days]
+    allocation = np.clip(np.rint(rows_per_day * share).astype(np.int64),
+                         np.minimum(MIN_STRATUM_ROWS, population), population)
+    
+    # Random order within each stratum, keep the first allocation[h] rows
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(df)), strata))
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    rank = np.arange(len(df)) - starts[strata[order]]
+    positions = np.sort(order[rank < allocation[strata[order]]])
+    
+    sample = df.iloc[positions].reset_index(drop=True)
+    sample[STRATUM_ROWS_COLUMN] = population[strata[positions]].astype(np.int64)
+    return sample
+
+def write_columnar(df, directory):
+    """
+    Write a frame as one uncompressed .npy file per column
+    
+    The directory is written under a temporary name and moved in place
+    atomically, so concurrent readers (e.g. other worker processes) see
+    either nothing or the complete dataset.
+    """
+    directory = Path(directory)
+    tmp_directory = directory.with_name(f'{directory.name}.tmp-{os.getpid()}-{threading.get_ident()}')
+    tmp_directory.mkdir(parents=True, exist_ok=True)
+    
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            array = values.array.codes
+            columns.append({'name': column, 'dtype': 'category', 'categories': list(values.cat.categories)})
+        else:
+            array = values.to_numpy()
+            columns.append({'name': column, 'dtype': str(values.dtype)})
+        np.save(tmp_directory / f'{len(columns) - 1}.npy', np.ascontiguousarray(array))
+    
+    with open(tmp_directory / COLUMNAR_META_NAME, 'w') as f:
+        json.dump({'rows': len(df), 'columns': columns}, f)
+    
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # Written meanwhile by another process
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+def read_columnar(directory):
+    """
+    Memory-map a frame written by write_columnar
+    
+    The columns of the returned frame are read-only views of the files, not
+    copies: pages are loaded on first access and shared by every process
+    mapping the same files, so N workers on one host hold a single physical
+    copy of the data.
+    
+    Raises:
+        FileNotFoundError: If the directory holds no complete dataset
+    """
+    directory = Path(directory)
+    with open(directory / COLUMNAR_META_NAME) as f:
+        meta = json.load(f)
+    
+    columns = {}
+    for position, column in enumerate(meta['columns']):
+        # Plain ndarray view of the map, pandas operations then return ndarrays
+        array = np.asarray(np.load(directory / f'{position}.npy', mmap_mode='r'))
+        if column['dtype'] == 'category':
+            columns[column['name']] = pd.Categorical.from_codes(array, column['categories'])
+        else:
+            columns[column['name']] = pd.Series(array, copy=False)
+    
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta['rows']), copy=False)
+
+def _split_by_period(df, granularity):
+    """(period key, row slice) for each non-empty period of a frame sorted by date"""
+    if len(df) == 0:
+        return []
+    
+    freq = PARTITION_FREQUENCIES[granularity]
+    dates = df['date'].to_numpy(dtype='datetime64[ns]')
+    periods = pd.period_range(pd.Timestamp(dates[0]), pd.Timestamp(dates[-1]), freq=freq)
+    bounds = np.searchsorted(dates, periods.start_time.as_unit('ns').to_numpy()[1:])
+    bounds = np.concatenate([[0], bounds, [len(df)]])
+    
+    return [
+        (str(period), slice(int(lo), int(hi)))
+        for period, lo, hi in zip(periods, bounds[:-1], bounds[1:])
+        if hi > lo
+    ]
+
+def _write_partition(df, root, period, suffix):
+    """
+    Write the rows of one period, its sketches and stratified sample, and
+    return its manifest entry
+    """
+    path = Path(root) / f"date={period}{suffix}"
+    write_processed_data(df, path)
+    
+    # Sketches maintained at ingestion, merged at query time by read_sketches
+    sketch_path = Path(root) / f"date={period}{SKETCH_SUFFIX}"
+    DatasetSketches.from_frame(df).save(sketch_path)
+    
+    # Sample drawn at ingestion, concatenated at query time by read_samples;
+    # strata lie within a day, so the partitions' samples add up
+    sample_path = Path(root) / f"date={period}{SAMPLE_SUFFIX}{suffix}"
+    write_processed_data(sample_strata(df, seed=_partition_seed(period)), sample_path)
+    
+    period = pd.Period(period)
+    return {
+        'period': str(period),
+        'file': path.name,
+        'sketch': sketch_path.name,
+        'sample': sample_path.name,
+        'start': period.start_time.isoformat(),
+        'end': (period + 1).start_time.isoformat(),
+        'min_date': df['date'].min().isoformat(),
+        'max_date': df['date'].max().isoformat(),
+        'rows': len(df),
+        'bytes': path.stat().st_size,
+        'hash': content_hash(path)
+    }
+
+def _partition_seed(period):
+    """Seed of the sample of a partition, reproducible and distinct per period"""
+    return zlib.crc32(str(period).encode())
+
+def _write_manifest(root, manifest):
+    """Replace the manifest atomically, readers never see a partial file"""
+    path = Path(root) / MANIFEST_NAME
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _with_categories(df, categories):
+    """Give categorical columns the dataset-wide categories, so partitions concatenate"""
+    for column, values in categories.items():
+        df[column] = df[column].astype(pd.CategoricalDtype(values))
+    return df
+
+def _sorted(df):
+    """Rows of df ordered by date (stable)"""
+    return df.sort_values('date', kind='stable', ignore_index=True)
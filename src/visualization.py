@@ -3,6 +3,9 @@ import plotly.express as px
 import pandas as pd
 import numpy as np
 
+from src.metrics.engine import CONTROL_GROUP, safe_ratios, summarize, summarize_segments
+from src.metrics.overview import arm_metrics_from_summary
+
 # Color palette inspired by the monochromatic aesthetic
 COLORS = {
     'primary': '#d0d0d0',    # Light gray
@@ -13,57 +16,54 @@ COLORS = {
     'negative': '#e4a0a0'    # Muted red
 }
 
+# Colors of the test groups, control first
+ARM_COLORS = [COLORS['secondary'], COLORS['primary'], COLORS['accent'], COLORS['positive'], COLORS['negative']]
+
+def arm_color(position):
+    """Color of the test group at a position (control is 0)"""
+    return ARM_COLORS[position % len(ARM_COLORS)]
+
 def create_conversion_chart(df):
-    """Create conversion rate chart comparing control vs recommendation groups"""
-    # Calculate conversion rates
-    control_df = df[df['test_group'] == 'Control']
-    rec_df = df[df['test_group'] == 'Size Recommendation']
-    
-    control_view_to_cart = control_df['added_to_cart'].mean() * 100
-    control_cart_to_purchase = control_df[control_df['added_to_cart'] == 1]['purchased'].mean() * 100
-    control_overall = control_df['purchased'].mean() * 100
+    """Create conversion rate chart comparing every test group against control"""
+    return conversion_chart_from_summary(summarize(df))
+
+def conversion_chart_from_summary(summary):
+    """
+    Conversion rate chart from a per-group summary
     
-    rec_view_to_cart = rec_df['added_to_cart'].mean() * 100
-    rec_cart_to_purchase = rec_df[rec_df['added_to_cart'] == 1]['purchased'].mean() * 100
-    rec_overall = rec_df['purchased'].mean() * 100
+    Args:
+        summary: Output of metrics.engine.summarize (or MetricsCube.query)
+    """
+    # Conversion rates of every arm
+    metrics = arm_metrics_from_summary(summary)
+    stages = {
+        'View to Cart': 'view_to_cart',
+        'Cart to Purchase': 'cart_to_purchase',
+        'Overall Conversion': 'conversion_rate'
+    }
     
     # Create the figure
     fig = go.Figure()
     
-    # Add bars for control group
-    fig.add_trace(go.Bar(
-        x=['View to Cart', 'Cart to Purchase', 'Overall Conversion'],
-        y=[control_view_to_cart, control_cart_to_purchase, control_overall],
-        name='Control',
-        marker_color=COLORS['secondary']
-    ))
-    
-    # Add bars for recommendation group
-    fig.add_trace(go.Bar(
-        x=['View to Cart', 'Cart to Purchase', 'Overall Conversion'],
-        y=[rec_view_to_cart, rec_cart_to_purchase, rec_overall],
-        name='Size Recommendation',
-        marker_color=COLORS['primary']
-    ))
-    
-    # Calculate and display improvement percentages
-    improvements = [
-        (rec_view_to_cart - control_view_to_cart) / control_view_to_cart * 100,
-        (rec_cart_to_purchase - control_cart_to_purchase) / control_cart_to_purchase * 100,
-        (rec_overall - control_overall) / control_overall * 100
-    ]
-    
-    for i, (x, y, imp) in enumerate(zip(
-        ['View to Cart', 'Cart to Purchase', 'Overall Conversion'],
-        [rec_view_to_cart, rec_cart_to_purchase, rec_overall],
-        improvements
-    )):
-        fig.add_annotation(
-            x=x, y=y + 3,
-            text=f"+{imp:.1f}%",
-            showarrow=False,
-            font=dict(color=COLORS['positive'])
-        )
+    # Add bars for each group
+    for position, (arm, row) in enumerate(metrics.iterrows()):
+        fig.add_trace(go.Bar(
+            x=list(stages),
+            y=[row[column] for column in stages.values()],
+            name=arm,
+            marker_color=arm_color(position)
+        ))
+        
+        # Display improvement percentages against control
+        if arm == CONTROL_GROUP:
+            continue
+        for stage, column in stages.items():
+            fig.add_annotation(
+                x=stage, y=row[column] + 3,
+                text=f"{row[column + '_change']:+.1f}%",
+                showarrow=False,
+                font=dict(color=COLORS['positive'])
+            )
     
     # Update layout
     fig.update_layout(
@@ -86,56 +86,49 @@ def create_conversion_chart(df):
     return fig
 
 def create_return_rate_chart(df):
-    """Create return rate chart comparing control vs recommendation groups"""
-    # Calculate return rates by category
-    categories = df['product_category'].unique()
-    
-    control_returns = []
-    rec_returns = []
+    """Create return rate chart comparing every test group against control"""
+    return return_rate_chart_from_segments(summarize_segments(df, groups=None))
+
+def return_rate_chart_from_segments(by_group):
+    """
+    Return rate chart from per-category summaries of every arm
     
-    for category in categories:
-        cat_df = df[df['product_category'] == category]
-        
-        control_cat_df = cat_df[(cat_df['test_group'] == 'Control') & (cat_df['purchased'] == 1)]
-        rec_cat_df = cat_df[(cat_df['test_group'] == 'Size Recommendation') & (cat_df['purchased'] == 1)]
-        
-        control_return_rate = control_cat_df['returned'].mean() * 100 if len(control_cat_df) > 0 else 0
-        rec_return_rate = rec_cat_df['returned'].mean() * 100 if len(rec_cat_df) > 0 else 0
-        
-        control_returns.append(control_return_rate)
-        rec_returns.append(rec_return_rate)
+    Args:
+        by_group: Output of metrics.engine.summarize_segments (or
+            MetricsCube.query_segments), control first
+    """
+    return_rates = {
+        arm: safe_ratios(statistics['returns'], statistics['purchases']) * 100
+        for arm, statistics in by_group.items()
+    }
     
     # Create the figure
     fig = go.Figure()
     
     # Add lines
-    fig.add_trace(go.Scatter(
-        x=categories,
-        y=control_returns,
-        mode='lines+markers',
-        name='Control',
-        line=dict(color=COLORS['secondary'], width=3),
-        marker=dict(size=10, color=COLORS['secondary'])
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=categories,
-        y=rec_returns,
-        mode='lines+markers',
-        name='Size Recommendation',
-        line=dict(color=COLORS['primary'], width=3),
-        marker=dict(size=10, color=COLORS['primary'])
-    ))
-    
-    # Add improvement annotations
-    for i, (cat, ctrl, rec) in enumerate(zip(categories, control_returns, rec_returns)):
-        reduction = ((ctrl - rec) / ctrl * 100) if ctrl > 0 else 0
-        fig.add_annotation(
-            x=cat, y=rec - 2,
-            text=f"-{reduction:.1f}%",
-            showarrow=False,
-            font=dict(color=COLORS['positive'])
-        )
+    for position, (arm, rates) in enumerate(return_rates.items()):
+        categories = by_group[arm].index
+        fig.add_trace(go.Scatter(
+            x=categories,
+            y=rates,
+            mode='lines+markers',
+            name=arm,
+            line=dict(color=arm_color(position), width=3),
+            marker=dict(size=10, color=arm_color(position))
+        ))
+        
+        # Add improvement annotations against control
+        if arm == CONTROL_GROUP or CONTROL_GROUP not in return_rates:
+            continue
+        control_rates = return_rates[CONTROL_GROUP]
+        reductions = safe_ratios(control_rates - rates, control_rates) * 100
+        for cat, rec, reduction in zip(categories, rates, reductions):
+            fig.add_annotation(
+                x=cat, y=rec - 2,
+                text=f"-{reduction:.1f}%",
+                showarrow=False,
+                font=dict(color=COLORS['positive'])
+            )
     
     # Update layout
     fig.update_layout(
@@ -158,38 +151,40 @@ def create_return_rate_chart(df):
     return fig
 
 def create_satisfaction_chart(df):
-    """Create customer satisfaction chart comparing control vs recommendation groups"""
-    # Filter only purchased items with satisfaction scores
-    purchased_df = df[df['purchased'] == 1]
+    """Create customer satisfaction chart comparing every test group against control"""
+    return satisfaction_chart_from_summary(summarize(df))
+
+def satisfaction_chart_from_summary(summary):
+    """
+    Customer satisfaction chart from a per-group summary
     
-    # Group by test group and calculate average satisfaction
-    satisfaction_by_group = purchased_df.groupby('test_group')['satisfaction_score'].mean().reset_index()
+    Args:
+        summary: Output of metrics.engine.summarize (or MetricsCube.query)
+    """
+    # Average satisfaction of purchased items per test group
+    metrics = arm_metrics_from_summary(summary)
     
     # Create the figure
     fig = go.Figure()
     
     # Add bars
     fig.add_trace(go.Bar(
-        x=satisfaction_by_group['test_group'],
-        y=satisfaction_by_group['satisfaction_score'],
-        marker_color=[COLORS['secondary'], COLORS['primary']],
-        text=satisfaction_by_group['satisfaction_score'].round(1),
+        x=metrics.index,
+        y=metrics['satisfaction'],
+        marker_color=[arm_color(position) for position in range(len(metrics))],
+        text=metrics['satisfaction'].round(1),
         textposition='auto',
     ))
     
-    # Calculate improvement
-    control_score = satisfaction_by_group[satisfaction_by_group['test_group'] == 'Control']['satisfaction_score'].values[0]
-    rec_score = satisfaction_by_group[satisfaction_by_group['test_group'] == 'Size Recommendation']['satisfaction_score'].values[0]
-    improvement = ((rec_score - control_score) / control_score) * 100
-    
-    # Add improvement annotation
-    fig.add_annotation(
-        x='Size Recommendation',
-        y=rec_score + 0.3,
-        text=f"+{improvement:.1f}%",
-        showarrow=False,
-        font=dict(color=COLORS['positive'])
-    )
+    # Add improvement annotations against control
+    for arm, row in metrics.drop(index=CONTROL_GROUP, errors='ignore').iterrows():
+        fig.add_annotation(
+            x=arm,
+            y=row['satisfaction'] + 0.3,
+            text=f"{row['satisfaction_change']:+.1f}%",
+            showarrow=False,
+            font=dict(color=COLORS['positive'])
+        )
     
     # Update layout
     fig.update_layout(
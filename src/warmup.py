@@ -0,0 +1,137 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from src.cache import cached_result
+from src.data_processing import load_data, shared_data_source
+from src.metrics.cube import load_metrics_cube
+
+# Standard date windows of the sidebar, in days up to the last date of the
+# data (None: the whole range, the default of the date inputs)
+STANDARD_WINDOWS = {
+    'All Time': None,
+    'Last 30 Days': 30,
+    'Last Quarter': 90
+}
+
+# Figures of the Performance Overview: function of src.visualization building
+# the figure, and MetricsCube method querying its data
+DASHBOARD_CHARTS = {
+    'conversion_chart': ('conversion_chart_from_summary', 'query'),
+    'return_rate_chart': ('return_rate_chart_from_segments', 'query_segments'),
+    'satisfaction_chart': ('satisfaction_chart_from_summary', 'query')
+}
+
+# Threads precomputing the results of the standard filters
+WARM_UP_WORKERS = 4
+
+def dashboard_overview(category, date_range):
+    """
+    Overview metrics and bootstrap intervals of the lifts for a filter, for
+    every arm against control
+    
+    Computed from the metrics cube and shared across sessions (and restarts)
+    until the data changes.
+    
+    Returns:
+        dict: Arm (see metrics.engine.treatment_arms) -> (overview, intervals)
+        as in metrics.overview.overview_metrics_from_summary and
+        metrics.bootstrap.bootstrap_overview_intervals
+    """
+    def compute():
+        # scipy is only imported on a cache miss
+        from src.metrics.overview import overview_by_arm
+        from src.metrics.bootstrap import bootstrap_overview_intervals
+        
+        summary = load_metrics_cube().query(date_range=date_range, category=category)
+        return {
+            arm: (overview, bootstrap_overview_intervals(summary, treatment=arm))
+            for arm, overview in overview_by_arm(summary).items()
+        }
+    
+    return cached_result('overview', compute, category=category, date_range=date_range, persist=True)
+
+def dashboard_chart(name, category, date_range):
+    """
+    Figure of DASHBOARD_CHARTS for a filter
+    
+    The data of the figure is queried from the metrics cube, independent of
+    the number of rows; the figure itself is rebuilt on every call rather
+    than cached, so sessions never share (or unpickle) figure objects.
+    """
+    # plotly is only imported when a chart is drawn
+    from src import visualization
+    
+    figure, query = DASHBOARD_CHARTS[name]
+    data = getattr(load_metrics_cube(), query)(date_range=date_range, category=category)
+    return getattr(visualization, figure)(data)
+
+def standard_date_ranges(data):
+    """
+    (start date, end date) of every window of STANDARD_WINDOWS
+    
+    Args:
+        data: DataFrame with a 'date' column
+    
+    Returns:
+        dict: Window name -> (start, end), both inclusive
+    """
+    min_date = data['date'].min().date()
+    max_date = data['date'].max().date()
+    
+    ranges = {}
+    for name, days in STANDARD_WINDOWS.items():
+        start = min_date if days is None else max(min_date, max_date - timedelta(days=days - 1))
+        ranges[name] = (start, max_date)
+    return ranges
+
+def warm_up(executor=None):
+    """
+    Precompute the Performance Overview of every category x standard window
+    
+    Builds the metrics cube (the data of every chart) and the overview of
+    each filter through the same cache entries as the Dashboard, so a first
+    visit of any of these filters is served from the cache.
+    
+    Args:
+        executor: Executor running the computations, the warm-up pool by default
+    
+    Returns:
+        list: Futures of the computations
+    """
+    executor = executor or _pool
+    data = load_data()
+    categories = ['All Categories'] + list(data['product_category'].unique())
+    
+    # The cube is shared by every overview, build it first
+    futures = [executor.submit(load_metrics_cube)]
+    for date_range in standard_date_ranges(data).values():
+        for category in categories:
+            futures.append(executor.submit(dashboard_overview, category, date_range))
+    return futures
+
+def enable_warm_up():
+    """
+    Warm the cache in the background after every (re)load of the shared dataset
+    
+    Idempotent; when the data is already loaded, a warm-up starts right away.
+    """
+    global _enabled
+    source = shared_data_source()
+    with _lock:
+        if _enabled:
+            return
+        _enabled = True
+    
+    source.add_listener(_schedule)
+    if source.is_current():
+        _pool.submit(warm_up)
+
+def _schedule(source):
+    """DataSource listener: start a warm-up once the source is unlocked"""
+    _pool.submit(warm_up)
+
+# Background threads of the warm-up, shared by the whole process
+_pool = ThreadPoolExecutor(max_workers=WARM_UP_WORKERS, thread_name_prefix='warm-up')
+_lock = threading.Lock()
+_enabled = False
@@ -0,0 +1,28 @@
+import pytest
+
+from src import data_processing
+from src.data_processing import generate_sample_data
+from src.data_source import DataSource
+from src.indexing import DataIndex, sort_by_date
+
+@pytest.fixture(scope='session')
+def ecommerce_data():
+    """Simulated dataset sorted by date, shared (read-only) by the tests"""
+    return sort_by_date(generate_sample_data(20_000, seed=7))
+
+@pytest.fixture(scope='session')
+def three_arm_data(ecommerce_data):
+    """Same dataset with half of the treatment rows moved to a third arm"""
+    df = ecommerce_data.copy()
+    groups = df['test_group'].cat.add_categories(['Variant B'])
+    groups[(groups == 'Size Recommendation') & (df['user_id'] % 2 == 0)] = 'Variant B'
+    df['test_group'] = groups
+    return df
+
+@pytest.fixture
+def shared_source(tmp_path, monkeypatch):
+    """Fresh shared dataset, generated and cached under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    source = DataSource(data_processing.read_shared_data, data_processing.storage_path, build_index=DataIndex)
+    monkeypatch.setattr(data_processing, '_shared_source', source)
+    return source
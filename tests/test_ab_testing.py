@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.metrics.ab_testing import (
+    adjust_pvalues,
+    anova_test,
+    batch_mean_tests,
+    batch_proportion_tests,
+    chi_square_test,
+    merge_moments,
+    moments_from_sums,
+    multi_arm_test_from_summary,
+    proportions_ztest,
+    segment_ab_tests,
+    welch_ttest
+)
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP, merge_summaries, summarize
+
+def test_welch_ttest_matches_scipy():
+    rng = np.random.default_rng(0)
+    a = rng.normal(7.5, 1.2, size=400)
+    b = rng.normal(7.8, 2.0, size=250)
+    
+    t_stat, p_value, dof = welch_ttest(a.mean(), a.var(ddof=1), len(a), b.mean(), b.var(ddof=1), len(b))
+    expected = stats.ttest_ind(a, b, equal_var=False)
+    
+    assert t_stat == pytest.approx(expected.statistic)
+    assert p_value == pytest.approx(expected.pvalue)
+    assert dof == pytest.approx(expected.df)
+
+def test_welch_ttest_broadcasts_over_segments():
+    mean1, var1, n1 = np.array([1.0, 2.0]), np.array([1.0, 4.0]), np.array([30, 50])
+    mean2, var2, n2 = np.array([1.5, 2.0]), np.array([2.0, 1.0]), np.array([40, 60])
+    
+    t_stat, p_value, _ = welch_ttest(mean1, var1, n1, mean2, var2, n2)
+    expected = stats.ttest_ind_from_stats(mean1, np.sqrt(var1), n1, mean2, np.sqrt(var2), n2, equal_var=False)
+    
+    np.testing.assert_allclose(t_stat, expected.statistic)
+    np.testing.assert_allclose(p_value, expected.pvalue)
+
+def test_welch_ttest_undefined_for_tiny_samples():
+    assert welch_ttest(1.0, 0.5, 1, 2.0, 0.5, 10) == (0.0, 1.0, 0.0)
+
+def test_proportions_ztest_matches_the_chi_square_test():
+    z_stat, p_value = proportions_ztest(120, 400, 150, 420)
+    expected = stats.chi2_contingency([[120, 280], [150, 270]], correction=False)
+    
+    assert z_stat < 0
+    assert z_stat ** 2 == pytest.approx(expected.statistic)
+    assert p_value == pytest.approx(expected.pvalue)
+    assert proportions_ztest(0, 0, 5, 10) == (0.0, 1.0)
+
+def test_moments_merge_across_shards():
+    rng = np.random.default_rng(2)
+    a, b = rng.normal(3.0, 1.0, size=70), rng.normal(4.0, 2.0, size=30)
+    
+    mean_a, var_a = moments_from_sums(len(a), a.sum(), (a ** 2).sum())
+    mean_b, var_b = moments_from_sums(len(b), b.sum(), (b ** 2).sum())
+    n, mean, variance = merge_moments(len(a), mean_a, var_a, len(b), mean_b, var_b)
+    
+    union = np.concatenate([a, b])
+    assert mean_a == pytest.approx(a.mean()) and var_a == pytest.approx(a.var(ddof=1))
+    assert (n, mean, variance) == pytest.approx((100, union.mean(), union.var(ddof=1)))
+
+def test_merge_summaries_of_shards(ecommerce_data):
+    df = ecommerce_data
+    shards = [df.iloc[:7000], df.iloc[7000:15000], df.iloc[15000:]]
+    
+    merged = merge_summaries(*(summarize(shard, ['product_category', 'test_group']) for shard in shards))
+    
+    pd.testing.assert_frame_equal(merged, summarize(df, ['product_category', 'test_group']),
+                                  check_dtype=False, check_index_type=False, check_like=True)
+
+def test_adjust_pvalues_benjamini_hochberg_matches_scipy():
+    p_values = np.array([0.01, 0.04, 0.03, 0.005, 0.2, 0.04, 0.9])
+    np.testing.assert_allclose(adjust_pvalues(p_values, 'fdr_bh'), stats.false_discovery_control(p_values))
+
+def test_adjust_pvalues_holm():
+    p_values = np.array([0.01, 0.04, 0.03, 0.005])
+    
+    # Holm-Bonferroni: sorted p-values times (m - rank + 1), made monotone
+    expected = np.empty(4)
+    running = 0.0
+    for rank, position in enumerate(np.argsort(p_values)):
+        running = max(running, min(1.0, p_values[position] * (4 - rank)))
+        expected[position] = running
+    
+    np.testing.assert_allclose(adjust_pvalues(p_values, 'holm'), expected)
+
+def test_adjust_pvalues_rejects_unknown_methods():
+    with pytest.raises(ValueError):
+        adjust_pvalues([0.1, 0.2], 'bonferroni')
+
+def test_batch_proportion_tests_match_single_tests():
+    control, control_n = np.array([30, 55, 0]), np.array([100, 120, 0])
+    treatment, treatment_n = np.array([42, 50, 3]), np.array([110, 118, 9])
+    
+    results = batch_proportion_tests(control, control_n, treatment, treatment_n, correction=None)
+    
+    for i in range(3):
+        z_stat, p_value = proportions_ztest(treatment[i], treatment_n[i], control[i], control_n[i])
+        assert results['statistic'].iloc[i] == pytest.approx(z_stat)
+        assert results['p_value'].iloc[i] == pytest.approx(p_value)
+    np.testing.assert_allclose(results['difference'], results['treatment_rate'] - results['control_rate'])
+    assert (results['ci_low'] <= results['difference']).all() and (results['difference'] <= results['ci_high']).all()
+
+def test_batch_mean_tests_interval_matches_scipy():
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(7.0, 1.0, size=60), rng.normal(7.6, 1.8, size=45)
+    
+    results = batch_mean_tests([a.mean()], [a.var(ddof=1)], [len(a)], [b.mean()], [b.var(ddof=1)], [len(b)])
+    expected = stats.ttest_ind(b, a, equal_var=False)
+    interval = expected.confidence_interval(0.95)
+    
+    assert results['p_value'].iloc[0] == pytest.approx(expected.pvalue)
+    assert results['ci_low'].iloc[0] == pytest.approx(interval.low)
+    assert results['ci_high'].iloc[0] == pytest.approx(interval.high)
+
+def test_segment_ab_tests_match_row_level_tests(three_arm_data):
+    # A small slice keeps the p-values away from 0
+    df = three_arm_data.iloc[:2500]
+    rated = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+    
+    results = segment_ab_tests(df, 'product_category', 'satisfaction', correction='holm')
+    
+    # Every arm against control, one correction over all the tests
+    assert list(results.index.unique('arm')) == [TREATMENT_GROUP, 'Variant B']
+    raw = []
+    for arm, category in results.index:
+        scores = rated[rated['product_category'] == category]
+        expected = stats.ttest_ind(scores.loc[scores['test_group'] == arm, 'satisfaction_score'],
+                                   scores.loc[scores['test_group'] == CONTROL_GROUP, 'satisfaction_score'],
+                                   equal_var=False)
+        assert results.loc[(arm, category), 'p_value'] == pytest.approx(expected.pvalue)
+        raw.append(expected.pvalue)
+    np.testing.assert_allclose(results['p_adjusted'], adjust_pvalues(raw, 'holm'))
+    
+    with pytest.raises(ValueError):
+        segment_ab_tests(df, metric='revenue')
+
+def test_chi_square_test_matches_scipy():
+    successes = np.array([120, 150, 90])
+    trials = np.array([400, 420, 380])
+    
+    statistic, p_value, dof = chi_square_test(successes, trials)
+    expected = stats.chi2_contingency(np.column_stack([successes, trials - successes]), correction=False)
+    
+    assert statistic == pytest.approx(expected.statistic)
+    assert p_value == pytest.approx(expected.pvalue)
+    assert dof == expected.dof
+
+def test_chi_square_test_of_two_samples_is_the_z_test():
+    statistic, p_value, _ = chi_square_test([120, 150], [400, 420])
+    z_stat, z_p_value = proportions_ztest(120, 400, 150, 420)
+    
+    assert statistic == pytest.approx(z_stat ** 2)
+    assert p_value == pytest.approx(z_p_value)
+
+def test_anova_test_matches_scipy():
+    rng = np.random.default_rng(1)
+    samples = [rng.normal(loc, 1.5, size=size) for loc, size in ((7.0, 120), (7.4, 90), (7.1, 150))]
+    
+    statistic, p_value, dof = anova_test(
+        [sample.mean() for sample in samples],
+        [sample.var(ddof=1) for sample in samples],
+        [len(sample) for sample in samples]
+    )
+    expected = stats.f_oneway(*samples)
+    
+    assert statistic == pytest.approx(expected.statistic)
+    assert p_value == pytest.approx(expected.pvalue)
+    assert dof == (2, 357)
+
+def test_multi_arm_test_matches_row_level_tests(three_arm_data):
+    # A small slice keeps the p-values away from 0
+    df = three_arm_data.iloc[:900]
+    
+    result = multi_arm_test_from_summary(summarize(df), 'satisfaction')
+    
+    assert result['arms'] == [CONTROL_GROUP, TREATMENT_GROUP, 'Variant B']
+    rated = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+    scores = {arm: rated.loc[rated['test_group'] == arm, 'satisfaction_score'] for arm in result['arms']}
+    assert result['p_value'] == pytest.approx(stats.f_oneway(*scores.values()).pvalue)
+    
+    raw = [stats.ttest_ind(scores[arm], scores[CONTROL_GROUP], equal_var=False).pvalue
+           for arm in result['arms'][1:]]
+    pairwise = result['pairwise']
+    assert list(pairwise.index) == result['arms'][1:]
+    np.testing.assert_allclose(pairwise['p_value'], raw)
+    np.testing.assert_allclose(pairwise['p_adjusted'], adjust_pvalues(raw, 'holm'))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.metrics.engine import (
+    CONTROL_GROUP,
+    TREATMENT_GROUP,
+    arms,
+    summarize,
+    summarize_segments,
+    treatment_arms
+)
+from src.metrics.overview import calculate_arm_metrics, overview_by_arm, overview_metrics_from_summary
+from src.metrics.satisfaction import nps_from_summary
+
+ARMS = [CONTROL_GROUP, TREATMENT_GROUP, 'Variant B']
+
+def test_arms_put_control_first(three_arm_data):
+    summary = summarize(three_arm_data)
+    
+    assert arms(summary) == ARMS
+    assert arms(summary, control='Variant B') == ['Variant B', CONTROL_GROUP, TREATMENT_GROUP]
+    assert arms(summarize(three_arm_data, ['product_category', 'test_group'])) == ARMS
+
+def test_arm_metrics_match_row_level(three_arm_data):
+    df = three_arm_data
+    metrics = calculate_arm_metrics(df)
+    
+    assert list(metrics.index) == ARMS
+    for arm in ARMS:
+        rows = df[df['test_group'] == arm]
+        rated = rows[(rows['purchased'] == 1) & (rows['satisfaction_score'] > 0)]
+        
+        assert metrics.loc[arm, 'conversion_rate'] == pytest.approx(rows['purchased'].mean() * 100)
+        assert metrics.loc[arm, 'return_rate'] == pytest.approx(rows.loc[rows['purchased'] == 1, 'returned'].mean() * 100)
+        assert metrics.loc[arm, 'satisfaction'] == pytest.approx(rated['satisfaction_score'].mean())
+    
+    control = metrics.loc[CONTROL_GROUP, 'conversion_rate']
+    np.testing.assert_allclose(metrics['conversion_rate_change'], (metrics['conversion_rate'] - control) / control * 100)
+
+def test_summarize_segments_returns_every_arm(three_arm_data):
+    by_group = summarize_segments(three_arm_data, groups=None)
+    
+    assert list(by_group) == ARMS
+    for arm, segments in by_group.items():
+        rows = three_arm_data[three_arm_data['test_group'] == arm]
+        np.testing.assert_array_equal(segments['rows'], rows.groupby('product_category', observed=True).size())
+
+def test_treatment_arms_exclude_control(three_arm_data):
+    summary = summarize(three_arm_data)
+    
+    assert treatment_arms(summary) == ARMS[1:]
+    assert treatment_arms(summary.iloc[:0]) == [TREATMENT_GROUP]
+
+def test_overview_covers_every_arm(three_arm_data):
+    summary = summarize(three_arm_data)
+    overview = overview_by_arm(summary)
+    
+    assert list(overview) == ARMS[1:]
+    # Each arm is compared against control alone
+    pairwise = overview_metrics_from_summary(summary.loc[[CONTROL_GROUP, 'Variant B']], treatment='Variant B')
+    assert overview['Variant B']['conversion'] == pairwise['conversion']
+    assert overview['Variant B']['satisfaction_test'] == pairwise['satisfaction_test']
+    
+    nps = nps_from_summary(summary)
+    assert list(nps) == ARMS
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import integrate, stats
+
+from src.metrics.bayesian import bayesian_proportion_tests, bayesian_segment_tests, beta_posteriors
+from src.metrics.cube import MetricsCube
+from src.metrics.engine import CONTROL_GROUP
+
+SUCCESSES = np.array([[30, 42], [120, 110]])
+TRIALS = np.array([[100, 110], [400, 390]])
+
+def _prob_beat(alpha_control, beta_control, alpha, beta):
+    """P(rate > control rate) for independent Beta posteriors, by numerical integration"""
+    integrand = lambda x: stats.beta.pdf(x, alpha, beta) * stats.beta.cdf(x, alpha_control, beta_control)
+    return integrate.quad(integrand, 0, 1)[0]
+
+def test_posteriors_match_scipy():
+    alpha, beta = beta_posteriors(SUCCESSES, TRIALS, prior=(2.0, 3.0))
+    results = bayesian_proportion_tests(SUCCESSES, TRIALS, prior=(2.0, 3.0), credible_level=0.9)
+    
+    np.testing.assert_array_equal(alpha, 2 + SUCCESSES)
+    np.testing.assert_array_equal(beta, 3 + TRIALS - SUCCESSES)
+    np.testing.assert_allclose(results['posterior_mean'], stats.beta.mean(alpha, beta))
+    np.testing.assert_allclose(results['ci_low'], stats.beta.ppf(0.05, alpha, beta))
+    np.testing.assert_allclose(results['ci_high'], stats.beta.ppf(0.95, alpha, beta))
+
+def test_monte_carlo_probabilities():
+    results = bayesian_proportion_tests(SUCCESSES, TRIALS, n_draws=200_000, seed=4)
+    alpha, beta = beta_posteriors(SUCCESSES, TRIALS)
+    
+    for segment in range(2):
+        expected = _prob_beat(alpha[segment, 0], beta[segment, 0], alpha[segment, 1], beta[segment, 1])
+        assert results['prob_beat_control'][segment, 1] == pytest.approx(expected, abs=0.005)
+        # With two arms, the treatment is best exactly when it beats control
+        assert results['prob_best'][segment, 1] == pytest.approx(results['prob_beat_control'][segment, 1])
+    
+    np.testing.assert_allclose(results['prob_best'].sum(axis=1), 1)
+    np.testing.assert_array_equal(results['prob_beat_control'][:, 0], 0.5)
+    assert (results['expected_loss'] >= 0).all()
+
+def test_lower_is_better_flips_the_comparison():
+    higher = bayesian_proportion_tests(SUCCESSES, TRIALS, n_draws=50_000, seed=1)
+    lower = bayesian_proportion_tests(SUCCESSES, TRIALS, higher_is_better=False, n_draws=50_000, seed=1)
+    
+    np.testing.assert_allclose(lower['prob_beat_control'][:, 1], 1 - higher['prob_beat_control'][:, 1], atol=0.01)
+
+def test_segment_tests_read_the_cube_counts(ecommerce_data):
+    df = ecommerce_data
+    cube = MetricsCube.from_frame(df)
+    
+    results = bayesian_segment_tests(cube, 'return_rate', n_draws=2000)
+    
+    purchased = df[df['purchased'] == 1]
+    counts = purchased.groupby(['product_category', 'test_group'], observed=True)['returned'].agg(['sum', 'size'])
+    np.testing.assert_array_equal(results['successes'], counts['sum'].reindex(results.index))
+    np.testing.assert_array_equal(results['trials'], counts['size'].reindex(results.index))
+    assert results.index.get_level_values('test_group')[0] == CONTROL_GROUP
+    
+    pd.testing.assert_frame_equal(bayesian_segment_tests(cube, 'return_rate', n_draws=2000), results)
+    with pytest.raises(ValueError):
+        bayesian_segment_tests(cube, 'satisfaction')
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.metrics.bootstrap import (
+    CHUNK_SIZE,
+    bootstrap_mean_lift,
+    bootstrap_overview_intervals,
+    bootstrap_proportion_lift
+)
+from src.metrics.engine import summarize
+
+# Several chunks, so worker processes share the replicates
+N_REPLICATES = 3 * CHUNK_SIZE + 100
+
+@pytest.mark.parametrize('n_jobs', [2, 3, None])
+def test_proportion_lift_does_not_depend_on_n_jobs(n_jobs):
+    args = (300, 1000, 360, 1000)
+    serial = bootstrap_proportion_lift(*args, n_replicates=N_REPLICATES, seed=11, n_jobs=1)
+    parallel = bootstrap_proportion_lift(*args, n_replicates=N_REPLICATES, seed=11, n_jobs=n_jobs)
+    
+    assert parallel == serial
+
+def test_mean_lift_does_not_depend_on_n_jobs():
+    control = [0, 5, 10, 20, 40, 60, 80, 90, 70, 40, 20]
+    treatment = [0, 3, 6, 12, 30, 50, 80, 100, 90, 60, 30]
+    serial = bootstrap_mean_lift(control, treatment, n_replicates=N_REPLICATES, seed=5, n_jobs=1)
+    parallel = bootstrap_mean_lift(control, treatment, n_replicates=N_REPLICATES, seed=5, n_jobs=4)
+    
+    assert parallel == serial
+
+@pytest.mark.parametrize('method', ['percentile', 'bca'])
+def test_proportion_interval_covers_the_estimate(method):
+    result = bootstrap_proportion_lift(300, 1000, 360, 1000, n_replicates=4000, method=method)
+    
+    assert result['estimate'] == pytest.approx(20.0)
+    assert result['ci_low'] < result['estimate'] < result['ci_high']
+    # Delta-method standard error of the relative lift
+    expected_se = 100 * 1.2 * np.sqrt(0.7 / 300 + 0.64 / 360)
+    assert result['std_error'] == pytest.approx(expected_se, rel=0.1)
+
+def test_empty_arm_gives_an_undefined_interval():
+    result = bootstrap_proportion_lift(0, 0, 10, 100, n_replicates=1000)
+    assert np.isnan(result['ci_low']) and np.isnan(result['ci_high'])
+
+def test_overview_intervals_are_reproducible(ecommerce_data):
+    summary = summarize(ecommerce_data)
+    first = bootstrap_overview_intervals(summary, n_replicates=2000, seed=3)
+    second = bootstrap_overview_intervals(summary, n_replicates=2000, seed=3, n_jobs=2)
+    
+    assert first == second
+    assert set(first) == {'relative_lift', 'relative_reduction', 'relative_improvement'}
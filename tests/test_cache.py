@@ -0,0 +1,141 @@
+import datetime
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import DiskCache, ResultCache, canonical_filter, decode_result, encode_result
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl_seconds=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+    
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl_seconds=10, clock=clock)
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return len(calls)
+    
+    assert cache.get_or_compute('key', compute) == 1
+    clock.now = 9
+    assert cache.get_or_compute('key', compute) == 1
+    clock.now = 21
+    assert 'key' not in cache
+    assert cache.get_or_compute('key', compute) == 2
+    
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 2, 1)
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+    
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'value': 42}
+    
+    def worker():
+        start.wait()
+        results.append(cache.get_or_compute('key', compute))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == [{'value': 42}] * 8
+
+def test_callers_cannot_modify_the_cached_value():
+    cache = ResultCache()
+    cache.put('key', {'rows': [1, 2], 'array': np.arange(3), 'frame': pd.DataFrame({'x': [1, 2]})})
+    
+    value = cache.get('key')
+    value['rows'].append(3)
+    value['frame'].loc[0, 'x'] = 100
+    with pytest.raises(ValueError):
+        value['array'][0] = 100
+    
+    stored = cache.get('key')
+    assert stored['rows'] == [1, 2]
+    assert stored['frame'].loc[0, 'x'] == 1
+
+def test_equivalent_filters_share_a_key():
+    day = datetime.date(2025, 3, 1)
+    
+    assert canonical_filter("All Categories") == canonical_filter(None)
+    assert canonical_filter(date_range=(day, day)) == canonical_filter(
+        date_range=(datetime.datetime(2025, 3, 1, 12), datetime.datetime(2025, 3, 1, 18)))
+    # An incomplete range (first click of a date picker) filters nothing
+    assert canonical_filter(date_range=(day,)) == canonical_filter()
+    assert canonical_filter(test_group=['B', 'A']) == canonical_filter(test_group=('A', 'B'))
+    assert canonical_filter('Tops') != canonical_filter('Dresses')
+
+def test_results_round_trip_as_plain_data():
+    value = {
+        'overview': {'rate': np.float64(0.25), 'n': 10, 'label': 'Control', 'missing': None},
+        'bounds': (1.0, 2.0),
+        'series': [np.arange(4), np.linspace(0, 1, 3)],
+        3: True
+    }
+    decoded = decode_result(encode_result(value))
+    
+    assert decoded['overview'] == {'rate': 0.25, 'n': 10, 'label': 'Control', 'missing': None}
+    assert decoded['bounds'] == (1.0, 2.0) and decoded[3] is True
+    np.testing.assert_array_equal(decoded['series'][0], np.arange(4))
+
+def test_results_other_than_plain_data_are_rejected():
+    with pytest.raises(TypeError):
+        encode_result({'figure': object()})
+    with pytest.raises(TypeError):
+        encode_result(np.array(['a', None], dtype=object))
+
+def test_disk_cache_reuses_results(tmp_path):
+    cache = DiskCache(tmp_path)
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {'value': np.arange(3)}
+    
+    first = cache.result('overview', 'data-1', ('All', None), compute)
+    second = DiskCache(tmp_path).result('overview', 'data-1', ('All', None), compute)
+    
+    assert len(calls) == 1
+    np.testing.assert_array_equal(first['value'], second['value'])
+
+def test_disk_cache_prunes_other_data_versions(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.result('overview', 'data-1', (), lambda: 1)
+    cache.result('overview', 'data-2', (), lambda: 2)
+    
+    versions = list((tmp_path / 'results' / 'overview').iterdir())
+    assert len(versions) == 1 and versions[0].name.startswith('data-2')
+    
+    arrays, meta = cache.arrays('cube', 'data-2', lambda: ({'values': np.ones(3)}, {'days': 3}))
+    loaded, loaded_meta = DiskCache(tmp_path).arrays('cube', 'data-2', lambda: pytest.fail("rebuilt"))
+    np.testing.assert_array_equal(loaded['values'], arrays['values'])
+    assert loaded_meta == meta == {'days': 3}
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from src.context import DataContext
+from src.indexing import MemoryBudget
+from src.data_processing import filter_data
+from src.metrics.engine import summarize
+
+def _date_range(data, offset, days):
+    start = data['date'].min().date() + pd.Timedelta(days=offset)
+    return (start, start + pd.Timedelta(days=days - 1))
+
+def test_context_normalizes_the_filter(shared_source):
+    data = shared_source.get()
+    
+    context = DataContext.load("All Categories", (data['date'].min().date(),))
+    
+    assert context.data is data
+    assert context.category is None and context.date_range is None
+    assert context.date_view is context.view
+    assert len(context.view) == len(data)
+
+def test_views_match_filter_data(shared_source):
+    data = shared_source.get()
+    date_range = _date_range(data, 20, 60)
+    
+    context = DataContext.load('Dresses', date_range)
+    
+    pd.testing.assert_frame_equal(context.view.to_frame(), filter_data(data, 'Dresses', date_range))
+    pd.testing.assert_frame_equal(context.date_view.to_frame(), filter_data(data, date_range=date_range))
+    assert context.view is context.view
+    pd.testing.assert_frame_equal(context.cube.query(context.date_range, context.category),
+                                  summarize(context.view), check_dtype=False, check_index_type=False,
+                                  check_names=False)
+
+def test_cached_results_follow_the_filter(shared_source):
+    data = shared_source.get()
+    tops, dresses = DataContext(data, 'Tops'), DataContext(data, 'Dresses')
+    
+    assert tops.cached('rows', lambda: len(tops.view)) != dresses.cached('rows', lambda: len(dresses.view))
+    assert dresses.cached('total', lambda: len(data), filtered=False) == len(data)
+    assert tops.cached('total', lambda: 'recomputed', filtered=False) == len(data)
+
+def test_context_releases_its_views(shared_source):
+    data = shared_source.get()
+    budget = MemoryBudget(10 ** 9)
+    
+    with DataContext(data, 'Tops', _date_range(data, 0, 90), budget) as context:
+        context.view['purchased']
+        context.date_view['returned']
+        assert budget.used_bytes > 0
+    
+    assert budget.used_bytes == 0
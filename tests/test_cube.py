@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from src.data_processing import filter_data
+from src.metrics.cube import MEMO_ENTRIES, MetricsCube
+from src.metrics.engine import summarize, summarize_segments
+
+@pytest.fixture(scope='module')
+def cube(ecommerce_data):
+    return MetricsCube.from_frame(ecommerce_data)
+
+def _date_range(df, offset, days):
+    start = df['date'].min().date() + pd.Timedelta(days=offset)
+    return (start, start + pd.Timedelta(days=days - 1))
+
+@pytest.mark.parametrize('offset, days, category', [
+    (None, None, None),
+    (0, 30, None),
+    (100, 90, 'Dresses'),
+    (200, 1, 'Tops'),
+    (300, 65, ['Tops', 'Bottoms']),
+    (30, 10, 'All Categories')
+])
+def test_query_matches_summarize_on_the_filtered_frame(ecommerce_data, cube, offset, days, category):
+    df = ecommerce_data
+    date_range = None if offset is None else _date_range(df, offset, days)
+    
+    expected = summarize(filter_data(df, category, date_range))
+    pd.testing.assert_frame_equal(cube.query(date_range, category), expected, check_dtype=False,
+                                  check_index_type=False, check_names=False)
+
+def test_query_of_an_empty_selection(ecommerce_data, cube):
+    assert len(cube.query(category='Not a category')) == 0
+
+def test_query_segments_matches_summarize_segments(ecommerce_data, cube):
+    df = ecommerce_data
+    date_range = _date_range(df, 50, 120)
+    
+    expected = summarize_segments(filter_data(df, date_range=date_range), groups=None)
+    result = cube.query_segments(date_range)
+    
+    assert list(result) == list(expected)
+    for group, segments in expected.items():
+        pd.testing.assert_frame_equal(result[group], segments, check_dtype=False,
+                                      check_index_type=False, check_names=False)
+
+def test_cube_round_trips_through_arrays(ecommerce_data, cube):
+    arrays, meta = cube.to_arrays()
+    restored = MetricsCube.from_arrays(arrays, meta)
+    date_range = _date_range(ecommerce_data, 10, 60)
+    
+    pd.testing.assert_frame_equal(restored.query(date_range, 'Dresses'), cube.query(date_range, 'Dresses'))
+
+def test_memoized_results_are_bounded(ecommerce_data):
+    cube = MetricsCube.from_frame(ecommerce_data)
+    calls = []
+    
+    def build(key):
+        calls.append(key)
+        return key
+    
+    for key in range(MEMO_ENTRIES + 1):
+        cube.memoized(key, lambda key=key: build(key))
+    cube.memoized(MEMO_ENTRIES, lambda: build('again'))
+    cube.memoized(0, lambda: build('evicted'))
+    
+    assert calls == list(range(MEMO_ENTRIES + 1)) + ['evicted']
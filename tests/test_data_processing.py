@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from src.data_processing import (
+    CATEGORIES, GROUPS, PURCHASE_PROBABILITY, RETURN_PROBABILITY,
+    RETURNED_SATISFACTION_RANGE, SATISFACTION_RANGE, generate_sample_data
+)
+
+def _within(observed, expected, trials):
+    """Whether an observed proportion is within 4 standard errors of expected"""
+    return abs(observed - expected) <= 4 * np.sqrt(expected * (1 - expected) / trials)
+
+def test_sample_data_shape_and_types(ecommerce_data):
+    df = ecommerce_data
+    
+    assert len(df) == 20_000
+    assert df['user_id'].is_unique
+    assert list(df['product_category'].cat.categories) == CATEGORIES
+    assert list(df['test_group'].cat.categories) == GROUPS
+    assert (df['viewed'] == 1).all()
+    assert df['product_id'].between(1000, 9999).all()
+    
+    span = df['date'].max() - df['date'].min()
+    assert pd.Timedelta(days=360) < span <= pd.Timedelta(days=365)
+
+def test_sample_data_funnel_is_nested(ecommerce_data):
+    df = ecommerce_data
+    
+    assert (df['purchased'] <= df['added_to_cart']).all()
+    assert (df['returned'] <= df['purchased']).all()
+    assert (df.loc[df['purchased'] == 0, 'satisfaction_score'] == 0).all()
+
+def test_sample_data_follows_group_probabilities(ecommerce_data):
+    df = ecommerce_data
+    
+    assert _within((df['test_group'] == GROUPS[0]).mean(), 0.5, len(df))
+    assert _within(df['added_to_cart'].mean(), 0.6, len(df))
+    for group in GROUPS:
+        rows = df[df['test_group'] == group]
+        carted = rows[rows['added_to_cart'] == 1]
+        bought = rows[rows['purchased'] == 1]
+        
+        assert _within(carted['purchased'].mean(), PURCHASE_PROBABILITY[group], len(carted))
+        assert _within(bought['returned'].mean(), RETURN_PROBABILITY[group], len(bought))
+
+def test_sample_data_satisfaction_ranges(ecommerce_data):
+    df = ecommerce_data
+    
+    returned = df.loc[df['returned'] == 1, 'satisfaction_score']
+    assert returned.between(RETURNED_SATISFACTION_RANGE[0], RETURNED_SATISFACTION_RANGE[1] - 1).all()
+    for group, (low, high) in SATISFACTION_RANGE.items():
+        kept = df[(df['test_group'] == group) & (df['purchased'] == 1) & (df['returned'] == 0)]
+        scores = kept['satisfaction_score']
+        
+        assert scores.between(low, high - 1).all()
+        assert set(scores.unique()) == set(range(low, high))
+
+def test_sample_data_is_reproducible():
+    first = generate_sample_data(5_000, seed=3)
+    second = generate_sample_data(5_000, seed=3)
+    
+    # Dates end at the current time, so only their offsets are reproducible
+    pd.testing.assert_series_equal(first['date'] - first['date'].min(), second['date'] - second['date'].min())
+    pd.testing.assert_frame_equal(first.drop(columns='date'), second.drop(columns='date'))
+    assert not first['purchased'].equals(generate_sample_data(5_000, seed=4)['purchased'])
+
+def test_sample_data_spans_generation_blocks(monkeypatch):
+    monkeypatch.setattr('src.data_processing.GENERATION_CHUNK_SIZE', 700)
+    df = generate_sample_data(2_000, seed=1)
+    
+    assert len(df) == 2_000
+    assert df['user_id'].tolist() == list(range(1, 2_001))
+    assert df['product_category'].notna().all() and df['test_group'].notna().all()
@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+from src.data_source import LOAD_ATTEMPTS, DataSource
+
+class CountingLoader:
+    """Loader reading a text file and counting its calls"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        return self.path.read_text()
+
+class WritingLoader(CountingLoader):
+    """Loader whose first calls are each overlapped by a write to the file"""
+    
+    def __init__(self, path, writes):
+        super().__init__(path)
+        self.writes = writes
+    
+    def __call__(self):
+        content = super().__call__()
+        if self.calls <= self.writes:
+            self.path.write_text(f'written during load {self.calls}')
+            _touch(self.path, self.calls * 10**9)
+        return content
+
+def _source(tmp_path, content='first', **kwargs):
+    path = tmp_path / 'data.txt'
+    path.write_text(content)
+    loader = CountingLoader(path)
+    return DataSource(loader, lambda: path, **kwargs), loader, path
+
+def _touch(path, offset_ns=10**9):
+    """Move the file's modification time without changing its content"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+def test_data_is_loaded_once(tmp_path):
+    source, loader, _ = _source(tmp_path)
+    
+    assert source.get() == 'first'
+    assert source.get() is source.get()
+    assert loader.calls == 1
+    assert source.stats()['hits'] == 2 and source.stats()['misses'] == 1
+
+def test_size_change_reloads(tmp_path):
+    source, loader, path = _source(tmp_path)
+    source.get()
+    version = source.version
+    
+    path.write_text('second, longer')
+    
+    assert source.get() == 'second, longer'
+    assert loader.calls == 2
+    assert source.version != version
+
+def test_mtime_change_reloads(tmp_path):
+    source, loader, path = _source(tmp_path)
+    source.get()
+    
+    # Same size, new content and modification time
+    path.write_text('other')
+    _touch(path)
+    
+    assert source.get() == 'other'
+    assert loader.calls == 2
+
+def test_verify_hash_ignores_touched_files(tmp_path):
+    source, loader, path = _source(tmp_path, verify_hash=True)
+    source.get()
+    
+    _touch(path)
+    assert source.get() == 'first'
+    assert loader.calls == 1
+    
+    path.write_text('fresh')
+    _touch(path, 2 * 10**9)
+    assert source.get() == 'fresh'
+    assert loader.calls == 2
+
+@pytest.mark.parametrize('verify_hash', [False, True])
+def test_write_during_the_load_is_reloaded(tmp_path, verify_hash):
+    path = tmp_path / 'data.txt'
+    path.write_text('first')
+    loader = WritingLoader(path, writes=1)
+    source = DataSource(loader, lambda: path, verify_hash=verify_hash)
+    
+    assert source.get() == 'written during load 1'
+    assert source.get() == 'written during load 1'
+    assert loader.calls == 2
+
+def test_file_changing_during_every_load_reloads_on_next_access(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text('first')
+    loader = WritingLoader(path, writes=LOAD_ATTEMPTS)
+    source = DataSource(loader, lambda: path)
+    
+    assert source.get() == f'written during load {LOAD_ATTEMPTS - 1}'
+    assert not source.is_current()
+    assert source.get() == f'written during load {LOAD_ATTEMPTS}'
+    assert source.is_current()
+    assert loader.calls == LOAD_ATTEMPTS + 1
+
+def test_invalidate_reloads(tmp_path):
+    source, loader, _ = _source(tmp_path)
+    source.get()
+    
+    source.invalidate()
+    
+    assert source.version is None
+    assert source.get() == 'first'
+    assert loader.calls == 2
+
+def test_derived_is_rebuilt_with_the_data(tmp_path):
+    source, _, path = _source(tmp_path)
+    builds = []
+    
+    def build(data):
+        builds.append(data)
+        return len(data)
+    
+    assert source.derived('length', build) == 5
+    assert source.derived('length', build) == 5
+    assert builds == ['first']
+    
+    path.write_text('second')
+    assert source.derived('length', build) == 6
+    assert builds == ['first', 'second']
+
+def test_has_derived(tmp_path):
+    source, _, path = _source(tmp_path)
+    
+    assert not source.has_derived('length')
+    source.derived('length', len)
+    assert source.has_derived('length')
+    
+    path.write_text('changed')
+    assert not source.has_derived('length')
+
+def test_fingerprint_follows_the_content(tmp_path):
+    source, _, path = _source(tmp_path)
+    fingerprint = source.fingerprint
+    
+    # Stable across processes and restarts, unlike version
+    assert DataSource(lambda: None, lambda: path).fingerprint == fingerprint
+    
+    path.write_text('second')
+    assert source.fingerprint != fingerprint
+
+def test_listeners_run_after_every_load(tmp_path):
+    source, _, path = _source(tmp_path)
+    loads = []
+    source.add_listener(loads.append)
+    
+    source.get()
+    source.get()
+    path.write_text('second')
+    source.get()
+    
+    assert loads == [source, source]
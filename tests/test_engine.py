@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP, summarize
+from src.metrics.overview import calculate_overview_metrics
+
+def _rated(df):
+    """Purchased rows with a satisfaction score"""
+    return df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+
+def test_summarize_matches_groupby(ecommerce_data):
+    df = ecommerce_data
+    summary = summarize(df, ['test_group', 'product_category'])
+    
+    grouped = df.groupby(['test_group', 'product_category'], observed=True)
+    rated = _rated(df).groupby(['test_group', 'product_category'], observed=True)['satisfaction_score']
+    purchased = df[df['purchased'] == 1].groupby(['test_group', 'product_category'], observed=True)
+    
+    np.testing.assert_array_equal(summary['rows'], grouped.size())
+    np.testing.assert_array_equal(summary['views'], grouped['viewed'].sum())
+    np.testing.assert_array_equal(summary['carts'], grouped['added_to_cart'].sum())
+    np.testing.assert_array_equal(summary['purchases'], grouped['purchased'].sum())
+    np.testing.assert_array_equal(summary['returns'], purchased['returned'].sum())
+    np.testing.assert_array_equal(summary['sat_n'], rated.size())
+    np.testing.assert_allclose(summary['sat_sum'], rated.sum())
+    np.testing.assert_allclose(summary['sat_sumsq'], rated.apply(lambda s: (s.astype(float) ** 2).sum()))
+
+def test_summarize_drops_empty_groups(ecommerce_data):
+    summary = summarize(ecommerce_data[ecommerce_data['test_group'] == CONTROL_GROUP])
+    
+    assert list(summary.index) == [CONTROL_GROUP]
+
+def test_overview_matches_row_level_metrics(ecommerce_data):
+    df = ecommerce_data
+    overview = calculate_overview_metrics(df, average_return_cost=20)
+    
+    control, treatment = (df[df['test_group'] == group] for group in (CONTROL_GROUP, TREATMENT_GROUP))
+    conversion = {name: rows['purchased'].sum() / rows['viewed'].sum() * 100
+                  for name, rows in (('control', control), ('recommendation', treatment))}
+    returns = {name: rows.loc[rows['purchased'] == 1, 'returned'].mean() * 100
+               for name, rows in (('control', control), ('recommendation', treatment))}
+    satisfaction = {name: _rated(rows)['satisfaction_score'].mean()
+                    for name, rows in (('control', control), ('recommendation', treatment))}
+    
+    for name in ('control', 'recommendation'):
+        assert overview['conversion']['overall'][name] == pytest.approx(conversion[name])
+        assert overview['returns']['overall'][name] == pytest.approx(returns[name])
+        assert overview['satisfaction']['overall'][name] == pytest.approx(satisfaction[name])
+    
+    purchases = treatment['purchased'].sum()
+    savings = purchases * (returns['control'] - returns['recommendation']) / 100 * 20
+    assert overview['cost_savings'] == pytest.approx(savings)
+
+def test_overview_tests_match_scipy(ecommerce_data):
+    # A small slice keeps the p-values away from 0
+    df = ecommerce_data.iloc[:300]
+    overview = calculate_overview_metrics(df)
+    control, treatment = (df[df['test_group'] == group] for group in (CONTROL_GROUP, TREATMENT_GROUP))
+    
+    expected = stats.ttest_ind(_rated(treatment)['satisfaction_score'], _rated(control)['satisfaction_score'],
+                               equal_var=False)
+    assert overview['satisfaction_test']['p_value'] == pytest.approx(expected.pvalue, rel=1e-6)
+    
+    # Pooled two-proportion z-test on view-to-purchase conversion
+    x1, n1 = control['purchased'].sum(), control['viewed'].sum()
+    x2, n2 = treatment['purchased'].sum(), treatment['viewed'].sum()
+    pooled = (x1 + x2) / (n1 + n2)
+    z = (x1 / n1 - x2 / n2) / np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    assert overview['conversion_test']['p_value'] == pytest.approx(2 * stats.norm.sf(abs(z)), rel=1e-6)
+    assert overview['conversion_test']['control_rate'] == pytest.approx(x1 / n1 * 100)
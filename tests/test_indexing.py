@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data_processing
+from src.data_source import DataSource
+from src.indexing import Bitmap, DataIndex, DataView, MemoryBudget, sort_by_date
+from src.metrics.engine import summarize
+
+def _shifted(df, date):
+    """Date relative to the simulated year, whatever the day the tests run"""
+    if date is None:
+        return None
+    return pd.Timestamp(date) + (df['date'].min().normalize() - pd.Timestamp('2025-01-01'))
+
+@pytest.mark.parametrize('start, end', [
+    (None, None),
+    ('2025-03-01', '2025-04-15'),
+    (None, '2025-02-01'),
+    ('2025-05-03', None),
+    ('2025-06-01', '2025-06-01'),
+    ('2030-01-01', None)
+])
+def test_date_slice_matches_boolean_mask(ecommerce_data, start, end):
+    df = ecommerce_data
+    start, end = _shifted(df, start), _shifted(df, end)
+    
+    rows = DataIndex(df).date_slice(start, end)
+    
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['date'] >= start).to_numpy()
+    if end is not None:
+        mask &= (df['date'] < end).to_numpy()
+    np.testing.assert_array_equal(np.arange(len(df))[rows], np.flatnonzero(mask))
+
+@pytest.mark.parametrize('start, end, filters', [
+    (None, None, {}),
+    ('2025-03-01', '2025-04-15', {}),
+    (None, '2025-02-01', {'product_category': 'Dresses'}),
+    ('2025-05-03', None, {'test_group': 'Control'}),
+    ('2025-01-10', '2025-08-20', {'product_category': ['Dresses', 'Tops'], 'test_group': 'Size Recommendation'}),
+    ('2025-06-01', '2025-06-02', {'product_category': 'Not a category'}),
+    ('2030-01-01', None, {'test_group': 'Control'})
+])
+def test_select_matches_boolean_mask(ecommerce_data, start, end, filters):
+    df = ecommerce_data
+    start, end = _shifted(df, start), _shifted(df, end)
+    
+    rows = DataIndex(df).select(start, end, **filters)
+    
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['date'] >= start).to_numpy()
+    if end is not None:
+        mask &= (df['date'] < end).to_numpy()
+    for dimension, values in filters.items():
+        values = values if isinstance(values, list) else [values]
+        mask &= df[dimension].isin(values).to_numpy()
+    np.testing.assert_array_equal(np.arange(len(df))[rows], np.flatnonzero(mask))
+
+def test_bitmap_operations_match_masks():
+    rng = np.random.default_rng(0)
+    a, b = rng.random(1_003) < 0.3, rng.random(1_003) < 0.6
+    left, right = Bitmap.from_mask(a), Bitmap.from_mask(b)
+    
+    np.testing.assert_array_equal((left & right).to_mask(), a & b)
+    np.testing.assert_array_equal((left | right).to_mask(), a | b)
+    np.testing.assert_array_equal((~left).to_mask(), ~a)
+    assert (~left).count() == np.count_nonzero(~a)
+    np.testing.assert_array_equal(left.to_rows(5, 997), 5 + np.flatnonzero(a[5:997]))
+
+def test_index_requires_sorted_dates(ecommerce_data):
+    with pytest.raises(ValueError):
+        DataIndex(ecommerce_data.iloc[::-1])
+
+def test_sort_by_date_is_stable(ecommerce_data):
+    shuffled = ecommerce_data.sample(frac=1, random_state=0).reset_index(drop=True)
+    
+    ordered = sort_by_date(shuffled)
+    
+    assert ordered['date'].is_monotonic_increasing
+    assert sort_by_date(ordered) is ordered
+    expected = shuffled.iloc[np.argsort(shuffled['date'].to_numpy(), kind='stable')]
+    np.testing.assert_array_equal(ordered['user_id'].to_numpy(), expected['user_id'].to_numpy())
+
+@pytest.mark.parametrize('category, days, filters', [
+    (None, None, {}),
+    ('All Categories', (30, 61), {}),
+    ('Outerwear', (100, 100), {}),
+    ('Tops', None, {'test_group': 'Control'}),
+    (None, (10, 200), {'test_group': ['Control', 'Size Recommendation'], 'product_category': ('Tops', 'Dresses')}),
+    ('Dresses', (0, 364), {'product_id': 5000})
+])
+def test_indexed_filter_matches_scan(ecommerce_data, tmp_path, monkeypatch, category, days, filters):
+    df = ecommerce_data
+    source = DataSource(lambda: df, lambda: tmp_path / 'missing.parquet', build_index=DataIndex)
+    monkeypatch.setattr(data_processing, '_shared_source', source)
+    date_range = None
+    if days is not None:
+        first = df['date'].min().date()
+        date_range = (first + pd.Timedelta(days=days[0]), first + pd.Timedelta(days=days[1]))
+    
+    indexed = data_processing.filter_data(source.get(), category, date_range, **filters)
+    scanned = data_processing.filter_data(df.copy(), category, date_range, **filters)
+    
+    pd.testing.assert_frame_equal(indexed, scanned)
+    view = data_processing.filter_view(source.get(), category, date_range, **filters)
+    pd.testing.assert_frame_equal(view.to_frame(), scanned)
+
+def test_data_view_matches_masked_frame(ecommerce_data):
+    df = ecommerce_data
+    mask = (df['product_category'] == df['product_category'].iloc[0]).to_numpy()
+    view = DataView.from_mask(df, mask)
+    expected = df[mask]
+    
+    assert len(view) == len(expected)
+    for column in ('purchased', 'returned', 'satisfaction_score', 'test_group'):
+        np.testing.assert_array_equal(view[column].to_numpy(), expected[column].to_numpy())
+    pd.testing.assert_frame_equal(summarize(view), summarize(expected))
+    pd.testing.assert_frame_equal(view.to_frame(), expected)
+
+def test_data_view_slices_are_not_copied(ecommerce_data):
+    view = DataView(ecommerce_data, slice(100, 200))
+    assert len(view) == 100
+    assert np.shares_memory(view['purchased'].to_numpy(), ecommerce_data['purchased'].to_numpy())
+
+def test_data_view_returns_its_budget(ecommerce_data):
+    df = ecommerce_data
+    budget = MemoryBudget(10 ** 9)
+    
+    with DataView.from_mask(df, (df['purchased'] == 1).to_numpy(), budget) as view:
+        view['satisfaction_score']
+        view['returned']
+        assert budget.used_bytes == view.nbytes - view.rows.nbytes > 0
+    
+    assert budget.used_bytes == 0
+
+def test_data_view_recomputes_columns_beyond_its_budget(ecommerce_data):
+    df = ecommerce_data
+    budget = MemoryBudget(0)
+    view = DataView.from_mask(df, (df['purchased'] == 1).to_numpy(), budget)
+    
+    np.testing.assert_array_equal(view['returned'].to_numpy(), df.loc[df['purchased'] == 1, 'returned'].to_numpy())
+    assert budget.used_bytes == 0
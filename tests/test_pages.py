@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from src import pages
+
+ROOT = Path(__file__).resolve().parents[1]
+
+@pytest.fixture
+def fake_pages(monkeypatch):
+    """Two pages backed by an in-memory module, one taking the context"""
+    module = types.ModuleType('fake_page_module')
+    calls = []
+    module.WithContext = lambda context: calls.append(('with', context))
+    module.WithoutContext = lambda: calls.append(('without',))
+    monkeypatch.setitem(sys.modules, 'fake_page_module', module)
+    monkeypatch.setattr(pages, 'PAGES', {
+        'with': ('fake_page_module', 'WithContext', True),
+        'without': ('fake_page_module', 'WithoutContext', False),
+        'missing': ('src.components.not_a_page', 'Missing', False),
+        'broken': ('src.components.broken_page', 'Broken', False)
+    })
+    return calls
+
+def test_render_page_passes_the_context_when_asked(fake_pages):
+    context = object()
+    
+    assert pages.render_page('with', context)
+    assert pages.render_page('without', context)
+    assert fake_pages == [('with', context), ('without',)]
+
+def test_missing_page_module_is_none(fake_pages):
+    assert pages.load_page('missing') is None
+    assert not pages.render_page('missing', None)
+
+def test_missing_dependency_of_a_page_surfaces(fake_pages, monkeypatch):
+    original = pages.importlib.import_module
+    
+    def failing_import(name, *args):
+        if name == 'src.components.broken_page':
+            raise ModuleNotFoundError("No module named 'not_installed'", name='not_installed')
+        return original(name, *args)
+    
+    monkeypatch.setattr(pages.importlib, 'import_module', failing_import)
+    with pytest.raises(ModuleNotFoundError):
+        pages.load_page('broken')
+
+def test_landing_imports_leave_heavy_libraries_unloaded():
+    code = (
+        "import sys, src.pages, src.context, src.warmup; "
+        "print(sorted(m for m in ('scipy', 'plotly') if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    
+    assert output.stdout.strip() == '[]'
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing import filter_data
+from src.metrics.engine import summarize
+from src.metrics.overview import arm_metrics_from_summary
+from src.metrics.sampling import StratifiedSample
+from src.storage import sample_strata
+
+def _date_range(df, offset, days):
+    start = df['date'].min().date() + pd.Timedelta(days=offset)
+    return (start, start + pd.Timedelta(days=days - 1))
+
+def test_full_sample_is_exact(ecommerce_data):
+    df = ecommerce_data
+    sample = StratifiedSample.from_samples(sample_strata(df, rows_per_day=len(df)))
+    date_range = _date_range(df, 60, 90)
+    
+    expected = summarize(filter_data(df, 'Dresses', date_range))
+    pd.testing.assert_frame_equal(sample.query(date_range, 'Dresses'), expected, check_dtype=False,
+                                  check_index_type=False, check_names=False)
+    # Nothing left to estimate
+    np.testing.assert_allclose(sample.standard_errors(date_range, 'Dresses'), 0, atol=1e-9)
+
+def test_row_counts_are_exact(ecommerce_data):
+    df = ecommerce_data
+    sample = StratifiedSample.from_samples(sample_strata(df, rows_per_day=10, seed=1))
+    date_range = _date_range(df, 30, 45)
+    
+    # Selections are unions of whole strata
+    estimated = sample.query(date_range, 'Outerwear')
+    expected = filter_data(df, 'Outerwear', date_range).groupby('test_group', observed=True).size()
+    np.testing.assert_allclose(estimated['rows'], expected)
+
+@pytest.mark.parametrize('category', [None, 'Tops'])
+def test_estimates_are_within_their_standard_errors(ecommerce_data, category):
+    df = ecommerce_data
+    date_range = _date_range(df, 0, 200)
+    exact = arm_metrics_from_summary(summarize(filter_data(df, category, date_range)))
+    
+    for seed in range(5):
+        sample = StratifiedSample.from_samples(sample_strata(df, rows_per_day=12, seed=seed))
+        estimate = arm_metrics_from_summary(sample.query(date_range, category))
+        errors = sample.standard_errors(date_range, category)
+        
+        for column in ('conversion_rate', 'return_rate', 'satisfaction'):
+            deviation = (estimate[column] - exact[column]).abs()
+            assert (errors[column] > 0).all()
+            assert (deviation <= 4 * errors[column]).all()
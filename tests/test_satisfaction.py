@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP
+from src.metrics.satisfaction import (
+    calculate_nps_distribution,
+    histogram_statistics,
+    satisfaction_histogram
+)
+
+def _rated(df):
+    """Purchased rows with a satisfaction score"""
+    return df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+
+def test_histogram_counts_purchase_scores(ecommerce_data):
+    df = ecommerce_data
+    histogram = satisfaction_histogram(df, by='product_category')
+    
+    purchased = df[df['purchased'] == 1]
+    expected = pd.crosstab(purchased['product_category'], purchased['satisfaction_score'])
+    expected = expected.reindex(columns=range(11), fill_value=0)
+    np.testing.assert_array_equal(histogram.to_numpy(), expected.to_numpy())
+
+def test_histogram_statistics_match_row_level(ecommerce_data):
+    df = ecommerce_data
+    histogram = satisfaction_histogram(df)
+    
+    for group in (CONTROL_GROUP, TREATMENT_GROUP):
+        scores = _rated(df[df['test_group'] == group])['satisfaction_score'].astype(float)
+        result = histogram_statistics(histogram.loc[group])
+        
+        assert result['n'] == len(scores)
+        assert result['mean'] == pytest.approx(scores.mean())
+        assert result['variance'] == pytest.approx(scores.var())
+        assert result['std'] == pytest.approx(scores.std())
+        for percentile in (25, 50, 75, 90):
+            expected = np.percentile(scores, percentile, method='inverted_cdf')
+            assert result[f'p{percentile}'] == expected
+
+def test_histogram_statistics_of_many_histograms(ecommerce_data):
+    histogram = satisfaction_histogram(ecommerce_data, by='product_category')
+    
+    result = histogram_statistics(histogram)
+    
+    assert list(result.index) == list(histogram.index)
+    for category in histogram.index:
+        assert result.loc[category, 'mean'] == pytest.approx(histogram_statistics(histogram.loc[category])['mean'])
+    assert histogram_statistics(np.zeros(11))['mean'] == 0
+
+def test_nps_matches_row_level_categories(ecommerce_data):
+    df = ecommerce_data
+    nps = calculate_nps_distribution(df)
+    
+    for group in (CONTROL_GROUP, TREATMENT_GROUP):
+        scores = _rated(df[df['test_group'] == group])['satisfaction_score']
+        promoters = (scores >= 9).mean() * 100
+        detractors = (scores <= 6).mean() * 100
+        
+        assert nps[group]['promoters'] == pytest.approx(promoters)
+        assert nps[group]['detractors'] == pytest.approx(detractors)
+        assert nps[group]['nps_score'] == pytest.approx(promoters - detractors)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics.conversion_rates import calculate_conversion_by_category
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP
+from src.metrics.return_rates import calculate_return_by_category
+from src.metrics.satisfaction import calculate_satisfaction_by_category
+
+def _rate(df, dimension, column, rows=None):
+    """Row-level mean of column (or ratio to rows) per segment, one column per group, 0 when empty"""
+    grouped = df.groupby([dimension, 'test_group'], observed=True)
+    values = grouped[column].sum() / (grouped[rows].sum() if rows else grouped.size())
+    return values.unstack('test_group').reindex(columns=[CONTROL_GROUP, TREATMENT_GROUP]).fillna(0)
+
+def _improvement(control, treatment):
+    return np.where(control > 0, (treatment - control) / np.where(control > 0, control, 1) * 100, 0)
+
+@pytest.fixture(params=['product_category', 'product_id'])
+def segments(request, ecommerce_data):
+    # Few rows per product, so that some products miss a group
+    df = ecommerce_data if request.param == 'product_category' else ecommerce_data.iloc[:3000]
+    return df, request.param
+
+def test_conversion_by_category_matches_row_level(segments):
+    df, dimension = segments
+    result = calculate_conversion_by_category(df, dimension)
+    
+    expected = _rate(df, dimension, 'purchased', 'viewed') * 100
+    column = 'category' if dimension == 'product_category' else dimension
+    np.testing.assert_array_equal(result[column], expected.index)
+    np.testing.assert_allclose(result['control_conversion'], expected[CONTROL_GROUP])
+    np.testing.assert_allclose(result['recommendation_conversion'], expected[TREATMENT_GROUP])
+    np.testing.assert_allclose(result['improvement'],
+                               _improvement(expected[CONTROL_GROUP], expected[TREATMENT_GROUP]))
+
+def test_return_by_category_matches_row_level(segments):
+    df, dimension = segments
+    purchased = df[df['purchased'] == 1]
+    result = calculate_return_by_category(df, dimension)
+    
+    expected = _rate(purchased, dimension, 'returned') * 100
+    column = 'category' if dimension == 'product_category' else dimension
+    result = result.set_index(column).loc[expected.index]
+    np.testing.assert_allclose(result['control_return_rate'], expected[CONTROL_GROUP])
+    np.testing.assert_allclose(result['recommendation_return_rate'], expected[TREATMENT_GROUP])
+    # Return rate reduction is relative to the control rate
+    np.testing.assert_allclose(result['reduction'],
+                               -_improvement(expected[CONTROL_GROUP], expected[TREATMENT_GROUP]))
+
+def test_satisfaction_by_category_matches_row_level(segments):
+    df, dimension = segments
+    rated = df[(df['purchased'] == 1) & (df['satisfaction_score'] > 0)]
+    result = calculate_satisfaction_by_category(df, dimension)
+    
+    expected = _rate(rated, dimension, 'satisfaction_score')
+    column = 'category' if dimension == 'product_category' else dimension
+    # Segments without rated purchases are left out
+    np.testing.assert_array_equal(result[column], expected.index)
+    np.testing.assert_allclose(result['control_satisfaction'], expected[CONTROL_GROUP])
+    np.testing.assert_allclose(result['recommendation_satisfaction'], expected[TREATMENT_GROUP])
+
+@pytest.mark.parametrize('by_category', [
+    calculate_conversion_by_category,
+    calculate_return_by_category,
+    calculate_satisfaction_by_category
+])
+def test_by_category_covers_every_arm(three_arm_data, by_category):
+    df = three_arm_data
+    result = by_category(df)
+    
+    assert list(result['arm'].unique()) == [TREATMENT_GROUP, 'Variant B']
+    for arm in (TREATMENT_GROUP, 'Variant B'):
+        # Each arm is compared against control alone
+        pairwise = by_category(df[df['test_group'].isin([CONTROL_GROUP, arm])])
+        pd.testing.assert_frame_equal(result[result['arm'] == arm].reset_index(drop=True), pairwise)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics.ab_testing import proportions_ztest
+from src.metrics.engine import CONTROL_GROUP, TREATMENT_GROUP
+from src.metrics.sequential import SequentialTest
+
+N_EXPERIMENTS = 200
+N_LOOKS = 25
+BATCH = 250  # Views per arm between looks
+
+def _batches(rate_control, rate_treatment, seed):
+    """Purchases per arm of every micro-batch, shape (experiments, looks, 2)"""
+    rng = np.random.default_rng(seed)
+    return rng.binomial(BATCH, [rate_control, rate_treatment], size=(N_EXPERIMENTS, N_LOOKS, 2))
+
+def _summary(purchases):
+    """Per-group summary of one micro-batch, as returned by summarize"""
+    return pd.DataFrame({'rows': [BATCH, BATCH], 'purchases': purchases},
+                        index=pd.Index([CONTROL_GROUP, TREATMENT_GROUP], name='test_group'))
+
+def _stopped(batches):
+    """Whether each experiment ever reaches significance, looking after every batch"""
+    stopped = []
+    for experiment in batches:
+        test = SequentialTest('conversion')
+        stopped.append(any(test.update(_summary(purchases))['is_significant'] for purchases in experiment))
+    return np.array(stopped)
+
+def test_aa_false_positive_rate_stays_below_alpha_under_peeking():
+    batches = _batches(0.3, 0.3, seed=0)
+    false_positives = _stopped(batches).mean()
+    
+    # 200 experiments: alpha = 0.05 plus about 2.5 binomial standard errors
+    assert false_positives <= 0.09
+    
+    # The same peeking with a fixed-horizon z-test inflates the error rate
+    cumulative = batches.cumsum(axis=1)
+    trials = BATCH * np.arange(1, N_LOOKS + 1)
+    _, p_values = proportions_ztest(cumulative[..., 0], trials, cumulative[..., 1], trials)
+    assert (p_values < 0.05).any(axis=1).mean() > 2 * false_positives
+
+def test_true_effect_is_detected():
+    assert _stopped(_batches(0.30, 0.36, seed=1)[:50]).mean() > 0.9
+
+def test_state_round_trip():
+    test = SequentialTest('conversion', control=CONTROL_GROUP, treatment='Variant B')
+    summary = pd.DataFrame({'rows': [1000, 1000], 'purchases': [300, 340]},
+                           index=pd.Index([CONTROL_GROUP, 'Variant B'], name='test_group'))
+    test.update(summary)
+    
+    restored = SequentialTest.from_state(test.state)
+    assert restored.result() == test.result()
+    assert restored.update(summary) == test.update(summary)
+
+def test_unknown_metric():
+    with pytest.raises(ValueError):
+        SequentialTest('revenue')
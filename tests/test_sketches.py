@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from src.sketches import CountMinSketch, DatasetSketches, HyperLogLog, QuantileSketch
+
+def test_hyperloglog_relative_error():
+    values = np.random.default_rng(0).choice(10 ** 9, size=200_000, replace=False)
+    sketch = HyperLogLog().add(values)
+    
+    # 1.04 / sqrt(2 ** 14) = 0.8%, allow about 4 standard errors
+    assert sketch.count() == pytest.approx(len(values), rel=0.035)
+
+def test_hyperloglog_small_counts_and_duplicates():
+    sketch = HyperLogLog().add(np.tile(np.arange(1000), 5))
+    assert sketch.count() == pytest.approx(1000, rel=0.02)
+
+def test_hyperloglog_merge_is_the_sketch_of_the_union():
+    values = np.arange(150_000)
+    left = HyperLogLog().add(values[:100_000])
+    right = HyperLogLog().add(values[50_000:])
+    
+    np.testing.assert_array_equal(left.merge(right).registers, HyperLogLog().add(values).registers)
+
+def test_quantile_sketch_rank_error():
+    values = np.random.default_rng(1).lognormal(size=100_000)
+    sketch = QuantileSketch().add(values)
+    
+    assert sketch.n == len(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        rank = np.mean(values <= sketch.quantile(q))
+        assert rank == pytest.approx(q, abs=0.02)
+
+def test_quantile_sketch_merge():
+    rng = np.random.default_rng(2)
+    shards = [rng.normal(loc, 1.0, size=30_000) for loc in (0.0, 1.0, 2.0)]
+    merged = QuantileSketch().add(shards[0])
+    for shard in shards[1:]:
+        merged = merged.merge(QuantileSketch().add(shard))
+    
+    values = np.concatenate(shards)
+    assert merged.n == len(values)
+    for q in (0.1, 0.5, 0.9):
+        assert np.mean(values <= merged.quantile(q)) == pytest.approx(q, abs=0.02)
+
+def test_empty_quantile_sketch():
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+def test_count_min_error_bound():
+    rng = np.random.default_rng(3)
+    keys = rng.zipf(1.3, size=200_000) % 50_000
+    sketch = CountMinSketch(width=1 << 12, depth=4).add(keys)
+    
+    unique, exact = np.unique(keys, return_counts=True)
+    estimates = sketch.estimate(unique)
+    
+    # Never undercounts; overcounts by at most 2 * total / width with
+    # probability 1 - 2 ** -depth per key
+    assert (estimates >= exact).all()
+    within = estimates - exact <= 2 * len(keys) / sketch.width
+    assert within.mean() >= 1 - 2 ** -sketch.depth
+
+def test_count_min_merge_adds_counts():
+    keys = np.arange(1000)
+    merged = CountMinSketch().add(keys).merge(CountMinSketch().add(keys, counts=np.full(1000, 2)))
+    assert (merged.estimate(keys) >= 3).all()
+    np.testing.assert_array_equal(merged.table, CountMinSketch().add(keys, counts=np.full(1000, 3)).table)
+
+def test_dataset_sketches_merge_save_and_load(ecommerce_data, tmp_path):
+    df = ecommerce_data
+    half = len(df) // 2
+    merged = DatasetSketches.from_frame(df.iloc[:half]).merge(DatasetSketches.from_frame(df.iloc[half:]))
+    
+    assert merged.distinct_users.count() == pytest.approx(df['user_id'].nunique(), rel=0.03)
+    assert merged.distinct_products.count() == pytest.approx(df['product_id'].nunique(), rel=0.03)
+    
+    path = tmp_path / 'sketches.npz'
+    merged.save(path)
+    loaded = DatasetSketches.load(path)
+    
+    np.testing.assert_array_equal(loaded.distinct_users.registers, merged.distinct_users.registers)
+    np.testing.assert_array_equal(loaded.product_returns.table, merged.product_returns.table)
+    assert set(loaded.satisfaction) == set(merged.satisfaction)
+    for group, sketch in merged.satisfaction.items():
+        assert loaded.satisfaction[group].n == sketch.n
+        assert loaded.satisfaction[group].quantile(0.5) == sketch.quantile(0.5)
+    
+    purchased = df[df['purchased'] == 1]
+    products, exact = np.unique(purchased['product_id'], return_counts=True)
+    assert (loaded.product_purchases.estimate(products) >= exact).all()
+    
+    # The count-min tables are mostly zeros and compress well
+    raw_bytes = merged.product_purchases.table.nbytes + merged.product_returns.table.nbytes
+    assert path.stat().st_size < raw_bytes / 10
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data_processing
+from src.sketches import DatasetSketches
+from src.storage import (
+    MANIFEST_NAME,
+    SCHEMA,
+    STRATUM_ROWS_COLUMN,
+    append_partitions,
+    read_columnar,
+    read_manifest,
+    read_partitions,
+    read_processed_data,
+    read_samples,
+    read_sketches,
+    sample_strata,
+    write_columnar,
+    write_partitions,
+    write_processed_data
+)
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_processed_data_round_trip(ecommerce_data, tmp_path, suffix):
+    path = tmp_path / f"ecommerce_data{suffix}"
+    write_processed_data(ecommerce_data, path)
+    
+    read = read_processed_data(path)
+    
+    assert {column: str(dtype) for column, dtype in read.dtypes.items()} == SCHEMA
+    pd.testing.assert_frame_equal(read, ecommerce_data, check_categorical=False)
+
+def test_partitions_round_trip(ecommerce_data, tmp_path):
+    manifest = write_partitions(ecommerce_data, tmp_path)
+    
+    assert manifest == read_manifest(tmp_path)
+    assert sum(entry['rows'] for entry in manifest['partitions']) == len(ecommerce_data)
+    pd.testing.assert_frame_equal(read_partitions(tmp_path), ecommerce_data, check_categorical=False)
+
+def test_read_partitions_prunes_to_the_range(ecommerce_data, tmp_path):
+    df = ecommerce_data
+    write_partitions(df, tmp_path)
+    start = df['date'].min().normalize() + pd.Timedelta(days=40)
+    end = start + pd.Timedelta(days=45)
+    
+    expected = df[(df['date'] >= start) & (df['date'] < end)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(read_partitions(tmp_path, start, end), expected, check_categorical=False)
+    assert len(read_partitions(tmp_path, '1990-01-01', '1990-02-01')) == 0
+
+def test_append_partitions_rewrites_touched_periods(ecommerce_data, tmp_path):
+    df = ecommerce_data
+    cutoff = df['date'].iloc[len(df) * 3 // 4]
+    old, new = df[df['date'] < cutoff], df[df['date'] >= cutoff]
+    
+    write_partitions(old.reset_index(drop=True), tmp_path)
+    before = {entry['period']: entry['hash'] for entry in read_manifest(tmp_path)['partitions']}
+    mtimes = {path.name: path.stat().st_mtime_ns for path in tmp_path.glob('date=*')}
+    manifest = append_partitions(new.reset_index(drop=True), tmp_path)
+    
+    pd.testing.assert_frame_equal(read_partitions(tmp_path), df, check_categorical=False)
+    
+    # Periods entirely before the cutoff are untouched
+    untouched = [entry for entry in manifest['partitions'] if pd.Timestamp(entry['end']) <= cutoff]
+    assert untouched
+    for entry in untouched:
+        assert before[entry['period']] == entry['hash']
+        assert (tmp_path / entry['file']).stat().st_mtime_ns == mtimes[entry['file']]
+
+def test_append_partitions_adds_new_categories(ecommerce_data, tmp_path):
+    write_partitions(ecommerce_data, tmp_path)
+    extra = ecommerce_data.tail(10).copy()
+    extra['product_category'] = pd.Categorical(['Swimwear'] * 10)
+    
+    append_partitions(extra, tmp_path)
+    
+    assert 'Swimwear' in read_manifest(tmp_path)['categories']['product_category']
+    assert (read_partitions(tmp_path)['product_category'] == 'Swimwear').sum() == 10
+
+def test_read_sketches_merges_the_partitions(ecommerce_data, tmp_path):
+    manifest = write_partitions(ecommerce_data, tmp_path)
+    whole = DatasetSketches.from_frame(ecommerce_data)
+    
+    # Partitions written before sketches existed are sketched from their rows
+    (tmp_path / manifest['partitions'][0]['sketch']).unlink()
+    merged = read_sketches(tmp_path)
+    
+    np.testing.assert_array_equal(merged.distinct_users.registers, whole.distinct_users.registers)
+    np.testing.assert_array_equal(merged.product_returns.table, whole.product_returns.table)
+    assert read_sketches(tmp_path, '1990-01-01', '1990-02-01').distinct_users.count() == 0
+
+def test_columnar_copy_is_memory_mapped(ecommerce_data, tmp_path):
+    write_columnar(ecommerce_data, tmp_path / 'v1')
+    
+    mapped = read_columnar(tmp_path / 'v1')
+    
+    pd.testing.assert_frame_equal(mapped, ecommerce_data)
+    # Columns are read-only views of the files, not private copies
+    assert not mapped['purchased'].to_numpy().flags.writeable
+    assert not mapped['product_category'].array.codes.flags.writeable
+    with pytest.raises(FileNotFoundError):
+        read_columnar(tmp_path / 'v2')
+
+def test_read_shared_data_keeps_one_columnar_version(ecommerce_data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_partitions(ecommerce_data.iloc[:5000], data_processing.PARTITIONED_DATA_DIR)
+    first = data_processing.read_shared_data()
+    
+    append_partitions(ecommerce_data.iloc[5000:].reset_index(drop=True), data_processing.PARTITIONED_DATA_DIR)
+    shared = data_processing.read_shared_data()
+    
+    assert len(first) == 5000
+    pd.testing.assert_frame_equal(shared, ecommerce_data, check_categorical=False)
+    assert len(list(data_processing.COLUMNAR_DATA_DIR.iterdir())) == 1
+
+def test_partition_samples_cover_every_stratum(ecommerce_data, tmp_path):
+    df = ecommerce_data
+    write_partitions(df, tmp_path)
+    sample = read_samples(tmp_path)
+    
+    keys = ['day', 'test_group', 'product_category']
+    population = df.assign(day=df['date'].dt.normalize()).groupby(keys, observed=True).size()
+    sampled = sample.assign(day=sample['date'].dt.normalize()).groupby(keys, observed=True)
+    
+    # Every non-empty stratum is sampled and knows its exact size
+    pd.testing.assert_index_equal(sampled.size().index, population.index)
+    np.testing.assert_array_equal(sampled[STRATUM_ROWS_COLUMN].first().to_numpy(), population.to_numpy())
+    assert (sampled.size() <= population).all()
+
+def test_sample_strata_allocates_in_proportion(ecommerce_data):
+    df = ecommerce_data
+    sample = sample_strata(df, rows_per_day=20, seed=3)
+    
+    # Sampled rows are rows of the frame
+    merged = sample.drop(columns=STRATUM_ROWS_COLUMN).merge(df, how='left', indicator=True)
+    assert (merged['_merge'] == 'both').all()
+    
+    # Weighted counts reproduce the number of rows per day and group
+    weights = sample[STRATUM_ROWS_COLUMN] / sample.groupby(
+        [sample['date'].dt.normalize(), 'test_group', 'product_category'], observed=True
+    )['date'].transform('size')
+    assert weights.sum() == pytest.approx(len(df))
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_read_data_migrates_legacy_files(ecommerce_data, tmp_path, monkeypatch, suffix):
+    monkeypatch.chdir(tmp_path)
+    legacy_path = data_processing.PROCESSED_DATA_DIR / f"ecommerce_data{suffix}"
+    # Legacy files were written unsorted, with untyped columns in CSV
+    write_processed_data(ecommerce_data.sample(frac=1, random_state=0), legacy_path)
+    
+    migrated = data_processing.read_data()
+    
+    assert (data_processing.PARTITIONED_DATA_DIR / MANIFEST_NAME).exists()
+    assert migrated['date'].is_monotonic_increasing
+    # Rows sharing a timestamp keep their legacy order, compare them by user
+    pd.testing.assert_frame_equal(
+        migrated.sort_values(['date', 'user_id'], ignore_index=True),
+        ecommerce_data.sort_values(['date', 'user_id'], ignore_index=True),
+        check_categorical=False
+    )
+    
+    # Later reads use the partitions
+    pd.testing.assert_frame_equal(data_processing.read_data(), migrated)
+
+def test_filter_data_includes_the_end_date(ecommerce_data):
+    df = ecommerce_data
+    start = df['date'].min().date() + pd.Timedelta(days=10)
+    end = start + pd.Timedelta(days=5)
+    
+    filtered = data_processing.filter_data(df, 'Dresses', (start, end))
+    
+    days = filtered['date'].dt.normalize()
+    assert (filtered['product_category'] == 'Dresses').all()
+    assert days.min() == pd.Timestamp(start) and days.max() == pd.Timestamp(end)
+    assert len(filtered) == ((df['product_category'] == 'Dresses') & df['date'].dt.normalize().between(
+        pd.Timestamp(start), pd.Timestamp(end))).sum()
+
+def test_load_data_slices_the_shared_dataset(shared_source):
+    data = data_processing.load_data()
+    start = data['date'].min().date() + pd.Timedelta(days=10)
+    end = start + pd.Timedelta(days=5)
+    
+    assert data is shared_source.get()
+    pd.testing.assert_frame_equal(data_processing.load_data((start, end)),
+                                  data_processing.filter_data(data, date_range=(start, end)))
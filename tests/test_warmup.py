@@ -0,0 +1,47 @@
+from concurrent.futures import Future
+
+import pandas as pd
+
+from src import warmup
+from src.cache import result_cache
+
+class InlineExecutor:
+    """Executor running every task right away in the calling thread"""
+    
+    def __init__(self):
+        self.submitted = 0
+    
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+def test_standard_date_ranges(ecommerce_data):
+    ranges = warmup.standard_date_ranges(ecommerce_data)
+    first, last = ecommerce_data['date'].min().date(), ecommerce_data['date'].max().date()
+    
+    assert list(ranges) == list(warmup.STANDARD_WINDOWS)
+    assert ranges['All Time'] == (first, last)
+    assert ranges['Last 30 Days'] == (last - pd.Timedelta(days=29), last)
+    assert ranges['Last Quarter'] == (last - pd.Timedelta(days=89), last)
+
+def test_warm_up_fills_the_dashboard_entries(shared_source):
+    executor = InlineExecutor()
+    futures = warmup.warm_up(executor)
+    
+    categories = 1 + shared_source.get()['product_category'].nunique()
+    assert len(futures) == executor.submitted == 1 + categories * len(warmup.STANDARD_WINDOWS)
+    
+    # The Dashboard's first visit of a standard filter is a cache hit
+    date_range = warmup.standard_date_ranges(shared_source.get())['Last 30 Days']
+    hits = result_cache().stats()['hits']
+    warmup.dashboard_overview('Dresses', date_range)
+    assert result_cache().stats()['hits'] == hits + 1
+
+def test_charts_are_drawn_from_the_cube(shared_source):
+    date_range = warmup.standard_date_ranges(shared_source.get())['Last Quarter']
+    
+    for name in warmup.DASHBOARD_CHARTS:
+        figure = warmup.dashboard_chart(name, 'Tops', date_range)
+        assert len(figure.data) > 0